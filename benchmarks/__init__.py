@@ -0,0 +1,11 @@
+# coding: utf-8
+"""
+Performance benchmarks of PICOS (not installed with the package).
+
+ * :mod:`benchmarks.models`: parametrized generators of the documented models
+   (D-optimal design, max-flow, multicut, maxcut).
+ * :mod:`benchmarks.run`: timing of the build, canonicalization, dualization,
+   file I/O and solve phases at growing sizes, with JSON output
+   (``python -m benchmarks.run -h``).
+ * :mod:`benchmarks.memory`: memory footprint of variables and constraints.
+"""
@@ -0,0 +1,78 @@
+# coding: utf-8
+"""
+Memory footprint of the main modelling objects of PICOS.
+
+Creates ``n`` scalar variables ``y[i]``, the ``n`` scalar affine
+constraints ``y[i] <= 1``, and adds them to a problem. The number of bytes
+per object is reported for each phase. The memory is measured by the
+resident set size of the process (Linux), because the buffers of the
+cvxopt matrices are not seen by :mod:`tracemalloc`;
+on other platforms :mod:`tracemalloc` is used.
+
+usage: python benchmarks/memory.py [n]   (default n = 100000)
+
+The results are printed as one JSON object, so that the figures obtained
+for two versions of PICOS can be compared.
+"""
+from __future__ import print_function, division
+
+import gc
+import json
+import os
+import sys
+import time
+
+import picos as pic
+
+
+def _rss():
+    """current resident set size of the process, in bytes"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _measure(build):
+    """returns (object, allocated bytes, seconds) for ``build()``"""
+    gc.collect()
+    if os.path.exists('/proc/self/statm'):
+        start = _rss()
+        t0 = time.time()
+        obj = build()
+        elapsed = time.time() - t0
+        gc.collect()
+        allocated = _rss() - start
+    else:
+        import tracemalloc
+        tracemalloc.start()
+        t0 = time.time()
+        obj = build()
+        elapsed = time.time() - t0
+        gc.collect()
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return obj, allocated, elapsed
+
+
+def run(n=100000):
+    results = {'picos_version': pic.__version__, 'n': n}
+    prob = pic.Problem()
+
+    y, nbytes, elapsed = _measure(
+        lambda: [prob.add_variable('y[{0}]'.format(i)) for i in range(n)])
+    results['variables_bytes_per_object'] = nbytes / n
+    results['variables_seconds'] = elapsed
+
+    cons, nbytes, elapsed = _measure(lambda: [yi < 1 for yi in y])
+    results['constraints_bytes_per_object'] = nbytes / n
+    results['constraints_seconds'] = elapsed
+
+    _, nbytes, elapsed = _measure(
+        lambda: prob.add_list_of_constraints(cons, 'i', '[n]'))
+    results['add_list_of_constraints_bytes_per_object'] = nbytes / n
+    results['add_list_of_constraints_seconds'] = elapsed
+    return results
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(json.dumps(run(n), indent=1, sort_keys=True))
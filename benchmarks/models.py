@@ -0,0 +1,231 @@
+# coding: utf-8
+"""
+Parametrized generators of the models documented with PICOS, used by the
+benchmark suite (cf. :mod:`benchmarks.run`).
+
+Every generator takes a size parameter ``n`` and a
+:class:`Timer <benchmarks.run.Timer>`, and returns a
+:class:`Problem <picos.Problem>`. The time spent in
+``add_constraint`` and ``add_list_of_constraints`` (including the
+construction of the constraint expressions) is recorded by the timer.
+
+The graphs are built from the LCF notation of the examples of
+``doc/pyplots``, without networkx, so that the benchmark has no dependency
+other than PICOS and cvxopt.
+"""
+from __future__ import print_function, division
+
+import cvxopt as cvx
+import numpy as np
+
+import picos as pic
+
+
+def lcf_digraph(n, shifts=(1, 3, 14), repeats=5):
+    """
+    returns the list of directed edges of the graph ``nx.LCF_graph(n,shifts,repeats)``
+    (each undirected edge is taken in both directions), as in ``doc/pyplots``.
+    """
+    edges = set()
+    for i in range(n):
+        edges.add((i, (i + 1) % n))
+    for k in range(repeats * len(shifts)):
+        i = k % n
+        j = (i + shifts[k % len(shifts)]) % n
+        if i != j:
+            edges.add((i, j))
+    arcs = set()
+    for (i, j) in edges:
+        arcs.add((i, j))
+        arcs.add((j, i))
+    return sorted(arcs)
+
+
+def _capacities(arcs):
+    """the arbitrary sequence of capacities of the examples"""
+    return dict((e, float(((-2) ** i) % 17)) for i, e in enumerate(arcs))
+
+
+def optdes(n, timer, m=5, l=3):
+    """
+    D-optimal design problem of ``test_picos.py``,
+    with ``n`` design points of size ``m x l``.
+    The geometric mean of the diagonal of ``L`` is handled by
+    :func:`geomean() <picos.tools.geomean>`.
+    """
+    rng = np.random.RandomState(0)
+    A = [cvx.sparse(cvx.matrix(rng.randint(-2, 5, (m, l)).astype(float)))
+         for i in range(n)]
+    prob = pic.Problem()
+    AA = pic.new_param('A', A)
+    L = prob.add_variable('L', (m, m))
+    V = [prob.add_variable('V[' + str(i) + ']', AA[i].T.size)
+         for i in range(n)]
+    w = prob.add_variable('w', n)
+    t = prob.add_variable('t', 1)
+    with timer('add_constraint'):
+        prob.add_constraint(
+            pic.sum([AA[i] * V[i] for i in range(n)], 'i', '[s]') == L)
+    with timer('add_list_of_constraints'):
+        prob.add_list_of_constraints([L[i, j] == 0
+                                      for i in range(m)
+                                      for j in range(i + 1, m)],
+                                     ['i', 'j'], 'upper triangle')
+        prob.add_list_of_constraints([abs(V[i]) < (m ** 0.5) * w[i]
+                                      for i in range(n)], 'i', '[s]')
+    with timer('add_constraint'):
+        prob.add_constraint((1 | w) < 1)
+        prob.add_constraint(t < pic.geomean(pic.tools.diag_vect(L)))
+    prob.set_objective('max', t)
+    return prob
+
+
+def maxflow(n, timer):
+    """max-flow problem of ``doc/pyplots/maxflow.py`` on a graph with ``n`` nodes"""
+    arcs = lcf_digraph(n)
+    cc = pic.new_param('c', _capacities(arcs))
+    pred = dict((i, []) for i in range(n))
+    succ = dict((i, []) for i in range(n))
+    for (i, j) in arcs:
+        succ[i].append(j)
+        pred[j].append(i)
+    s, t = 0, n // 2
+    prob = pic.Problem()
+    f = {}
+    for e in arcs:
+        f[e] = prob.add_variable('f[{0}]'.format(e), 1)
+    F = prob.add_variable('F', 1)
+    with timer('add_list_of_constraints'):
+        prob.add_list_of_constraints([f[e] < cc[e] for e in arcs],
+                                     [('e', 2)], 'edges')
+        prob.add_list_of_constraints(
+            [pic.sum([f[p, i] for p in pred[i]], 'p', 'pred(i)')
+             == pic.sum([f[i, j] for j in succ[i]], 'j', 'succ(i)')
+             for i in range(n) if i not in (s, t)],
+            'i', 'nodes-(s,t)')
+    # the flow conservation at the sink is implied by the other equalities,
+    # and is omitted so that the equality constraints have full rank
+    # (as required by cvxopt)
+    with timer('add_constraint'):
+        prob.add_constraint(
+            pic.sum([f[p, s] for p in pred[s]], 'p', 'pred(s)') + F
+            == pic.sum([f[s, j] for j in succ[s]], 'j', 'succ(s)'))
+    with timer('add_list_of_constraints'):
+        prob.add_list_of_constraints([f[e] > 0 for e in arcs],
+                                     [('e', 2)], 'edges')
+    prob.set_objective('max', F)
+    return prob
+
+
+def multicut(n, timer, relax=True):
+    """
+    multicut problem of ``doc/pyplots/multicut.py`` on a graph with ``n`` nodes,
+    with ``n//2`` pairs of nodes to separate.
+    If ``relax`` is True, the cut variables are continuous (LP relaxation),
+    so that the problem can be solved by cvxopt.
+    """
+    arcs = lcf_digraph(n)
+    cc = pic.new_param('c', _capacities(arcs))
+    pairs = [(i, (i + n // 2 + 1) % n) for i in range(0, n, 2)]
+    sources = sorted(set(p[0] for p in pairs))
+    prob = pic.Problem()
+    vtype = 'continuous' if relax else 'binary'
+    y = {}
+    for e in arcs:
+        y[e] = prob.add_variable('y[{0}]'.format(e), 1, vtype=vtype)
+    p = {}
+    for s in sources:
+        p[s] = prob.add_variable('p[{0}]'.format(s), n)
+    with timer('add_list_of_constraints'):
+        prob.add_list_of_constraints(
+            [y[i, j] > p[s][i] - p[s][j] for s in sources for (i, j) in arcs],
+            ['i', 'j', 's'], 'edges x sources')
+        prob.add_list_of_constraints(
+            [p[s][s] == 1 for s in sources], 's', 'sources')
+        prob.add_list_of_constraints(
+            [p[s][t] == 0 for (s, t) in pairs], ['s', 't'], 'pairs')
+        prob.add_list_of_constraints(
+            [p[s] > 0 for s in sources], 's', 'sources')
+        if relax:
+            prob.add_list_of_constraints(
+                [y[e] > 0 for e in arcs], [('e', 2)], 'edges')
+            prob.add_list_of_constraints(
+                [y[e] < 1 for e in arcs], [('e', 2)], 'edges')
+    prob.set_objective('min', pic.sum([cc[e] * y[e] for e in arcs],
+                                      [('e', 2)], 'edges'))
+    return prob
+
+
+def _laplacian(n):
+    """weighted laplacian of the undirected LCF graph with n nodes"""
+    arcs = lcf_digraph(n)
+    c = _capacities(arcs)
+    L = np.zeros((n, n))
+    for (i, j) in arcs:
+        if i < j:
+            wij = c[i, j] + c[j, i]
+            L[i, j] -= wij
+            L[j, i] -= wij
+            L[i, i] += wij
+            L[j, j] += wij
+    return L
+
+
+def maxcut(n, timer):
+    """maxcut SDP relaxation of ``doc/pyplots/maxcut.py`` on a graph with ``n`` nodes"""
+    prob = pic.Problem()
+    X = prob.add_variable('X', (n, n), 'symmetric')
+    L = pic.new_param('L', 0.25 * _laplacian(n))
+    with timer('add_constraint'):
+        prob.add_constraint(pic.tools.diag_vect(X) == 1)
+        prob.add_constraint(X >> 0)
+    prob.set_objective('max', L | X)
+    return prob
+
+
+def complex_maxcut(n, timer):
+    """
+    complex version of the maxcut relaxation (hermitian variable, complex
+    hermitian cost matrix), used to benchmark :func:`to_real() <picos.Problem.to_real>`.
+    """
+    Lr = 0.25 * _laplacian(n)
+    rng = np.random.RandomState(0)
+    S = rng.randn(n, n) * (Lr != 0)
+    C = Lr + 1j * (S - S.T)
+    prob = pic.Problem()
+    Z = prob.add_variable('Z', (n, n), 'hermitian')
+    CC = pic.new_param('C', cvx.matrix(C))
+    with timer('add_constraint'):
+        prob.add_constraint(pic.tools.diag_vect(Z) == 1)
+        prob.add_constraint(Z >> 0)
+    prob.set_objective('max', (CC | Z))
+    return prob
+
+
+def array_data(n, timer):
+    """
+    LP with ``n`` variables whose data are numpy arrays: the bounds
+    ``lb <= x <= ub`` and the cost ``c`` are ``n``-vectors. The conversion of
+    long columns of data to cvxopt matrices must take a linear time.
+    """
+    rng = np.random.RandomState(0)
+    lb = -rng.rand(n)
+    ub = rng.rand(n)
+    c = pic.new_param('c', rng.randn(n))
+    prob = pic.Problem()
+    x = prob.add_variable('x', n)
+    with timer('add_constraint'):
+        prob.add_constraint(x > lb)
+        prob.add_constraint(x < ub)
+    prob.set_objective('max', (c | x))
+    return prob
+
+
+#: generators by name, with the default sizes of the benchmark
+MODELS = {'optdes': (optdes, [10, 20, 40, 80]),
+          'maxflow': (maxflow, [20, 40, 80, 160]),
+          'multicut': (multicut, [10, 20, 40]),
+          'maxcut': (maxcut, [10, 20, 40]),
+          'complex_maxcut': (complex_maxcut, [4, 8, 12]),
+          'array_data': (array_data, [5000, 10000, 20000, 40000]),
+          }
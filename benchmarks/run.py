@@ -0,0 +1,270 @@
+# coding: utf-8
+"""
+Benchmark of the model build, canonicalization and solve phases of PICOS.
+
+For each model of :mod:`benchmarks.models` and each size, the following
+phases are timed:
+
+ * ``add_constraint`` and ``add_list_of_constraints`` (model build),
+ * ``make_cvxopt_instance`` (canonicalization to the cvxopt format),
+ * ``dualize`` and ``to_real`` (when they apply to the model),
+ * ``write_cbf``, ``write_dat-s``, ``write_lp`` and ``import_cbf``
+   (when the format applies to the model),
+ * ``solve`` (with cvxopt).
+
+The results are written as JSON. For every model and phase, the
+scaling exponent ``a`` of the fit ``time ~ size**a`` (least squares in
+log-log scale) is also reported, so that regressions in the scaling of a
+phase can be detected by comparing two runs::
+
+    python -m benchmarks.run -o before.json
+    # ... change PICOS ...
+    python -m benchmarks.run -o after.json
+    python -m benchmarks.run --compare before.json after.json
+
+Run ``python -m benchmarks.run -h`` for the other options.
+"""
+from __future__ import print_function, division
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import picos as pic
+
+from .models import MODELS
+
+
+class Timer(object):
+    """accumulates the time spent in named phases"""
+
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def __call__(self, phase):
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            self.times[phase] = self.times.get(phase, 0.) + time.time() - t0
+
+
+@contextmanager
+def _quiet():
+    """silences the messages printed by the writers and readers"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def _is_complex(prob):
+    return any(v.vtype in ('hermitian', 'complex')
+               for v in prob.variables.values())
+
+
+def _is_integer(prob):
+    return any(v.vtype in ('binary', 'integer', 'semicont', 'semiint')
+               for v in prob.variables.values())
+
+
+def _file_phases(prob):
+    """the file formats (picos writers) which apply to prob"""
+    formats = ['cbf']
+    if prob.numberSDPConstraints > 0 or prob.numberConeConstraints > 0:
+        formats.append('dat-s')
+    else:
+        formats.append('lp')
+    return formats
+
+
+def run_model(name, n, solve=True, files=True):
+    """
+    times the phases of the model ``name`` at size ``n``,
+    and returns a dict ``{phase: seconds}`` together with some statistics
+    on the problem.
+    """
+    generator = MODELS[name][0]
+    timer = Timer()
+    with timer('build'):
+        prob = generator(n, timer)
+    record = {'model': name, 'size': n,
+              'nvars': prob.numberOfVars, 'ncons': len(prob.constraints),
+              'errors': {}}
+
+    if _is_complex(prob):
+        with timer('to_real'):
+            prob = prob.to_real()
+        record['nvars'] = prob.numberOfVars
+
+    with timer('make_cvxopt_instance'):
+        prob._make_cvxopt_instance()
+    prob.reset_cvxopt_instance()
+
+    if solve and not _is_integer(prob):
+        try:
+            with timer('solve'):
+                sol = prob.solve(solver='cvxopt', verbose=0)
+            record['status'] = sol['status']
+            record['obj'] = prob.obj_value()
+        except Exception as ex:
+            del timer.times['solve']
+            record['errors']['solve'] = repr(ex)
+
+    if files:
+        tmpdir = tempfile.mkdtemp(prefix='picos_bench')
+        try:
+            for fmt in _file_phases(prob):
+                filename = os.path.join(tmpdir, name + '.' + fmt)
+                try:
+                    with timer('write_' + fmt), _quiet():
+                        prob.write_to_file(filename)
+                except Exception as ex:
+                    del timer.times['write_' + fmt]
+                    record['errors']['write_' + fmt] = repr(ex)
+                    continue
+                if fmt == 'cbf':
+                    try:
+                        with timer('import_cbf'), _quiet():
+                            pic.tools.import_cbf(filename)
+                    except Exception as ex:
+                        del timer.times['import_cbf']
+                        record['errors']['import_cbf'] = repr(ex)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    # last, because the dualization modifies the problem
+    if not _is_integer(prob):
+        try:
+            with timer('dualize'):
+                prob.dualize()
+        except Exception as ex:
+            del timer.times['dualize']
+            record['errors']['dualize'] = repr(ex)
+
+    record['times'] = timer.times
+    return record
+
+
+def scaling_exponents(records):
+    """
+    returns ``{model: {phase: a}}``, where ``a`` is the slope of the
+    least squares fit of ``log(time)`` as a function of ``log(size)``.
+    Phases measured at less than two sizes, or faster than 1ms, are skipped.
+    """
+    points = {}
+    for rec in records:
+        for phase, t in rec['times'].items():
+            if t > 1e-3:
+                points.setdefault(rec['model'], {}).setdefault(
+                    phase, []).append((math.log(rec['size']), math.log(t)))
+    exponents = {}
+    for model, phases in points.items():
+        for phase, pts in phases.items():
+            if len(pts) < 2:
+                continue
+            mx = sum(p[0] for p in pts) / len(pts)
+            my = sum(p[1] for p in pts) / len(pts)
+            sxx = sum((p[0] - mx) ** 2 for p in pts)
+            if sxx == 0:
+                continue
+            sxy = sum((p[0] - mx) * (p[1] - my) for p in pts)
+            exponents.setdefault(model, {})[phase] = sxy / sxx
+    return exponents
+
+
+def compare(before, after, tolerance=0.25):
+    """
+    compares the scaling exponents of two result files, and returns the list
+    of ``(model, phase, a_before, a_after)`` for which the exponent
+    increased by more than ``tolerance``.
+    """
+    with open(before) as f:
+        exp_before = json.load(f)['exponents']
+    with open(after) as f:
+        exp_after = json.load(f)['exponents']
+    regressions = []
+    for model in sorted(exp_after):
+        for phase in sorted(exp_after[model]):
+            if phase not in exp_before.get(model, {}):
+                continue
+            a0 = exp_before[model][phase]
+            a1 = exp_after[model][phase]
+            print('{0:16} {1:24} {2:6.2f} -> {3:6.2f}'.format(
+                model, phase, a0, a1))
+            if a1 > a0 + tolerance:
+                regressions.append((model, phase, a0, a1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='benchmark of the model build, canonicalization '
+                    'and solve phases of PICOS')
+    parser.add_argument('-m', '--models', default=','.join(sorted(MODELS)),
+                        help='comma separated list of models (default: all)')
+    parser.add_argument('-s', '--sizes', default=None,
+                        help='comma separated list of sizes '
+                             '(default: the sizes of each model)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='JSON output file (default: stdout)')
+    parser.add_argument('--no-solve', action='store_true',
+                        help='do not time the solve phase')
+    parser.add_argument('--no-files', action='store_true',
+                        help='do not time the file export and import')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare the scaling exponents of two result '
+                             'files, and exit with status 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='tolerated increase of a scaling exponent')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1],
+                              args.tolerance)
+        for (model, phase, a0, a1) in regressions:
+            print('REGRESSION: {0}/{1}: {2:.2f} -> {3:.2f}'.format(
+                model, phase, a0, a1))
+        return 1 if regressions else 0
+
+    records = []
+    for name in args.models.split(','):
+        if name not in MODELS:
+            raise ValueError('unknown model ' + name)
+        if args.sizes:
+            sizes = [int(n) for n in args.sizes.split(',')]
+        else:
+            sizes = MODELS[name][1]
+        for n in sizes:
+            rec = run_model(name, n, solve=not args.no_solve,
+                            files=not args.no_files)
+            print('{0:16} n={1:<6} {2}'.format(
+                name, n, ', '.join('{0}: {1:.3f}s'.format(k, v)
+                                   for k, v in sorted(rec['times'].items()))),
+                  file=sys.stderr)
+            records.append(rec)
+
+    results = {'picos_version': pic.__version__,
+               'python_version': sys.version.split()[0],
+               'records': records,
+               'exponents': scaling_exponents(records)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=1, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -28,7 +28,7 @@
 from .problem import *
 from .expression import *
 from .constraint import *
-from .tools import sum,lse,new_param,diag,diag_vect,geomean,norm,tracepow,trace,detrootn,QuadAsSocpError,NotAppropriateSolverError,NonConvexError,flow_Constraint,ball,simplex,truncated_simplex,partial_trace,partial_transpose,import_cbf,sum_k_largest,sum_k_largest_lambda,lambda_max,sum_k_smallest,sum_k_smallest_lambda,lambda_min
+from .tools import sum,lse,new_param,diag,diag_vect,geomean,norm,norms,tracepow,trace,detrootn,QuadAsSocpError,NotAppropriateSolverError,NonConvexError,flow_Constraint,ball,simplex,truncated_simplex,partial_trace,partial_transpose,import_cbf,import_mps,sum_k_largest,sum_k_largest_lambda,lambda_max,sum_k_smallest,sum_k_smallest_lambda,lambda_min
 
 __all__=['tools','constraint','expression','problem']
 
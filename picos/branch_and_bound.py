@@ -0,0 +1,398 @@
+# coding: utf-8
+
+#-------------------------------------------------------------------
+# Picos 1.1.2.dev : A pyton Interface To Conic Optimization Solvers
+# Copyright (C) 2012  Guillaume Sagnol
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For any information, please contact:
+# Guillaume Sagnol
+# sagnol@zib.de
+# Konrad Zuse Zentrum für Informationstechnik Berlin (ZIB)
+# Takustrasse 7
+# D-14195 Berlin-Dahlem
+# Germany
+#-------------------------------------------------------------------
+
+"""
+Branch and bound for mixed integer conic problems.
+
+The continuous relaxation of the problem is given in the cvxopt ``conelp``
+form::
+
+    minimize    c'x
+    subject to  G x + s = h,  A x = b,  s in K,
+
+together with the list of the columns of ``x`` which must take integer
+values. A node of the tree is the relaxation with bounds
+``lo[j] <= x[j] <= hi[j]`` on the integer columns, which are appended to the
+linear inequalities of the problem. The relaxations are solved by
+``cvxopt.solvers.conelp``, warm-started from the solution of the parent
+node, or by a linear outer approximation of their cones
+(cf. :func:`outer_approximation() <picos.cutting_planes.outer_approximation>`),
+whose pool of cuts is inherited by the children of a node. If this fails,
+the node is solved again by ``conelp`` on its cones, from scratch. The nodes
+of a batch can be solved in parallel in a pool of worker processes
+(cf. :func:`_parallel_map() <picos.tools._parallel_map>`), which receive the
+data of the problem only once, when the pool is created.
+"""
+
+from __future__ import print_function, division
+
+import heapq
+import time
+
+import cvxopt as cvx
+import numpy as np
+
+from .cutting_planes import outer_approximation
+from .tools import _parallel_map, _shift_into_cone, _triplets_to_spmatrix
+
+__all__ = ['branch_and_bound', 'solve_relaxation']
+
+#: the node selection strategies of :func:`branch_and_bound`
+NODE_SELECTIONS = ('best-bound', 'depth-first', 'breadth-first')
+
+# data of the problem in a worker process (cf. _set_node_problem)
+_node_problem = None
+
+
+def solve_relaxation(task):
+    """
+    solves the relaxation of a node, given as the tuple
+    ``(c, G, h, dims, A, b, cols, options, cuts, lo, hi, start)``, where
+    ``cols``, ``lo`` and ``hi`` are the integer columns and their bounds at
+    this node (``-inf`` and ``inf`` stand for no bound), ``options`` is the
+    dictionary of ``cvxopt.solvers.options``, ``cuts`` is ``None`` or the
+    keyword arguments of :func:`outer_approximation()
+    <picos.cutting_planes.outer_approximation>` if the cones are outer
+    approximated, and ``start`` is ``None`` or the data passed by the parent
+    node.
+
+    Returns the tuple ``(status, x, obj, start, rounds, ncuts)``, where
+    ``obj`` is the optimal value of the relaxation (``None`` if it was not
+    solved), ``start`` is the data to pass to the children of this node (the
+    solution, and the pool of cuts), and ``rounds`` and ``ncuts`` are the
+    numbers of LPs solved and of cuts generated for this node (``0`` if
+    ``cuts`` is ``None``).
+    """
+    c, G, h, dims, A, b, cols, options, cuts, lo, hi, start = task
+    cvx.solvers.options.update(options)
+    cvx.solvers.options['show_progress'] = False
+    nx = G.size[1]
+    haslo = np.isfinite(lo)
+    hashi = np.isfinite(hi)
+    nlo = int(haslo.sum())
+    nb = nlo + int(hashi.sum())
+    # rows -x[j] <= -lo[j] and x[j] <= hi[j]
+    B = _triplets_to_spmatrix(
+        np.concatenate([-np.ones(nlo), np.ones(nb - nlo)]), np.arange(nb),
+        np.concatenate([cols[haslo], cols[hashi]]), (nb, nx))
+    hb = np.concatenate([-lo[haslo], hi[hashi]])
+    Gn = cvx.sparse([B, G])
+    hn = cvx.matrix([cvx.matrix(hb, (nb, 1), 'd'), h])
+    dn = {'l': dims['l'] + nb, 'q': dims['q'], 's': dims['s']}
+
+    sol = None
+    try:
+        if cuts is not None:
+            x0, pool = start if start is not None else (None, None)
+            sol = outer_approximation(c, Gn, hn, dn, A, b, cuts=pool,
+                                      start=x0, **cuts)
+        else:
+            primalstart = None
+            if start is not None:
+                # the parent solution, with its slacks (including those of
+                # the new bounds) pushed back into the interior of the cone.
+                # The dual solution of the parent is too close to the
+                # boundary of the cone to be a good starting point.
+                s = hn - Gn * start
+                mu = max(1e-4, 0.1 * float(np.max(np.abs(np.asarray(s)))))
+                _shift_into_cone(s, dn, mu)
+                primalstart = {'x': start, 's': s}
+            sol = cvx.solvers.conelp(c, Gn, hn, dn, A, b,
+                                     primalstart=primalstart)
+    except (ArithmeticError, ValueError):
+        pass
+    rounds, ncuts = 0, 0
+    pool = None
+    if sol is not None:
+        rounds, ncuts = sol.get('cut_rounds', 0), sol.get('cuts', 0)
+        pool = sol.get('cut_pool')
+    if cuts is not None and pool is None and start is not None:
+        pool = start[1]
+    status, x = _node_status(sol)
+    if (x is None and status != 'primal infeasible' and
+            (start is not None or cuts is not None)):
+        # the warm start or the cuts failed: the node is solved again on its
+        # cones, from scratch
+        try:
+            sol = cvx.solvers.conelp(c, Gn, hn, dn, A, b)
+        except (ArithmeticError, ValueError):
+            sol = None
+        status, x = _node_status(sol)
+    if x is None:
+        return status, None, None, None, rounds, ncuts
+    start = x if cuts is None else (x, pool)
+    return (status, np.asarray(x).ravel(), sol['primal objective'],
+            start, rounds, ncuts)
+
+
+def _node_status(sol):
+    """returns the status of the solution ``sol`` of a relaxation and its
+    primal solution ``x``, which is ``None`` if the relaxation was not solved
+    (or if ``sol`` is ``None``, when the solver failed)"""
+    if sol is None:
+        return 'unknown', None
+    status = sol['status']
+    if sol['x'] is None or status not in ('optimal', 'unknown'):
+        return status, None
+    if status == 'unknown' and (sol['primal infeasibility'] is None or
+                                sol['primal infeasibility'] > 1e-5):
+        return status, None
+    return status, sol['x']
+
+
+def _set_node_problem(problem):
+    """initializer of the worker processes, which stores the tuple
+    ``(c, G, h, dims, A, b, cols, options, cuts)`` of the problem"""
+    global _node_problem
+    _node_problem = problem
+
+
+def _solve_node(task):
+    """solves the node ``(lo, hi, start)`` in a worker process"""
+    return solve_relaxation(_node_problem + task)
+
+
+def branch_and_bound(c, G, h, dims, A, b, integers, lower=None, upper=None,
+                     sense=1., offset=0., node_selection='best-bound',
+                     gaplim=1e-4, timelimit=None, nbsol=None,
+                     uboundlimit=None, lboundlimit=None,
+                     acceptable_gap_at_timelimit=None, processes=1,
+                     solver_options=None, cuts=None, inttol=1e-5,
+                     monitor=False, verbose=0):
+    """
+    minimizes ``c'x`` over the points of the cone program ``(G, h, dims, A,
+    b)`` (in the form of ``cvxopt.solvers.conelp``) whose columns
+    ``integers`` take integer values.
+
+    :param lower: lower bounds of the integer columns (``None`` means
+                  ``-inf`` for all of them).
+    :param upper: upper bounds of the integer columns (``None`` means
+                  ``inf``).
+    :param sense: ``1`` or ``-1``, the objective of the problem in the user
+                  space is ``sense * c'x + offset``. The bounds below, and
+                  the bounds reported by the function, are in this space.
+    :param node_selection: ``'best-bound'`` (the node with the smallest bound
+                           of the parent first), ``'depth-first'`` or
+                           ``'breadth-first'``.
+    :param gaplim: the search stops as soon as the relative gap
+                   ``|ub-lb|/(1e-10+|incumbent|)`` between the incumbent and
+                   the best bound is at most this value.
+    :param timelimit: time limit in seconds (``None`` for no limit). It is
+                      checked between two batches of nodes.
+    :param nbsol: the search stops after this number of integer feasible
+                  nodes.
+    :param uboundlimit: the search stops as soon as the upper bound (the
+                        incumbent for a minimization problem, the best bound
+                        for a maximization) is smaller than this value.
+    :param lboundlimit: the search stops as soon as the lower bound is larger
+                        than this value.
+    :param acceptable_gap_at_timelimit: if not ``None``, the search is
+                                        stopped at the time limit only if
+                                        the gap is smaller than this value.
+    :param processes: the number of nodes solved at a time, in as many worker
+                      processes (all the cores of the machine if ``None``).
+    :param solver_options: the dictionary of ``cvxopt.solvers.options`` used
+                           for the relaxations.
+    :param cuts: if not ``None``, a dictionary of keyword arguments of
+                 :func:`outer_approximation()
+                 <picos.cutting_planes.outer_approximation>` (``tol``,
+                 ``maxrounds``, ``lmi``): the relaxations are then solved by
+                 an outer approximation of their cones.
+    :param inttol: integrality tolerance.
+    :param monitor: if ``True``, the returned dictionary contains the list of
+                    triples ``(time, lowerbound, upperbound)`` under the key
+                    ``'bounds_monitor'``.
+
+    Returns a dictionary with the keys ``'status'`` (``'optimal'``,
+    ``'feasible'``, ``'infeasible'``, ``'timelimit'``, ``'solution limit'``,
+    ``'bound limit'`` or ``'unknown'``), ``'x'`` (the incumbent, whose
+    integer columns are rounded, or ``None``), ``'obj'``, ``'bound'``,
+    ``'gap'``, ``'nodes'`` (the number of relaxations solved) and
+    ``'solutions'`` (the number of integer feasible nodes). If ``cuts`` is
+    given, the keys ``'cut_rounds'`` and ``'cuts'`` contain the total numbers
+    of LPs solved and of cuts generated.
+
+    A node whose relaxation could not be solved is pruned, but the bound of
+    its parent is kept in ``'bound'``. If this bound is not within ``gaplim``
+    of the incumbent, the status is ``'feasible'`` instead of ``'optimal'``
+    (or ``'unknown'`` if there is no incumbent).
+    """
+    tstart = time.time()
+    if node_selection not in NODE_SELECTIONS:
+        raise ValueError('node_selection must be one of ' +
+                         ', '.join(NODE_SELECTIONS))
+    if processes is None or processes == 0:
+        import multiprocessing
+        processes = multiprocessing.cpu_count()
+    cols = np.asarray(integers, dtype=int)
+    nint = len(cols)
+    lo = (np.full(nint, -np.inf) if lower is None
+          else np.asarray(lower, dtype=float))
+    hi = (np.full(nint, np.inf) if upper is None
+          else np.asarray(upper, dtype=float))
+
+    def user(v):
+        return sense * v + offset
+
+    def gap(ub, lb):
+        return abs(ub - lb) / (1e-10 + abs(ub))
+
+    # nodes are (key, counter, bound, depth, lo, hi, start), with the bound
+    # of the parent node (in the internal minimization space)
+    nodes = [(0., 0, -np.inf, 0, lo, hi, None)]
+    counter = 1
+    incumbent = None
+    ub = np.inf
+    nsolved = 0
+    nfeasible = 0
+    nfailed = 0
+    # the smallest bound of the parents of the nodes whose relaxation could
+    # not be solved, which is kept as a bound of their pruned subtrees
+    failed_bound = np.inf
+    nrounds = 0
+    ncuts = 0
+    status = None
+    bounds = []
+
+    problem = (c, G, h, dims, A, b, cols, dict(solver_options or {}), cuts)
+    pool = None
+    if processes > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, _set_node_problem, (problem,))
+    try:
+        while nodes:
+            lb = min([nd[2] for nd in nodes] + [failed_bound])
+            if incumbent is not None:
+                lb = min(lb, ub)
+                if gap(user(ub), user(lb)) <= gaplim:
+                    break
+            lower_user, upper_user = sorted([user(lb), user(ub)])
+            if monitor:
+                bounds.append((time.time() - tstart, lower_user, upper_user))
+            if lboundlimit is not None and lower_user > lboundlimit:
+                status = 'bound limit'
+                break
+            if uboundlimit is not None and upper_user < uboundlimit:
+                status = 'bound limit'
+                break
+            if nbsol is not None and nfeasible >= nbsol:
+                status = 'solution limit'
+                break
+            if timelimit is not None and time.time() - tstart > timelimit:
+                if (acceptable_gap_at_timelimit is None or
+                        (incumbent is not None and
+                         gap(user(ub), user(lb)) < acceptable_gap_at_timelimit)):
+                    status = 'timelimit'
+                    break
+
+            # the next batch of nodes whose bound does not exceed the incumbent
+            batch = []
+            while nodes and len(batch) < processes:
+                nd = heapq.heappop(nodes)
+                if incumbent is None or gap(user(ub), user(nd[2])) > gaplim:
+                    if nd[2] < ub:
+                        batch.append(nd)
+            if not batch:
+                continue
+            tasks = [(nd[4], nd[5], nd[6]) for nd in batch]
+            if pool is None or len(tasks) < 2:
+                results = [solve_relaxation(problem + task) for task in tasks]
+            else:
+                results = _parallel_map(_solve_node, tasks, processes, pool)
+            nsolved += len(batch)
+
+            for nd, (st, x, obj, start, rk, ck) in zip(batch, results):
+                nrounds += rk
+                ncuts += ck
+                if x is None:
+                    if st != 'primal infeasible':
+                        nfailed += 1
+                        failed_bound = min(failed_bound, nd[2])
+                    continue
+                if obj >= ub:
+                    continue
+                xi = x[cols]
+                frac = np.abs(xi - np.round(xi))
+                j = int(np.argmax(frac)) if nint else 0
+                if nint == 0 or frac[j] <= inttol:
+                    nfeasible += 1
+                    ub = obj
+                    incumbent = x.copy()
+                    incumbent[cols] = np.round(xi)
+                    if verbose > 0:
+                        print('  node {0}: new incumbent {1:.9e}'.format(
+                            nsolved, user(ub)))
+                    continue
+                # branch on the most fractional column
+                depth = nd[3] + 1
+                for side in (0, 1):
+                    clo, chi = nd[4].copy(), nd[5].copy()
+                    if side == 0:
+                        chi[j] = np.floor(xi[j])
+                    else:
+                        clo[j] = np.ceil(xi[j])
+                    if clo[j] > chi[j]:
+                        continue
+                    if node_selection == 'best-bound':
+                        key = obj
+                    elif node_selection == 'depth-first':
+                        key = -depth
+                    else:
+                        key = depth
+                    heapq.heappush(nodes, (key, counter, obj, depth, clo, chi,
+                                           start))
+                    counter += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    lb = min([nd[2] for nd in nodes] + [ub, failed_bound])
+    if status is None:
+        if incumbent is None:
+            status = 'unknown' if nfailed else 'infeasible'
+        elif failed_bound < ub and gap(user(ub), user(lb)) > gaplim:
+            # the optimality of the incumbent is not proven
+            status = 'feasible'
+        else:
+            status = 'optimal'
+    sol = {'status': status,
+           'x': incumbent,
+           'obj': user(ub) if incumbent is not None else None,
+           'bound': user(lb),
+           'gap': (gap(user(ub), user(lb)) if incumbent is not None
+                   else None),
+           'nodes': nsolved,
+           'solutions': nfeasible,
+           'time': time.time() - tstart}
+    if cuts is not None:
+        sol['cut_rounds'] = nrounds
+        sol['cuts'] = ncuts
+    if monitor:
+        sol['bounds_monitor'] = bounds
+    return sol
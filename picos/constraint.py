@@ -31,11 +31,13 @@ from __future__ import division
 import cvxopt as cvx
 import numpy as np
 import sys
+import six
 
 from .tools import *
 
 __all__ = [
     'Constraint',
+    '_Reformulation',
     '_Convex_Constraint',
     'Flow_Constraint',
     'GeoMeanConstraint',
@@ -51,6 +53,12 @@ class Constraint(object):
     """A class for describing a constraint.
     """
 
+    __slots__ = ('typeOfConstraint', 'Exp1', 'Exp2', 'Exp3', 'Id',
+                 'dualVariable', 'semidefVar',
+                 'exp1ConeVar', 'exp2ConeVar', 'exp3ConeVar',
+                 'boundCons', 'key', 'myconstring', 'myfullconstring',
+                 '_passed', 'coneSizes', '_cones')
+
     def __init__(
             self,
             typeOfConstraint,
@@ -59,7 +67,8 @@ class Constraint(object):
             Exp2,
             Exp3=None,
             dualVariable=None,
-            key=None):
+            key=None,
+            coneSizes=None):
         from .expression import AffinExp
         self.typeOfConstraint = typeOfConstraint
         u"""A string from the following values,
@@ -70,6 +79,13 @@ class Constraint(object):
                         * ``SOcone`` : Second Order Cone constraint ``||Exp1|| < Exp2``.
                         * ``RScone`` : Rotated Cone constraint
                           ``||Exp1||**2 < Exp2 * Exp3``.
+                        * ``SOcones`` or ``RScones`` : block of second order
+                          cone (or rotated cone) constraints: the column vector
+                          ``Exp1`` stacks the lhs of the cones (cf.
+                          :attr:`coneSizes<picos.Constraint.coneSizes>`), and
+                          the ``k`` th cone is
+                          ``||Exp1[cone k]|| < Exp2[k]`` (or
+                          ``||Exp1[cone k]||**2 < Exp2[k] * Exp3[k]``).
                         * ``lse`` : Geometric Programming constraint ``LogSumExp(Exp1)<0``
                         * ``quad``: scalar quadratic constraint ``Exp1 < 0``.
                         * ``sdp<`` or ``sdp>``: semidefinite constraint
@@ -104,16 +120,34 @@ class Constraint(object):
         # workaround to redefine complete constraint (with # ... #) string
         self.myfullconstring = None
 
-        self.passed = []
-        """list of solvers to which this constraints was already passed"""
+        self._passed = None  # created on first access
+
+        self.coneSizes = None
+        """for a block of cones, array of the sizes of the lhs of the cones"""
+        self._cones = None  # single cones of a block, created on first access
 
-        if typeOfConstraint == 'RScone' and Exp3 is None:
+        if typeOfConstraint in ('RScone', 'RScones') and Exp3 is None:
             raise NameError('I need a 3d expression')
         if typeOfConstraint[:3] == 'lin':
             if Exp1.size != Exp2.size:
                 raise NameError('incoherent lhs and rhs')
             # are there some bound constrainta ?
 
+        if typeOfConstraint[2:] == 'cones':
+            ncones = Exp2.size[0] * Exp2.size[1]
+            nlhs = Exp1.size[0] * Exp1.size[1]
+            if coneSizes is None:
+                if ncones == 0 or nlhs % ncones:
+                    raise NameError('incoherent sizes of the cones')
+                coneSizes = [nlhs // ncones] * ncones
+            self.coneSizes = np.array(coneSizes, dtype=int)
+            if (len(self.coneSizes) != ncones or
+                    self.coneSizes.sum() != nlhs):
+                raise NameError('incoherent sizes of the cones')
+            if not Exp3 is None:
+                if Exp3.size[0] * Exp3.size[1] != ncones:
+                    raise NameError('incoherent sizes of the cones')
+
         if typeOfConstraint[2:] == 'cone':
             if Exp2.size != (1, 1):
                 raise NameError('expression on the rhs should be scalar')
@@ -187,6 +221,46 @@ class Constraint(object):
                     raise Exception(
                         "X>>0 with X of vtype complex. Use vtype='hermitian' instead")
 
+    @property
+    def passed(self):
+        """list of solvers to which this constraints was already passed"""
+        if self._passed is None:
+            self._passed = []
+        return self._passed
+
+    @passed.setter
+    def passed(self, value):
+        self._passed = value
+
+    def cones(self):
+        """
+        returns the list of the single cone constraints of a block of cones
+        (constraint of type ``SOcones`` or ``RScones``), which are passed to
+        the solvers handling one cone per constraint.
+        """
+        if self._cones is None:
+            tp = self.typeOfConstraint[:-1]
+            ends = np.cumsum(self.coneSizes)
+            self._cones = []
+            for k, (ns, ne) in enumerate(zip(ends - self.coneSizes, ends)):
+                E3 = None if self.Exp3 is None else self.Exp3[k]
+                self._cones.append(Constraint(tp, None,
+                                              self.Exp1[int(ns):int(ne)],
+                                              self.Exp2[k], E3))
+        return self._cones
+
+    def _block_dual(self, duals):
+        """
+        returns the dual of a block of cones, given the list of the duals of its
+        cones: a matrix with one column per cone if the cones have the same
+        size, or the list of the duals otherwise.
+        """
+        if any(du is None for du in duals):
+            return None
+        if len(set(len(du) for du in duals)) == 1:
+            return cvx.matrix([[du] for du in duals])
+        return duals
+
     def __str__(self):
         if not(self.myfullconstring is None):
             return self.myfullconstring
@@ -199,6 +273,11 @@ class Constraint(object):
         if self.typeOfConstraint == 'RScone':
             constr = '# ({0}x{1})-Rotated SOC constraint '.format(
                 self.Exp1.size[0], self.Exp1.size[1])
+        if self.typeOfConstraint == 'SOcones':
+            constr = '# {0} SOC constraints '.format(len(self.coneSizes))
+        if self.typeOfConstraint == 'RScones':
+            constr = '# {0} Rotated SOC constraints '.format(
+                len(self.coneSizes))
         if self.typeOfConstraint == 'lse':
             constr = '# ({0}x{1})-Geometric Programming constraint '.format(
                 self.Exp1.size[0], self.Exp1.size[1])
@@ -222,6 +301,11 @@ class Constraint(object):
         if self.typeOfConstraint == 'RScone':
             constr = '# ({0}x{1})-Rotated SOC constraint: '.format(
                 self.Exp1.size[0], self.Exp1.size[1])
+        if self.typeOfConstraint == 'SOcones':
+            constr = '# {0} SOC constraints: '.format(len(self.coneSizes))
+        if self.typeOfConstraint == 'RScones':
+            constr = '# {0} Rotated SOC constraints: '.format(
+                len(self.coneSizes))
         if self.typeOfConstraint == 'lse':
             constr = '# ({0}x{1})-Geometric Programming constraint '.format(
                 self.Exp1.size[0], self.Exp1.size[1])
@@ -270,6 +354,13 @@ class Constraint(object):
             else:
                 return retstr + ' < ( ' + \
                     self.Exp2.affstring() + ')( ' + self.Exp3.affstring() + ')'
+        if self.typeOfConstraint == 'SOcones':
+            return '||' + self.Exp1.affstring() + '[cone k]|| < ' + \
+                self.Exp2.affstring() + '[k] for all k'
+        if self.typeOfConstraint == 'RScones':
+            return '||' + self.Exp1.affstring() + '[cone k]||^2 < ' + \
+                self.Exp2.affstring() + '[k]*' + self.Exp3.affstring() + \
+                '[k] for all k'
         if self.typeOfConstraint == 'lse':
             return 'LSE[ ' + self.Exp1.affstring() + ' ] < 0'
         if self.typeOfConstraint == 'quad':
@@ -339,6 +430,16 @@ class Constraint(object):
             return self.Exp1.eval() - self.Exp2.eval()
         elif self.typeOfConstraint == 'lin=':
             return self.Exp1.eval() - self.Exp2.eval()
+        elif self.typeOfConstraint[2:] == 'cones':
+            ncones = len(self.coneSizes)
+            e1 = np.asarray(self.Exp1.eval()).ravel()
+            sq = np.bincount(np.repeat(np.arange(ncones), self.coneSizes),
+                             weights=e1 * e1, minlength=ncones)
+            e2 = np.asarray(self.Exp2.eval()).ravel()
+            if self.typeOfConstraint == 'SOcones':
+                return cvx.matrix(e2 - np.sqrt(sq))
+            e3 = np.asarray(self.Exp3.eval()).ravel()
+            return cvx.matrix(e2 * e3 - sq)
         elif self.typeOfConstraint == 'SOcone':
             return self.Exp2.eval() - (abs(self.Exp1)).eval()
         elif self.typeOfConstraint == 'RScone':
@@ -362,6 +463,68 @@ class Constraint(object):
            """
 
 
+class _Reformulation(object):
+    """
+    A lightweight container for the reformulation of a nonstandard convex
+    constraint, which records the auxiliary variables and the (standard)
+    constraints of the reformulation.
+    It provides the part of the interface of :class:`Problem <picos.Problem>`
+    used to build the reformulations (``add_variable``, ``add_constraint``
+    and ``remove_variable``), but the auxiliary variables are not attached
+    to a problem: their names and indices are set when the host problem
+    adopts them (cf. :func:`Problem.add_constraint() <picos.Problem.add_constraint>`),
+    and a nested reformulation is merged by extending the lists.
+
+    The recorded constraints are ordinary :class:`Constraint` objects, not
+    canonical cone rows: the host problem adds them one by one, and each
+    solver interface canonicalizes them like the other constraints. The
+    container only saves the throwaway :class:`Problem <picos.Problem>` and
+    the copies of the auxiliary variables.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.varNames = []
+        self.constraints = []
+        self.countGeomean = 0
+
+    def add_variable(self, name, size=1, vtype='continuous',
+                     lower=None, upper=None):
+        from .expression import Variable
+        if name in self.variables:
+            raise Exception('this variable already exists')
+        if isinstance(size, six.integer_types):
+            size = (int(size), 1)
+        else:
+            size = tuple(int(x) for x in size)
+        if len(size) == 1:
+            size = (size[0], 1)
+        var = Variable(None, name, size, len(self.varNames), 0,
+                       vtype=vtype, lower=lower, upper=upper)
+        self.variables[name] = var
+        self.varNames.append(name)
+        return var
+
+    def remove_variable(self, name):
+        del self.variables[name]
+        self.varNames.remove(name)
+
+    def add_constraint(self, cons, key=None, ret=False):
+        if isinstance(cons, _Convex_Constraint):
+            prefix = cons.prefix + str(self.countGeomean) + '_'
+            for name in cons.Ptmp.varNames:
+                var = cons.Ptmp.variables[name]
+                var.name = prefix + name
+                self.variables[var.name] = var
+                self.varNames.append(var.name)
+            self.constraints.extend(cons.Ptmp.constraints)
+            self.countGeomean += 1
+        else:
+            self.constraints.append(cons)
+        if ret:
+            return cons
+
+
 class _Convex_Constraint(Constraint):
     """A parent class for all (nonstandard) convex constraints handled by PICOS"""
 
@@ -376,6 +539,22 @@ class _Convex_Constraint(Constraint):
     def __repr__(self):
         return '# ' + self.constypestr + ' : ' + self.constring() + '#'
 
+    def cone_count(self):
+        """returns a dict with the number of second order cones
+        (``'SOcone'``), rotated second order cones (``'RScone'``)
+        and LMIs (``'sdp'``) of the reformulation of the constraint.
+        Blocks of cones count for their number of cones.
+        """
+        count = {'SOcone': 0, 'RScone': 0, 'sdp': 0}
+        for cs in self.Ptmp.constraints:
+            if cs.typeOfConstraint[2:] == 'cone':
+                count[cs.typeOfConstraint] += 1
+            elif cs.typeOfConstraint[2:] == 'cones':
+                count[cs.typeOfConstraint[:-1]] += len(cs.coneSizes)
+            elif cs.typeOfConstraint[:3] == 'sdp':
+                count['sdp'] += 1
+        return count
+
 
 class Flow_Constraint(_Convex_Constraint):
     """ A temporary object used to pass a flow constraint.
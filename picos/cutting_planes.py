@@ -0,0 +1,385 @@
+# coding: utf-8
+
+#-------------------------------------------------------------------
+# Picos 1.1.2.dev : A pyton Interface To Conic Optimization Solvers
+# Copyright (C) 2012  Guillaume Sagnol
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For any information, please contact:
+# Guillaume Sagnol
+# sagnol@zib.de
+# Konrad Zuse Zentrum für Informationstechnik Berlin (ZIB)
+# Takustrasse 7
+# D-14195 Berlin-Dahlem
+# Germany
+#-------------------------------------------------------------------
+
+
+"""
+Outer approximation of the cones of a conic problem by cutting planes.
+
+The problem is given in the cvxopt ``conelp`` form::
+
+    minimize    c'x
+    subject to  G x + s = h,  A x = b,  s in K.
+
+The second order cones of ``K`` (and optionally its semidefinite cones) are
+replaced by a polyhedral outer approximation ``W s >= 0``, where each row of
+``W`` is a vector of the dual cone. The LP (or the SDP if only the second
+order cones are cut) is solved by ``cvxopt.solvers.conelp``, and the cones
+violated by its solution are separated by the cuts
+
+* ``s0 - u's1 >= 0``, with ``u = s1/||s1||``, for a second order cone
+  ``s0 >= ||s1||``,
+* ``v'Sv >= 0``, for an eigenvector ``v`` of a negative eigenvalue of ``S``,
+  for a semidefinite cone ``S >> 0``,
+
+which are appended to the LP before it is solved again, from the previous
+solution. Since ``W`` is a nonnegative combination of vectors of the dual
+cone, the dual solution of the LP is mapped to a dual solution of the
+original problem. If the cuts do not converge, the problem is solved on its
+cones.
+
+Each round is warm-started from the solution of the previous round, whose
+slacks (including those of the new cuts) are pushed back into the interior
+of the cone. cvxopt solves the LPs by the same interior point method as the
+cones, and a warm start only saves a few of its iterations, so that the
+outer approximation is usually slower than a direct call to ``conelp``, by a
+factor which grows with the number of rounds.
+"""
+
+from __future__ import print_function, division
+
+import cvxopt as cvx
+import numpy as np
+
+from .tools import _shift_into_cone, _triplets_to_spmatrix
+
+__all__ = ['outer_approximation', 'initial_cuts', 'separate']
+
+#: the density above which the constraint matrix of a relaxation is passed as
+#: a dense matrix to cvxopt (cf. :func:`_lp_matrix`)
+DENSE_LP = 0.1
+
+
+def _cut_rows(dims, lmi):
+    """number of rows of the cones of ``dims`` which are cut"""
+    n = int(np.sum(dims['q']))
+    if lmi:
+        n += int(np.sum([m * m for m in dims['s']]))
+    return n
+
+
+def initial_cuts(dims, lmi=False):
+    """
+    returns the matrix ``W`` of the initial outer approximation ``W s >= 0``
+    of the cones of ``dims`` (without their linear part), that is
+    ``s0 >= |si|`` for the second order cones, and, if ``lmi`` is ``True``,
+    ``Sii >= 0`` and ``Sii + Sjj +- 2 Sij >= 0`` for the semidefinite cones.
+    The entries of ``W`` for a semidefinite cone refer to its lower triangle.
+    """
+    I, J, V = [], [], []
+    nrows, k = 0, 0
+    for m in dims['q']:
+        # s0 >= 0, s0 +- si >= 0
+        I.append(np.arange(2 * m - 1) + nrows)
+        J.append(np.full(2 * m - 1, k))
+        V.append(np.ones(2 * m - 1))
+        I.append(np.arange(1, 2 * m - 1) + nrows)
+        J.append(k + np.repeat(np.arange(1, m), 2))
+        V.append(np.tile([1., -1.], m - 1))
+        nrows += 2 * m - 1
+        k += m
+    if lmi:
+        for m in dims['s']:
+            diag = k + np.arange(m) * (m + 1)
+            I.append(np.arange(m) + nrows)
+            J.append(diag)
+            V.append(np.ones(m))
+            nrows += m
+            jj, ii = np.tril_indices(m, -1)
+            jj, ii = ii, jj
+            npairs = len(ii)
+            for sign in (1., -1.):
+                rows = np.arange(npairs) + nrows
+                I.extend([rows, rows, rows])
+                J.extend([diag[ii], diag[jj], k + ii + jj * m])
+                V.extend([np.ones(npairs), np.ones(npairs),
+                          np.full(npairs, 2 * sign)])
+                nrows += npairs
+            k += m * m
+    if not I:
+        return cvx.spmatrix([], [], [], (0, k), tc='d')
+    return _triplets_to_spmatrix(np.concatenate(V), np.concatenate(I),
+                                 np.concatenate(J), (nrows, k))
+
+
+def separate(s, dims, tol=1e-6, lmi=False):
+    """
+    separates the slack ``s`` of the cones of ``dims`` (without their linear
+    part) from the cones.
+
+    Returns ``(W, viol)``, where ``viol`` is the largest violation of a cone
+    (``||s1||-s0`` for a second order cone, minus the smallest eigenvalue for a
+    semidefinite cone), and ``W`` is the matrix of the cuts ``W s >= 0`` of the
+    cones violated by more than ``tol`` (``None`` if there is none).
+    """
+    s = np.asarray(s, dtype=float).ravel()
+    I, J, V = [], [], []
+    viol = -np.inf
+    ncuts = 0
+    q = np.asarray(dims['q'], dtype=int)
+    k = int(q.sum())
+    if len(q):
+        starts = np.cumsum(q) - q
+        sq = s[:k] ** 2
+        sq[starts] = 0.
+        nrm = np.sqrt(np.add.reduceat(sq, starts))
+        v = nrm - s[starts]
+        viol = float(v.max())
+        cut = np.flatnonzero((v > tol) & (nrm > 0))
+        if len(cut):
+            m = q[cut]
+            local = np.arange(m.sum()) - np.repeat(np.cumsum(m) - m, m)
+            cols = np.repeat(starts[cut], m) + local
+            vals = -s[cols] / np.repeat(nrm[cut], m)
+            vals[local == 0] = 1.
+            I.append(np.repeat(np.arange(len(cut)), m))
+            J.append(cols)
+            V.append(vals)
+            ncuts = len(cut)
+    if lmi:
+        for m in dims['s']:
+            S = s[k:k + m * m].reshape((m, m), order='F')
+            w, U = np.linalg.eigh(np.tril(S) + np.tril(S, -1).T)
+            viol = max(viol, -float(w[0]))
+            jj, ii = np.tril_indices(m)
+            jj, ii = ii, jj
+            for i in np.flatnonzero(w < -tol):
+                u = U[:, i]
+                # v'Sv, on the lower triangle of S
+                I.append(np.full(len(ii), ncuts))
+                J.append(k + ii + jj * m)
+                V.append(np.where(ii == jj, 1., 2.) * u[ii] * u[jj])
+                ncuts += 1
+            k += m * m
+    if not ncuts:
+        return None, viol
+    return (_triplets_to_spmatrix(np.concatenate(V), np.concatenate(I),
+                                  np.concatenate(J), (ncuts, len(s))),
+            viol)
+
+
+def _cone_dual(W, z, dims, lmi):
+    """maps the dual ``z`` of the cuts ``W s >= 0`` to the cones, with
+    symmetric semidefinite blocks"""
+    zc = W.T * z
+    if lmi:
+        k = int(np.sum(dims['q']))
+        for m in dims['s']:
+            Z = np.asarray(zc[k:k + m * m]).reshape((m, m), order='F')
+            Z = np.tril(Z, -1)
+            Z = 0.5 * (Z + Z.T) + np.diag(np.asarray(
+                zc[k:k + m * m:m + 1]).ravel())
+            zc[k:k + m * m] = cvx.matrix(Z.ravel(order='F'))
+            k += m * m
+    return zc
+
+
+def _lp_matrix(G):
+    """returns ``G`` as a dense matrix if it has enough nonzeros, as the rows
+    of the cuts often have. The KKT solver of cvxopt for LPs scales the rows
+    of a sparse ``G`` at each iteration in a time quadratic in the length of
+    its columns, which dominates the solve of the relaxations otherwise."""
+    m, n = G.size
+    if isinstance(G, cvx.spmatrix) and len(G.V) > DENSE_LP * m * n:
+        return cvx.matrix(G)
+    return G
+
+
+def _near_optimal(sol, tol):
+    """returns ``True`` if the primal and dual residuals and the gap of the
+    solution ``sol`` of ``cvxopt.solvers.conelp`` are at most ``tol`` (as for
+    the solutions with the status ``'unknown'`` whose last iterate is only
+    slightly less accurate than the tolerances of cvxopt)"""
+    res = [sol.get('primal infeasibility'), sol.get('dual infeasibility')]
+    if None in res or max(res) > tol:
+        return False
+    gaps = [g for g in (sol.get('gap'), sol.get('relative gap'))
+            if g is not None]
+    return bool(gaps) and min(abs(g) for g in gaps) <= tol
+
+
+def outer_approximation(c, G, h, dims, A=None, b=None, tol=1e-6,
+                        maxrounds=100, lmi=False, cuts=None, start=None,
+                        fallback=True, verbose=0):
+    """
+    solves the problem ``(c, G, h, dims, A, b)`` (in the form of
+    ``cvxopt.solvers.conelp``) by a linear outer approximation of its second
+    order cones, and of its semidefinite cones if ``lmi`` is ``True``
+    (otherwise they are kept in the relaxations).
+
+    :param tol: the cuts are added until the violation of the cones by the
+                solution of the relaxation is at most ``tol``.
+    :param maxrounds: the maximal number of relaxations solved.
+    :param cuts: the matrix ``W`` of a first outer approximation
+                 ``W s >= 0`` of the cones, for example the pool of cuts
+                 returned by a previous call for the same cones. By default,
+                 the approximation of :func:`initial_cuts` is used.
+    :param start: a primal point, from which the first relaxation is
+                  warm-started.
+    :param fallback: if ``True``, the problem is solved by
+                     ``cvxopt.solvers.conelp`` on its cones when the cuts
+                     did not converge.
+
+    Returns the dictionary returned by ``cvxopt.solvers.conelp`` for the last
+    relaxation, where ``'s'`` and ``'z'`` are given for the original cones
+    (the dual of the cuts is mapped to the cones), with the additional keys
+    ``'cut_rounds'`` (number of relaxations solved), ``'cuts'`` (number of
+    cuts generated), ``'cone violation'`` and ``'cut_pool'`` (the matrix
+    ``W`` of all the cuts) and ``'cut_message'`` (the reason why the loop
+    stopped). If the cone violation is still larger than ``tol`` after
+    ``maxrounds`` relaxations, or if a relaxation could not be solved, the
+    problem is solved on its cones if ``fallback`` is ``True``, and the
+    dictionary of ``conelp`` is returned with the same additional keys.
+    Otherwise, the status is then ``'unknown'``. A relaxation whose status is ``'unknown'`` is solved
+    again without the warm start, and its solution is accepted as optimal
+    if its residuals and its gap are at most ``tol`` (cf.
+    :func:`_near_optimal`).
+    """
+    l = dims['l']
+    nc = _cut_rows(dims, lmi)
+    sdims = [] if lmi else list(dims['s'])
+    if A is None:
+        A = cvx.spmatrix([], [], [], (0, G.size[1]), tc='d')
+        b = cvx.matrix([], (0, 1), tc='d')
+    Gl, hl = G[:l, :], h[:l]
+    Gc, hc = G[l:l + nc, :], h[l:l + nc]
+    Gr, hr = G[l + nc:, :], h[l + nc:]
+    W = cuts if cuts is not None else initial_cuts(dims, lmi)
+    npool = cuts.size[0] if cuts is not None else 0
+    Gw, hw = W * Gc, W * hc
+
+    show = cvx.solvers.options.get('show_progress', True)
+    cvx.solvers.options['show_progress'] = False
+    rounds = 0
+    viol = None
+    converged = False
+    try:
+        while True:
+            rounds += 1
+            Gk = _lp_matrix(cvx.sparse([Gl, Gw, Gr]))
+            hk = cvx.matrix([hl, hw, hr])
+            dk = {'l': l + W.size[0], 'q': [], 's': sdims}
+            primalstart = None
+            if start is not None:
+                s = hk - Gk * start
+                mu = max(1e-4, 0.1 * float(np.max(np.abs(np.asarray(s)))))
+                _shift_into_cone(s, dk, mu)
+                primalstart = {'x': start, 's': s}
+            sol = cvx.solvers.conelp(c, Gk, hk, dk, A, b,
+                                     primalstart=primalstart)
+            if (sol['status'] == 'unknown' and primalstart is not None
+                    and not _near_optimal(sol, tol)):
+                # the warm start may have led the solver astray
+                sol = cvx.solvers.conelp(c, Gk, hk, dk, A, b)
+            Wk = W
+            status = sol['status']
+            x = sol['x']
+            if status == 'primal infeasible':
+                converged = True
+                message = 'the relaxation is primal infeasible'
+                break
+            if x is None:
+                message = ('the relaxation of round {0} was not solved '
+                           '(status {1})'.format(rounds, status))
+                break
+            if status == 'dual infeasible':
+                # x is a ray of the relaxation, which is cut off if it is
+                # not a ray of the cones
+                sc = -(Gc * x)
+                scale = max(1., float(np.max(np.abs(np.asarray(sc)))))
+                Wn, viol = separate(sc, dims, tol * scale, lmi)
+                start = None
+            else:
+                Wn, viol = separate(hc - Gc * x, dims, tol, lmi)
+                start = x
+            if verbose > 0:
+                print('  round {0}: {1} cuts, {2}, cone violation '
+                      '{3:.2e}'.format(rounds, W.size[0], status, viol))
+            if Wn is None:
+                if status == 'unknown':
+                    converged = _near_optimal(sol, tol)
+                    if converged:
+                        status = 'optimal'
+                    message = ('the cones are satisfied, but the residuals '
+                               'of the relaxation are too large')
+                else:
+                    converged = True
+                if converged:
+                    message = 'the cones are satisfied'
+                break
+            W = cvx.sparse([W, Wn])
+            Gw = cvx.sparse([Gw, Wn * Gc])
+            hw = cvx.matrix([hw, Wn * hc])
+            if rounds >= maxrounds:
+                message = 'the maximal number of rounds is reached'
+                break
+        cone_sol = None
+        if not converged and fallback:
+            try:
+                cone_sol = cvx.solvers.conelp(c, G, h, dims, A, b)
+            except (ArithmeticError, ValueError):
+                pass
+            if cone_sol is not None and cone_sol['x'] is None:
+                cone_sol = None
+    finally:
+        cvx.solvers.options['show_progress'] = show
+    if cone_sol is not None:
+        message += ', the problem is solved on its cones'
+    if verbose > 0:
+        print('  ' + message)
+
+    if cone_sol is not None:
+        sol = dict(cone_sol)
+        sol['cut_rounds'] = rounds
+        sol['cuts'] = W.size[0] - npool
+        sol['cone violation'] = separate(hc - Gc * sol['x'], dims, tol,
+                                         lmi)[1]
+        sol['cut_pool'] = W
+        sol['cut_message'] = message
+        return sol
+
+    sol = dict(sol)
+    sol['status'] = status
+    nl = l + Wk.size[0]
+    if sol['z'] is not None:
+        z = sol['z']
+        sol['z'] = cvx.matrix([z[:l], _cone_dual(Wk, z[l:nl], dims, lmi),
+                               z[nl:]])
+    if x is not None:
+        sol['s'] = (-(G * x) if status == 'dual infeasible'
+                    else h - G * x)
+    if not converged:
+        sol['status'] = 'unknown'
+        if viol is not None:
+            sol['primal infeasibility'] = max(
+                sol['primal infeasibility'] or 0., viol)
+    sol['cut_rounds'] = rounds
+    sol['cuts'] = W.size[0] - npool
+    sol['cone violation'] = viol
+    sol['cut_pool'] = W
+    sol['cut_message'] = message
+    return sol
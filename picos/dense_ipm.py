@@ -0,0 +1,429 @@
+# coding: utf-8
+
+#-------------------------------------------------------------------
+# Picos 1.1.2.dev : A pyton Interface To Conic Optimization Solvers
+# Copyright (C) 2012  Guillaume Sagnol
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For any information, please contact:
+# Guillaume Sagnol
+# sagnol@zib.de
+# Konrad Zuse Zentrum für Informationstechnik Berlin (ZIB)
+# Takustrasse 7
+# D-14195 Berlin-Dahlem
+# Germany
+#-------------------------------------------------------------------
+
+"""
+Dense primal-dual interior point method for small conic problems.
+
+The problem is given in the cvxopt ``conelp`` form::
+
+    minimize    c'x
+    subject to  G x + s = h,  A x = b,  s in K,
+
+where ``K`` is a product of a nonnegative orthant (``dims['l']``),
+second order cones (sizes ``dims['q']``) and semidefinite cones
+(orders ``dims['s']``). Contrarily to cvxopt, the semidefinite blocks of
+``G``, ``h``, ``s`` and ``z`` are stored in svec form
+(lower triangle, column by column, off-diagonal entries scaled by sqrt(2)),
+so that all the cones are handled with the euclidean inner product.
+
+The method is a Mehrotra predictor-corrector algorithm with
+Nesterov-Todd scaling and an infeasible starting point (as in
+``cvxopt.solvers.conelp``, but without the self-dual embedding, so that
+infeasibility is not detected). All the arrays are dense numpy arrays and
+the KKT system is reduced and solved with dense factorizations, which is much
+faster than the general sparse machinery for problems with a few tens of
+variables.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+
+__all__ = ['dense_conelp', 'svec_lower_indices']
+
+_svec_cache = {}
+
+
+def svec_lower_indices(n):
+    """
+    returns the arrays ``(r, c, w)`` of the svec form of a ``n x n``
+    symmetric matrix: the kth element of the svec is ``w[k]*M[r[k],c[k]]``.
+    """
+    if n not in _svec_cache:
+        c, r = np.triu_indices(n)
+        w = np.where(r == c, 1., np.sqrt(2))
+        _svec_cache[n] = (r, c, w, np.where(r == c, 0.5, 1. / w))
+    return _svec_cache[n][:3]
+
+
+def _smat(v, n):
+    r, c, w = svec_lower_indices(n)
+    M = np.empty((n, n))
+    M[r, c] = v / w
+    M[c, r] = v / w
+    return M
+
+
+def _svec(M):
+    r, c, w = svec_lower_indices(M.shape[0])
+    return M[r, c] * w
+
+
+def _congruence(M):
+    """matrix of the map svec(X) -> svec(M*X*M.T)"""
+    n = M.shape[0]
+    r, c, w = svec_lower_indices(n)
+    coef = _svec_cache[n][3]
+    Mr, Mc = M[r], M[c]
+    return (w[:, np.newaxis] * coef *
+            (Mr[:, r] * Mc[:, c] + Mr[:, c] * Mc[:, r]))
+
+
+def _smallest_positive_root(a, b, c):
+    """the smallest positive root of a*t^2 + b*t + c (c > 0), or inf"""
+    roots = []
+    if a == 0:
+        if b != 0:
+            roots.append(-c / b)
+    else:
+        disc = b * b - 4 * a * c
+        if disc >= 0:
+            q = -0.5 * (b + np.copysign(np.sqrt(disc), b))
+            roots.append(q / a)
+            if q != 0:
+                roots.append(c / q)
+    roots = [r for r in roots if r > 0]
+    return min(roots) if roots else np.inf
+
+
+class _Cones(object):
+    """operations on the product cone K described by ``dims``"""
+
+    def __init__(self, dims):
+        self.l = dims['l']
+        self.q = list(dims['q'])
+        self.s = list(dims['s'])
+        self.blocks = []
+        ofs = self.l
+        for k in self.q:
+            self.blocks.append(('q', slice(ofs, ofs + k), k))
+            ofs += k
+        for n in self.s:
+            nv = n * (n + 1) // 2
+            self.blocks.append(('s', slice(ofs, ofs + nv), n))
+            ofs += nv
+        self.m = ofs
+        self.degree = self.l + len(self.q) + sum(self.s)
+
+    def identity(self):
+        e = np.zeros(self.m)
+        e[:self.l] = 1.
+        for (typ, sl, k) in self.blocks:
+            if typ == 'q':
+                e[sl.start] = 1.
+            else:
+                e[sl] = _svec(np.eye(k))
+        return e
+
+    def min_eig(self, u):
+        """the smallest eigenvalue of u (negative if u is not in K)"""
+        vals = [np.min(u[:self.l])] if self.l else []
+        for (typ, sl, k) in self.blocks:
+            v = u[sl]
+            if typ == 'q':
+                vals.append(v[0] - np.linalg.norm(v[1:]))
+            else:
+                vals.append(np.linalg.eigvalsh(_smat(v, k))[0])
+        return min(vals)
+
+    def max_step(self, u, du):
+        """
+        the largest t such that u + t*du is in K, or inf, where u is in the
+        interior of K and its semidefinite blocks are diagonal (as ``lmbda``)
+        """
+        t = np.inf
+        if self.l:
+            rmin = (du[:self.l] / u[:self.l]).min()
+            if rmin < 0:
+                t = -1. / rmin
+        for (typ, sl, k) in self.blocks:
+            v, dv = u[sl], du[sl]
+            if typ == 'q':
+                # (v0+t*dv0)^2 - ||v1+t*dv1||^2 >= 0 and v0+t*dv0 >= 0
+                a = dv[0]**2 - dv[1:].dot(dv[1:])
+                b = 2 * (v[0] * dv[0] - v[1:].dot(dv[1:]))
+                c = v[0]**2 - v[1:].dot(v[1:])
+                t = min(t, _smallest_positive_root(a, b, c))
+                if dv[0] < 0:
+                    t = min(t, -v[0] / dv[0])
+            else:
+                r, c, w = svec_lower_indices(k)
+                d = 1. / np.sqrt(v[r == c])
+                lmin = np.linalg.eigvalsh(
+                    _smat(dv, k) * d[:, np.newaxis] * d)[0]
+                if lmin < 0:
+                    t = min(t, -1. / lmin)
+        return t
+
+    def prod(self, u, v):
+        """Jordan product u o v"""
+        w = np.empty(self.m)
+        w[:self.l] = u[:self.l] * v[:self.l]
+        for (typ, sl, k) in self.blocks:
+            a, b = u[sl], v[sl]
+            if typ == 'q':
+                w[sl.start] = a.dot(b)
+                w[sl.start + 1:sl.stop] = a[0] * b[1:] + b[0] * a[1:]
+            else:
+                U, V = _smat(a, k), _smat(b, k)
+                w[sl] = _svec(0.5 * (U.dot(V) + V.dot(U)))
+        return w
+
+    def sinv(self, lmbda, u):
+        """
+        the solution v of lmbda o v = u, where the semidefinite blocks of
+        lmbda are diagonal
+        """
+        v = np.empty(self.m)
+        v[:self.l] = u[:self.l] / lmbda[:self.l]
+        for (typ, sl, k) in self.blocks:
+            lm, a = lmbda[sl], u[sl]
+            if typ == 'q':
+                det = lm[0]**2 - lm[1:].dot(lm[1:])
+                v0 = (lm[0] * a[0] - lm[1:].dot(a[1:])) / det
+                v[sl.start] = v0
+                v[sl.start + 1:sl.stop] = (a[1:] - v0 * lm[1:]) / lm[0]
+            else:
+                r, c, w = svec_lower_indices(k)
+                d = lm[r == c]
+                v[sl] = 2 * a / (d[r] + d[c])
+        return v
+
+    def scaling(self, s, z):
+        """
+        returns the Nesterov-Todd scaling ``(W, lmbda)``, where ``W`` is a
+        :class:`_Scaling` such that ``W*z = inv(W.T)*s = lmbda``.
+        """
+        lmbda = np.empty(self.m)
+        d = np.sqrt(s[:self.l] / z[:self.l])
+        lmbda[:self.l] = np.sqrt(s[:self.l] * z[:self.l])
+        blocks = []
+        for (typ, sl, k) in self.blocks:
+            sk, zk = s[sl], z[sl]
+            if typ == 'q':
+                sn = np.sqrt(sk[0]**2 - sk[1:].dot(sk[1:]))
+                zn = np.sqrt(zk[0]**2 - zk[1:].dot(zk[1:]))
+                sb, zb = sk / sn, zk / zn
+                gamma = np.sqrt((1 + sb.dot(zb)) / 2)
+                wb = np.empty(k)
+                wb[0] = (sb[0] + zb[0]) / (2 * gamma)
+                wb[1:] = (sb[1:] - zb[1:]) / (2 * gamma)
+                Wk = np.empty((k, k))
+                Wk[0, 0] = wb[0]
+                Wk[0, 1:] = Wk[1:, 0] = wb[1:]
+                Wk[1:, 1:] = np.eye(k - 1) + np.outer(wb[1:], wb[1:]) / (
+                    1 + wb[0])
+                # the inverse of the hyperbolic matrix Wk is J*Wk*J
+                Wik = Wk.copy()
+                Wik[0, 1:] = Wik[1:, 0] = -wb[1:]
+                beta = np.sqrt(sn / zn)
+                Wk *= beta
+                Wik /= beta
+            else:
+                Ls = np.linalg.cholesky(_smat(sk, k))
+                Lz = np.linalg.cholesky(_smat(zk, k))
+                U, sig, Vt = np.linalg.svd(Lz.T.dot(Ls))
+                R = Ls.dot(Vt.T) / np.sqrt(sig)
+                # W(Z) = R.T*Z*R
+                Wk = _congruence(R.T)
+                Wik = _congruence(np.linalg.inv(R).T)
+            blocks.append((sl, Wk, Wik))
+            lmbda[sl] = Wk.dot(zk)
+        return _Scaling(d, blocks), lmbda
+
+    def identity_scaling(self):
+        return _Scaling(np.ones(self.l),
+                        [(sl, np.eye(sl.stop - sl.start),
+                          np.eye(sl.stop - sl.start))
+                         for (typ, sl, k) in self.blocks])
+
+
+class _Scaling(object):
+    """
+    a block diagonal scaling matrix ``W``, given by the diagonal ``d`` of its
+    block for the nonnegative orthant, and by the list of the
+    ``(slice, Wk, inv(Wk))`` of its blocks for the other cones
+    """
+
+    def __init__(self, d, blocks):
+        self.l = len(d)
+        self.d = d
+        self.dcol = d[:, np.newaxis]
+        self.blocks = blocks
+
+    def apply(self, u, inverse=False, trans=False):
+        """
+        returns ``W*u`` (or ``inv(W)*u``, ``W.T*u``, ``inv(W).T*u``),
+        where ``u`` is a vector or a matrix
+        """
+        d = self.d if u.ndim == 1 else self.dcol
+        v = np.empty_like(u)
+        if inverse:
+            v[:self.l] = u[:self.l] / d
+        else:
+            v[:self.l] = u[:self.l] * d
+        for (sl, Wk, Wik) in self.blocks:
+            M = Wik if inverse else Wk
+            v[sl] = (M.T if trans else M).dot(u[sl])
+        return v
+
+
+def dense_conelp(c, G, h, dims, A=None, b=None, options=None):
+    """
+    solves the conic problem described in the docstring of the module.
+    ``c``, ``G``, ``h``, ``A``, ``b`` are numpy arrays, ``options`` is a
+    dictionary with the keys ``abstol``, ``reltol``, ``feastol`` and
+    ``maxiters`` (with the defaults of cvxopt).
+
+    Returns a dictionary with the keys ``'status'`` (``'optimal'`` or
+    ``'unknown'``), ``'x'``, ``'y'``, ``'z'``, ``'s'``,
+    ``'primal objective'``, ``'dual objective'`` and ``'iterations'``, as
+    ``cvxopt.solvers.conelp``. A ``numpy.linalg.LinAlgError`` is raised
+    if the KKT system is singular (e.g. if ``A`` does not have full row rank,
+    or if ``[A; G]`` does not have full column rank).
+    """
+    opts = {'abstol': 1e-7, 'reltol': 1e-6, 'feastol': 1e-7,
+            'maxiters': 100}
+    if options:
+        opts.update((k, v) for k, v in options.items() if v is not None)
+    K = _Cones(dims)
+    n = len(c)
+    m = K.m
+    if A is None:
+        A = np.zeros((0, n))
+        b = np.zeros(0)
+    p = A.shape[0]
+    e = K.identity()
+    # as in cvxopt, one step of iterative refinement is done for
+    # problems with second order or semidefinite cones
+    refinement = 1 if K.blocks else 0
+
+    # The KKT system
+    #   [ 0   A'  G'   ] [dx]   [r1]
+    #   [ A   0   0    ] [dy] = [r2]
+    #   [ G   0  -W'W  ] [dz]   [r3]
+    # is reduced to a system of order n+p by elimination of dz, whose
+    # inverse is computed once per iteration.
+    M = np.zeros((n + p, n + p))
+    M[:n, n:] = A.T
+    M[n:, :n] = A
+
+    def factor(W):
+        Gt = W.apply(G, inverse=True, trans=True)
+        M[:n, :n] = Gt.T.dot(Gt)
+        return Gt, np.linalg.inv(M)
+
+    def kkt_solve(W, Gt, Minv, r1, r2, r3):
+        """returns dx, dy and W*dz"""
+        def reduced_solve(r1, r2, r3):
+            r3w = W.apply(r3, inverse=True, trans=True)
+            sol = Minv.dot(np.concatenate((r1 + Gt.T.dot(r3w), r2)))
+            return sol[:n], sol[n:], Gt.dot(sol[:n]) - r3w
+
+        dx, dy, wdz = reduced_solve(r1, r2, r3)
+        for i in range(refinement):
+            dz = W.apply(wdz, inverse=True)
+            ex, ey, ewdz = reduced_solve(
+                r1 - A.T.dot(dy) - G.T.dot(dz), r2 - A.dot(dx),
+                r3 - G.dot(dx) + W.apply(wdz, trans=True))
+            dx, dy, wdz = dx + ex, dy + ey, wdz + ewdz
+        return dx, dy, wdz
+
+    # starting point
+    W = K.identity_scaling()
+    Gt, Minv = factor(W)
+    x, _, sz = kkt_solve(W, Gt, Minv, np.zeros(n), b, h)
+    s = -sz
+    _, y, z = kkt_solve(W, Gt, Minv, -c, np.zeros(p), np.zeros(m))
+    for u in (s, z):
+        ap = -K.min_eig(u) if m else -1.
+        if ap >= -1e-8:
+            u += (1 + ap) * e
+
+    resx0 = max(1., np.sqrt(c.dot(c)))
+    resy0 = max(1., np.sqrt(b.dot(b)))
+    resz0 = max(1., np.sqrt(h.dot(h)))
+    status = 'unknown'
+    for it in range(opts['maxiters'] + 1):
+        rx = c + A.T.dot(y) + G.T.dot(z)
+        ry = A.dot(x) - b
+        rz = G.dot(x) + s - h
+        pcost = c.dot(x)
+        dcost = -h.dot(z) - b.dot(y)
+        gap = s.dot(z)
+        pres = max(np.sqrt(ry.dot(ry)) / resy0, np.sqrt(rz.dot(rz)) / resz0)
+        dres = np.sqrt(rx.dot(rx)) / resx0
+        if pcost < 0:
+            relgap = gap / -pcost
+        elif dcost > 0:
+            relgap = gap / dcost
+        else:
+            relgap = None
+        if not np.isfinite(pcost + dcost + gap + pres + dres):
+            break
+        if (pres <= opts['feastol'] and dres <= opts['feastol'] and
+                (gap <= opts['abstol'] or
+                 (relgap is not None and relgap <= opts['reltol']))):
+            status = 'optimal'
+            break
+        if it == opts['maxiters']:
+            break
+
+        W, lmbda = K.scaling(s, z)
+        Gt, Minv = factor(W)
+        mu = gap / K.degree
+        lsq = K.prod(lmbda, lmbda)
+
+        def newton(rhs_c):
+            u = K.sinv(lmbda, rhs_c)
+            dx, dy, wdz = kkt_solve(W, Gt, Minv, -rx, -ry,
+                                    -rz - W.apply(u, trans=True))
+            # scaled directions W^{-T}ds and W dz
+            wds = u - wdz
+            dz = W.apply(wdz, inverse=True)
+            ds = W.apply(wds, trans=True)
+            return dx, dy, dz, ds, wds, wdz
+
+        # predictor (the step lengths are computed in the scaled space,
+        # where s and z are both mapped to lmbda)
+        dx, dy, dz, ds, wds, wdz = newton(-lsq)
+        alpha = min(1., K.max_step(lmbda, wds), K.max_step(lmbda, wdz))
+        sigma = (1 - alpha)**3
+        # corrector
+        dx, dy, dz, ds, wds, wdz = newton(
+            -lsq - K.prod(wds, wdz) + sigma * mu * e)
+        alpha = min(1., 0.99 * min(K.max_step(lmbda, wds),
+                                   K.max_step(lmbda, wdz)))
+        x += alpha * dx
+        y += alpha * dy
+        z += alpha * dz
+        s += alpha * ds
+
+    return {'status': status, 'x': x, 'y': y, 'z': z, 's': s,
+            'primal objective': c.dot(x), 'dual objective': -h.dot(z) - b.dot(y),
+            'iterations': it}
@@ -41,6 +41,7 @@ from .constraint import *
 __all__ = ['Expression',
            'AffinExp',
            'Norm',
+           'Norms',
            'QuadExp',
            'GeneralFun',
            'LogSumExp',
@@ -51,6 +52,7 @@ __all__ = ['Expression',
            'DetRootN_Exp',
            'Sum_k_Largest_Exp',
            'Variable',
+           'VariableArray',
            'Set',
            'Ball',
            'Truncated_Simplex'
@@ -73,6 +75,10 @@ class Expression(object):
     """
     # and :class:`GeneralFun<picos.GeneralFun>`.
 
+    # no __dict__ for AffinExp and Variable, which are created by the million
+    # (the other subclasses do not define __slots__ and keep a __dict__)
+    __slots__ = ('string',)
+
     def __init__(self, string):
         self.string = string
         """String representation of the expression"""
@@ -201,6 +207,8 @@ class AffinExp(Expression):
 
     """
 
+    __slots__ = ('factors', 'constant', '_size')
+
     def __init__(self, factors=None, constant=None,
                  size=(1, 1),
                  string='0'
@@ -249,18 +257,29 @@ class AffinExp(Expression):
         return affstr
 
     def copy(self):
-        import copy
+        # copy matrices but not the variables (keys of the dict); the unary
+        # plus of cvxopt copies a matrix much faster than copy.deepcopy
         facopy = {}
-        for f, m in six.iteritems(
-                self.factors):  # copy matrices but not the variables (keys of the dict)
-            facopy[f] = copy.deepcopy(m)
+        for f, m in six.iteritems(self.factors):
+            facopy[f] = +m
 
-        conscopy = copy.deepcopy(self.constant)
+        conscopy = None if self.constant is None else +self.constant
         return AffinExp(facopy, conscopy, self.size, self.string)
 
     def affstring(self):
         return self.string
 
+    def _sparse_constant(self):
+        """returns the value of a constant expression as a sparse matrix,
+        without building the dense matrix of :func:`eval`"""
+        if self.constant is None:
+            return cvx.spmatrix([], [], [], self.size)
+        if not isinstance(self.constant, (cvx.base.matrix, cvx.base.spmatrix)):
+            return cvx.sparse(self.eval())
+        fac = +cvx.sparse(self.constant)
+        fac.size = self.size
+        return fac
+
     def eval(self, ind=None):
         if self.constant is None:
             val = cvx.spmatrix([], [], [], (self.size[0] * self.size[1], 1))
@@ -803,7 +822,7 @@ class AffinExp(Expression):
         selfcopy = self.copy()
         if isinstance(fact, AffinExp):
             if fact.isconstant():
-                fac, facString = cvx.sparse(fact.eval()), fact.string
+                fac, facString = fact._sparse_constant(), fact.string
             else:
                 if self.isconstant():
                     return fact ^ self
@@ -859,7 +878,7 @@ class AffinExp(Expression):
 
         if isinstance(fact, AffinExp):
             if fact.isconstant():
-                fac, facString = cvx.sparse(fact.eval()), fact.string
+                fac, facString = fact._sparse_constant(), fact.string
             else:
                 raise Exception('not implemented')
         else:
@@ -904,7 +923,7 @@ class AffinExp(Expression):
         """product of 2 affine expressions"""
         if isinstance(fact, AffinExp):
             if fact.isconstant():
-                fac, facString = cvx.sparse(fact.eval()), fact.string
+                fac, facString = fact._sparse_constant(), fact.string
             elif self.isconstant():
                 return fact.__rmul__(self)
             elif self.size[0] == 1 and fact.size[1] == 1 and self.size[1] == fact.size[0]:
@@ -1838,6 +1857,106 @@ class Norm(Expression):
             return self < exp1
 
 
+def _broadcast(exp, n):
+    """returns the column vector of length ``n`` with all entries equal to
+    the scalar affine expression ``exp``"""
+    # (built as a row: cvxopt fills the entries of a column in quadratic time)
+    ones = cvx.spmatrix(1., [0] * n, range(n), (1, n)).T
+    return _sparse_times(ones, exp, '|' + exp.string + '|')
+
+
+class Norms(Expression):
+    """
+    Euclidean norms of the rows (or of the columns) of an Affine Expression.
+    This class derives from :class:`Expression<picos.Expression>`.
+    Use the function :func:`picos.norms() <picos.tools.norms>` to create an instance of this class.
+
+    **Overloaded operator**
+
+            :``<``: less **or equal** (than an affine expression with one entry per norm,
+                    or than a scalar which bounds all the norms). The constraint
+                    is a single block of second order cones
+                    (of type ``SOcones``, cf. :attr:`typeOfConstraint<picos.Constraint.typeOfConstraint>`),
+                    whose dual is a matrix with one column per cone.
+    """
+
+    def __init__(self, exp, axis=1):
+        if axis not in (0, 1):
+            raise ValueError('axis must be 0 (columns) or 1 (rows)')
+        self.exp = exp
+        """The affine expression of which we take the norms of the rows or columns"""
+        self.axis = axis
+        """``1`` for the norms of the rows, ``0`` for the norms of the columns"""
+        expstr = exp.string
+        if not expstr.replace('_', '').isalnum():
+            expstr = '(' + expstr + ')'
+        if axis == 1:
+            Expression.__init__(self, '||' + expstr + '[i,:]||')
+        else:
+            Expression.__init__(self, '||' + expstr + '[:,j]||')
+
+    def __repr__(self):
+        return '# norms of the {0} of a ({1} x {2})- expression: {3} #'.format(
+            'rows' if self.axis == 1 else 'columns',
+            self.exp.size[0], self.exp.size[1], self.string)
+
+    def __str__(self):
+        if self.is_valued():
+            return str(self.value)
+        else:
+            return repr(self)
+
+    def eval(self, ind=None):
+        val = np.array(self.exp.eval(ind))
+        return cvx.matrix(np.sqrt((val * val).sum(axis=self.axis)))
+
+    value = property(
+        eval,
+        Expression.set_value,
+        Expression.del_simple_var_value)
+
+    def __lt__(self, exp):
+        m, n = self.exp.size
+        if self.axis == 1:
+            ncones, sz = m, n
+            # the rows of exp are stacked by a permutation of exp[:]
+            perm = np.arange(m * n).reshape((n, m)).T.ravel()
+            S = cvx.spmatrix(1., range(m * n), perm.tolist(), (m * n, m * n))
+            lhs = _sparse_times(S, self.exp[:], self.exp.string + '.T')
+        else:
+            ncones, sz = n, m
+            lhs = self.exp[:]
+        ind = 'i' if self.axis == 1 else 'j'
+        if isinstance(exp, AffinExp):
+            if exp.size[0] * exp.size[1] == ncones:
+                rhs = exp[:]
+                rhsstr = exp.string
+                if ncones > 1:
+                    if not rhsstr.replace('_', '').isalnum():
+                        rhsstr = '(' + rhsstr + ')'
+                    rhsstr += '[' + ind + ']'
+            elif exp.size == (1, 1):
+                rhs = _broadcast(exp, ncones)
+                rhsstr = exp.string
+            else:
+                raise Exception(
+                    'the rhs must be scalar or have one entry per norm')
+        else:  # constant
+            term, termString = _retrieve_matrix(exp)
+            if term.size == (1, 1):
+                term = cvx.matrix(term[0], (ncones, 1))
+            elif term.size[0] * term.size[1] != ncones:
+                raise Exception(
+                    'the rhs must be scalar or have one entry per norm')
+            rhs = AffinExp(factors={}, constant=cvx.matrix(term[:]),
+                           size=(ncones, 1), string=termString)
+            rhsstr = termString
+        cons = Constraint('SOcones', None, lhs, rhs,
+                          coneSizes=[sz] * ncones)
+        cons.myconstring = self.string + ' < ' + rhsstr
+        return cons
+
+
 class LogSumExp(Expression):
     """Log-Sum-Exp applied to an affine expression.
        If the affine expression ``z`` is of size :math:`N`,
@@ -2213,7 +2332,7 @@ class GeneralFun(Expression):
     """
 
     def __init__(self, fun, Exp, funstring):
-        Expression.__init__(self, self.funstring + '( ' + Exp.string + ')')
+        Expression.__init__(self, funstring + '( ' + Exp.string + ')')
         self.fun = fun
         r"""The function ``f`` applied to the affine expression.
                 This function must take in argument a
@@ -2271,6 +2390,47 @@ class _ConvexExp(Expression):
             return repr(self)
 
 
+def _add_power_cones(Ptmp, lhs, operands, weights):
+    """
+    adds to the reformulation ``Ptmp`` the rotated cones of the decomposition
+    (cf. :func:`_power_cone_tree`) of the entrywise inequalities
+    ``lhs[i] <= prod_k operands[k][i]**(weights[k]/sum(weights))``.
+    ``lhs`` and the ``operands`` are column vectors of the same length ``m``,
+    or scalars which are shared by all entries. The auxiliary nodes are the
+    entries of a single variable ``u`` of ``Ptmp``, and all the cones are
+    added as one block. Returns the number of cones per entry.
+    """
+    cones, nu = _power_cone_tree(weights)
+    if len(cones[0]) == 0:
+        return 0
+    n = len(operands)
+    exps = list(operands)
+    m = max(e.size[0] * e.size[1] for e in exps + [lhs])
+    if nu > 0:
+        exps.append(Ptmp.add_variable('u', nu * m))
+    exps.append(lhs)
+    lengths = np.array([e.size[0] * e.size[1] for e in exps])
+    offsets = np.cumsum(np.r_[0, lengths])
+    stacked = exps[0][:]
+    for e in exps[1:]:
+        stacked = stacked // e[:]
+    entries = np.arange(m)
+
+    def select(ids, string):
+        ids = ids[:, None]
+        k = np.where(ids < 0, len(exps) - 1, np.minimum(ids, n))
+        rows = (offsets[k] + np.where(ids >= n, (ids - n) * m, 0)
+                + np.where(lengths[k] == 1, 0, entries)).ravel()
+        S = _triplets_to_spmatrix(np.ones(len(rows)), np.arange(len(rows)),
+                                  rows, (len(rows), int(offsets[-1])))
+        return _sparse_times(S, stacked, string)
+
+    c, a, b = cones
+    Ptmp.add_constraint(Constraint('RScones', None, select(c, 'u'),
+                                   select(a, 'pow'), select(b, 'pow')))
+    return len(c)
+
+
 class GeoMeanExp(_ConvexExp):
     """A class storing the geometric mean of a multidimensional expression.
        It derives from :class:`Expression<picos.Expression>`.
@@ -2305,62 +2465,30 @@ class GeoMeanExp(_ConvexExp):
                 raise Exception('upper bound of a geomean must be scalar')
             if self.exp.size == (1, 1):
                 return self.exp > exp
-            # construct a list of keys to index new variables with nodes of a binary tree
-            # the new variables are added in a temporary problem Ptmp
-            from .problem import Problem
-            Ptmp = Problem()
+            # binary tree of rotated cones (cf. _geomean_tree): the auxiliary
+            # variables are stored in the vector u of the reformulation Ptmp,
+            # and the cones of a level of the tree form a block of cones,
+            # whose terms are selected in the stacked vector [self.exp; u; exp]
+            Ptmp = _Reformulation()
             m = self.exp.size[0] * self.exp.size[1]
-            lm = [[i] for i in range(m - 1, -1, -1)]
-            K = []
-            depth = 0
-            u = {}
-            while len(lm) > 1:
-                depth += 1
-                nlm = []
-                while lm:
-                    i1 = lm.pop()[-1]
-                    if lm:
-                        i2 = lm.pop()[0]
-                    else:
-                        i2 = 'x'
-                    nlm.insert(0, (i2, i1))
-                    k = str(depth) + ':' + str(i1) + '-' + str(i2)
-                    K.append(k)
-                    u[k] = Ptmp.add_variable('u[' + k + ']', 1)
-                lm = nlm
-            root = K[-1]
-            maxd = int(K[-1].split(':')[0])
-            Ptmp.remove_variable(u[root].name)
-            u[root] = exp
-
-            for k in K:
-                i1 = int(k.split('-')[0].split(':')[1])
-                i2 = k.split('-')[1]
-                if i2 != 'x':
-                    i2 = int(i2)
-                if k[:2] == '1:':
-                    if i2 != 'x':
-                        Ptmp.add_constraint(
-                            u[k]**2 < self.exp[i1] * self.exp[i2])
-                    else:
-                        Ptmp.add_constraint(u[k]**2 < self.exp[i1] * exp)
-                else:
-                    d = int(k.split(':')[0])
-                    if i2 == 'x' and d < maxd:
-                        k2pot = [ki for ki in K if ki.startswith(
-                            str(d - 1) + ':') and int(ki.split(':')[1].split('-')[0]) >= i1]
-                        k1 = k2pot[0]
-                        if len(k2pot) == 2:
-                            k2 = k2pot[1]
-                            Ptmp.add_constraint(u[k]**2 < u[k1] * u[k2])
-                        else:
-                            Ptmp.add_constraint(u[k]**2 < u[k1] * exp)
-                    else:
-                        k1 = [ki for ki in K if ki.startswith(
-                            str(d - 1) + ':' + str(i1))][0]
-                        k2 = [ki for ki in K if ki.startswith(
-                            str(d - 1) + ':') and ki.endswith('-' + str(i2))][0]
-                        Ptmp.add_constraint(u[k]**2 < u[k1] * u[k2])
+            levels, nu = _geomean_tree(m)
+            operands = self.exp[:]
+            if nu > 0:
+                u = Ptmp.add_variable('u', nu)
+                operands = operands // u
+            operands = operands // exp
+            nop = m + nu + 1
+
+            def select(ids, string):
+                ids = np.where(ids < 0, nop - 1, ids)
+                S = cvx.spmatrix(1., range(len(ids)), ids.tolist(),
+                                 (len(ids), nop))
+                return _sparse_times(S, operands, string)
+
+            for (c, a, b) in levels:
+                Ptmp.add_constraint(Constraint(
+                    'RScones', None, select(c, 'u'),
+                    select(a, 'geo'), select(b, 'geo')))
             return GeoMeanConstraint(
                 exp, self.exp, Ptmp, exp.string + '<' + self.string)
 
@@ -2460,8 +2588,7 @@ class NormP_Exp(_ConvexExp):
             if self.exp.size == (1, 1):
                 return abs(self.exp) < exp
             p = float(self.numerator) / self.denominator
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             m = self.exp.size[0] * self.exp.size[1]
 
             if self.num2 is not None:  # (p,q)-norm
@@ -2489,26 +2616,25 @@ class NormP_Exp(_ConvexExp):
                 Ptmp.add_constraint(self.exp <= exp)
                 Ptmp.add_constraint(-self.exp <= exp)
             else:
-                x = Ptmp.add_variable('x', m)
-                v = Ptmp.add_variable('v', m)
-
-                amb = self.numerator - self.denominator
+                # |x_i| <= v_i**(b/a) * t**(1-b/a), with sum(v) <= t
+                a = self.numerator
                 b = self.denominator
-                oneamb = '|1|(' + str(amb) + ',1)'
-                oneb = '|1|(' + str(b) + ',1)'
-                for i in range(m):
-                    if amb > 0:
-                        if b == 1:
-                            vec = (v[i]) // (exp * oneamb)
-                        else:
-                            vec = (v[i] * oneb) // (exp * oneamb)
+                v = Ptmp.add_variable('v', m)
+                a //= int(np.gcd(a, b))
+                if self.exp.is_real() and a & (a - 1) == 0:
+                    # t is not an operand of the cones: no need of |x_i|
+                    lhs = self.exp[:]
+                else:
+                    lhs = Ptmp.add_variable('x', m)
+                    if self.exp.is_real():
+                        Ptmp.add_constraint(self.exp[:] <= lhs)
+                        Ptmp.add_constraint(-self.exp[:] <= lhs)
                     else:
-                        if b == 1:
-                            vec = v[i]
-                        else:
-                            vec = (v[i] * oneb)
-                    Ptmp.add_constraint(abs(self.exp[i]) < x[i])
-                    Ptmp.add_constraint(x[i] < geomean(vec))
+                        for i in range(m):
+                            Ptmp.add_constraint(abs(self.exp[i]) < lhs[i])
+                _add_power_cones(Ptmp, lhs, [v, exp],
+                                 (self.denominator,
+                                  self.numerator - self.denominator))
                 Ptmp.add_constraint((1 | v) < exp)
 
             return NormP_Constraint(
@@ -2535,11 +2661,10 @@ class NormP_Exp(_ConvexExp):
                 '>= operator can be used only when the function is concave (p<=1, p != 0)')
 
         if isinstance(exp, AffinExp):
-            from .problem import Problem
             if exp.size != (1, 1):
                 raise Exception(
                     'lower bound of a generalized p-norm must be scalar')
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             m = self.exp.size[0] * self.exp.size[1]
             if p == 1:
                 Ptmp.add_constraint(self.exp > 0)
@@ -2551,38 +2676,18 @@ class NormP_Exp(_ConvexExp):
                 print(
                     "\033[1;31m*** Warning -- generalized norm inequality, norm_-inf(x) is interpreted as min(x), not min(abs(x)) \033[0m")
             elif p >= 0:
+                # v_i <= x_i**p * t**(1-p), with sum(v) >= t
                 v = Ptmp.add_variable('v', m)
-
-                bma = -(self.numerator - self.denominator)
-                a = self.numerator
-                onebma = '|1|(' + str(bma) + ',1)'
-                onea = '|1|(' + str(a) + ',1)'
-                for i in range(m):
-                    if a == 1:
-                        vec = (self.exp[i]) // (exp * onebma)
-                    else:
-                        vec = (self.exp[i] * onea) // (exp * onebma)
-
-                    Ptmp.add_constraint(v[i] < geomean(vec))
+                _add_power_cones(Ptmp, v, [self.exp[:], exp],
+                                 (self.numerator,
+                                  self.denominator - self.numerator))
                 Ptmp.add_constraint(exp < (1 | v))
             else:
+                # t <= x_i**(a/(a+b)) * v_i**(b/(a+b)), with sum(v) <= t
                 v = Ptmp.add_variable('v', m)
-
-                b = abs(self.denominator)
-                a = abs(self.numerator)
-                oneb = '|1|(' + str(b) + ',1)'
-                onea = '|1|(' + str(a) + ',1)'
-                for i in range(m):
-                    if a == 1 and b == 1:
-                        vec = (self.exp[i]) // (v[i])
-                    elif a > 1 and b == 1:
-                        vec = (self.exp[i] * onea) // (v[i])
-                    elif a == 1 and b > 1:
-                        vec = (self.exp[i]) // (v[i] * oneb)
-                    else:
-                        vec = (self.exp[i] * onea) // (v[i] * oneb)
-
-                    Ptmp.add_constraint(exp < geomean(vec))
+                _add_power_cones(Ptmp, exp, [self.exp[:], v],
+                                 (abs(self.numerator),
+                                  abs(self.denominator)))
                 Ptmp.add_constraint((1 | v) < exp)
             return NormP_Constraint(
                 exp,
@@ -2715,29 +2820,30 @@ class TracePow_Exp(_ConvexExp):
         if isinstance(exp, AffinExp):
             if exp.size != (1, 1):
                 raise Exception('upper bound of a tracepow must be scalar')
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             a = self.numerator
             b = self.denominator
             if self.dim == 1:
+                # x <= t**(b/a) if p=a/b>1, and 1 <= t**(b/(a+b)) * x**(a/(a+b))
+                # if p=-a/b<0
                 idt = new_param('1', 1)
-                varcnt = 0
-                v = []
-            else:
-                idt = new_param('I', cvx.spdiag([1.] * self.dim))
-                varcnt = 1
-                v = [
-                    Ptmp.add_variable(
-                        'v[0]', (self.dim, self.dim), 'symmetric')]
+                if a > b:
+                    _add_power_cones(Ptmp, self.exp, [exp, idt], (b, a - b))
+                else:
+                    _add_power_cones(Ptmp, idt, [exp, self.exp],
+                                     (abs(b), abs(a)))
+                return TracePow_Constraint(
+                    exp, self.exp, self.numerator, self.denominator, None,
+                    Ptmp, self.string + '<' + exp.string)
+
+            idt = new_param('I', cvx.spdiag([1.] * self.dim))
+            varcnt = 1
+            v = [Ptmp.add_variable('v[0]', (self.dim, self.dim), 'symmetric')]
 
             if a > b:
                 # x2n < tb x2n-a
                 pown = int(2**(np.ceil(np.log(a) / np.log(2))))
-                if self.dim == 1:
-                    lis = [exp] * b + [self.exp] * (pown - a) + [idt] * (a - b)
-                else:
-                    lis = [v[0]] * b + [self.exp] * \
-                        (pown - a) + [idt] * (a - b)
+                lis = [v[0]] * b + [self.exp] * (pown - a) + [idt] * (a - b)
                 while len(lis) > 2:
                     newlis = []
                     while lis:
@@ -2746,36 +2852,23 @@ class TracePow_Exp(_ConvexExp):
                         if v1 is v2:
                             newlis.append(v2)
                         else:
-                            if self.dim == 1:
-                                v0 = Ptmp.add_variable(
-                                    'v[' + str(varcnt) + ']', 1)
-                                Ptmp.add_constraint(v0**2 < v1 * v2)
-                            else:
-                                v0 = Ptmp.add_variable(
-                                    'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
-                                Ptmp.add_constraint(
-                                    ((v1 & v0) // (v0 & v2)) >> 0)
-
+                            v0 = Ptmp.add_variable(
+                                'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
+                            Ptmp.add_constraint(
+                                ((v1 & v0) // (v0 & v2)) >> 0)
                             varcnt += 1
                             newlis.append(v0)
                             v.append(v0)
                     lis = newlis
-                if self.dim == 1:
-                    Ptmp.add_constraint(self.exp**2 < lis[0] * lis[1])
-                else:
-                    Ptmp.add_constraint(
-                        ((lis[0] & self.exp) // (self.exp & lis[1])) >> 0)
-                    Ptmp.add_constraint((idt | v[0]) < exp)
+                Ptmp.add_constraint(
+                    ((lis[0] & self.exp) // (self.exp & lis[1])) >> 0)
+                Ptmp.add_constraint((idt | v[0]) < exp)
             else:  # p<0
                 # 1 < tb xa
                 a = abs(a)
                 b = abs(b)
                 pown = int(2**(np.ceil(np.log(a + b) / np.log(2))))
-                if self.dim == 1:
-                    lis = [exp] * b + [self.exp] * a + [idt] * (pown - a - b)
-                else:
-                    lis = [v[0]] * b + [self.exp] * a + [idt] * (pown - a - b)
-
+                lis = [v[0]] * b + [self.exp] * a + [idt] * (pown - a - b)
                 while len(lis) > 2:
                     newlis = []
                     while lis:
@@ -2784,26 +2877,17 @@ class TracePow_Exp(_ConvexExp):
                         if v1 is v2:
                             newlis.append(v2)
                         else:
-                            if self.dim == 1:
-                                v0 = Ptmp.add_variable(
-                                    'v[' + str(varcnt) + ']', 1)
-                                Ptmp.add_constraint(v0**2 < v1 * v2)
-                            else:
-                                v0 = Ptmp.add_variable(
-                                    'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
-                                Ptmp.add_constraint(
-                                    ((v1 & v0) // (v0 & v2)) >> 0)
-
+                            v0 = Ptmp.add_variable(
+                                'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
+                            Ptmp.add_constraint(
+                                ((v1 & v0) // (v0 & v2)) >> 0)
                             varcnt += 1
                             newlis.append(v0)
                             v.append(v0)
                     lis = newlis
-                if self.dim == 1:
-                    Ptmp.add_constraint(1 < lis[0] * lis[1])
-                else:
-                    Ptmp.add_constraint(
-                        ((lis[0] & idt) // (idt & lis[1])) >> 0)
-                    Ptmp.add_constraint((idt | v[0]) < exp)
+                Ptmp.add_constraint(
+                    ((lis[0] & idt) // (idt & lis[1])) >> 0)
+                Ptmp.add_constraint((idt | v[0]) < exp)
 
             return TracePow_Constraint(
                 exp,
@@ -2837,32 +2921,30 @@ class TracePow_Exp(_ConvexExp):
         if isinstance(exp, AffinExp):
             if exp.size != (1, 1):
                 raise Exception('lower bound of a tracepow must be scalar')
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             a = self.numerator
             b = self.denominator
             if self.dim == 1:
+                # y <= x**(a/b), with y = t (or M*y >= t)
                 idt = new_param('1', 1)
-            else:
-                idt = new_param('I', cvx.spdiag([1.] * self.dim))
+                if self.M is None:
+                    y = exp
+                else:
+                    y = Ptmp.add_variable('v', 1)
+                    Ptmp.add_constraint((self.M * y) > exp)
+                _add_power_cones(Ptmp, y, [self.exp, idt], (a, b - a))
+                return TracePow_Constraint(
+                    exp, self.exp, self.numerator, self.denominator, self.M,
+                    Ptmp, self.string + '>' + exp.string)
 
             # we must have 0<a<b
             # t2n < xa t2n-b
 
             pown = int(2**(np.ceil(np.log(b) / np.log(2))))
-            if self.dim == 1:
-                idt = new_param('1', 1)
-                varcnt = 0
-                v = []
-                lis = [self.exp] * a + [exp] * (pown - b) + [idt] * (b - a)
-
-            else:
-                idt = new_param('I', cvx.spdiag([1.] * self.dim))
-                varcnt = 1
-                v = [
-                    Ptmp.add_variable(
-                        'v[0]', (self.dim, self.dim), 'symmetric')]
-                lis = [self.exp] * a + [v[0]] * (pown - b) + [idt] * (b - a)
+            idt = new_param('I', cvx.spdiag([1.] * self.dim))
+            varcnt = 1
+            v = [Ptmp.add_variable('v[0]', (self.dim, self.dim), 'symmetric')]
+            lis = [self.exp] * a + [v[0]] * (pown - b) + [idt] * (b - a)
 
             while len(lis) > 2:
                 newlis = []
@@ -2872,30 +2954,18 @@ class TracePow_Exp(_ConvexExp):
                     if v1 is v2:
                         newlis.append(v2)
                     else:
-                        if self.dim == 1:
-                            v0 = Ptmp.add_variable('v[' + str(varcnt) + ']', 1)
-                            Ptmp.add_constraint(v0**2 < v1 * v2)
-                        else:
-                            v0 = Ptmp.add_variable(
-                                'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
-                            Ptmp.add_constraint(((v1 & v0) // (v0 & v2)) >> 0)
-
+                        v0 = Ptmp.add_variable(
+                            'v[' + str(varcnt) + ']', (self.dim, self.dim), 'symmetric')
+                        Ptmp.add_constraint(((v1 & v0) // (v0 & v2)) >> 0)
                         varcnt += 1
                         newlis.append(v0)
                         v.append(v0)
                 lis = newlis
-            if self.dim == 1:
-                if self.M is None:
-                    Ptmp.add_constraint(exp**2 < lis[0] * lis[1])
-                else:
-                    Ptmp.add_constraint(v[0]**2 < lis[0] * lis[1])
-                    Ptmp.add_constraint((self.M * v[0]) > exp)
+            Ptmp.add_constraint(((lis[0] & v[0]) // (v[0] & lis[1])) >> 0)
+            if self.M is None:
+                Ptmp.add_constraint((idt | v[0]) > exp)
             else:
-                Ptmp.add_constraint(((lis[0] & v[0]) // (v[0] & lis[1])) >> 0)
-                if self.M is None:
-                    Ptmp.add_constraint((idt | v[0]) > exp)
-                else:
-                    Ptmp.add_constraint((self.M | v[0]) > exp)
+                Ptmp.add_constraint((self.M | v[0]) > exp)
 
             return TracePow_Constraint(
                 exp,
@@ -2961,8 +3031,7 @@ class DetRootN_Exp(_ConvexExp):
         if isinstance(exp, AffinExp):
             if exp.size != (1, 1):
                 raise Exception('lower bound of a detrootn must be scalar')
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             nr = self.dim * (self.dim + 1) // 2
             l = Ptmp.add_variable('l', (nr, 1))
             L = ltrim1(l, uptri=0)
@@ -2983,6 +3052,36 @@ class DetRootN_Exp(_ConvexExp):
             return self > exp1
 
 
+def _add_block_lmis(Ptmp, exp, blocks, t, sign):
+    """
+    adds to ``Ptmp`` the constraint ``lambda_max(exp) <= t`` (``sign=1``)
+    or ``lambda_min(exp) >= t`` (``sign=-1``) for a block diagonal matrix
+    ``exp`` with diagonal ``blocks`` (cf. :func:`_block_diagonal_blocks`):
+    one LMI per block of size larger than 1, and one stacked linear
+    inequality for the blocks of size 1.
+    """
+    for k, idx in enumerate(blocks):
+        if len(idx) > 1:
+            Xk = _principal_submatrix(
+                exp, idx, exp.string + '[B' + str(k) + ']')
+            Ik = new_param('I', cvx.spdiag([1.] * len(idx)))
+            if sign > 0:
+                Ptmp.add_constraint(Xk << t * Ik)
+            else:
+                Ptmp.add_constraint(Xk >> t * Ik)
+    diag = np.concatenate([idx for idx in blocks if len(idx) == 1] +
+                          [np.zeros(0, dtype=int)])
+    if len(diag):
+        n = exp.size[0]
+        S = cvx.spmatrix(1., range(len(diag)), (diag * (n + 1)).tolist(),
+                         (len(diag), n * n))
+        d = _sparse_times(S, exp[:], 'diag(' + exp.string + ')')
+        if sign > 0:
+            Ptmp.add_constraint(d < _broadcast(t, len(diag)))
+        else:
+            Ptmp.add_constraint(d > _broadcast(t, len(diag)))
+
+
 class Sum_k_Largest_Exp(_ConvexExp):
     """A class storing the sum of the k largest elements of an
        :class:`AffinExp <picos.AffinExp>`, or the sum
@@ -3057,17 +3156,19 @@ class Sum_k_Largest_Exp(_ConvexExp):
             if exp.size != (1, 1):
                 raise Exception(
                     'upper bound of a sum_k_largest must be scalar')
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             if self.eigenvalues:
                 n = self.exp.size[0]
                 I = new_param('I', cvx.spdiag([1.] * n))
                 if self.k == n:
                     return (I | self.exp) < exp
                 elif self.k == 1:
-                    cons = self.exp << exp * I
-                    cons.myconstring = self.string + '<=' + exp.string
-                    return cons
+                    blocks = _block_diagonal_blocks(self.exp)
+                    if len(blocks) == 1:
+                        cons = self.exp << exp * I
+                        cons.myconstring = self.string + '<=' + exp.string
+                        return cons
+                    _add_block_lmis(Ptmp, self.exp, blocks, exp, 1)
                 else:
                     s = Ptmp.add_variable('s', 1)
                     Z = Ptmp.add_variable('Z', (n, n), 'symmetric')
@@ -3084,8 +3185,9 @@ class Sum_k_Largest_Exp(_ConvexExp):
                     return (1 | self.exp) < exp
                 else:
                     lbda = Ptmp.add_variable('lambda', 1)
-                    mu = Ptmp.add_variable('mu', self.exp.size, lower=0)
-                    Ptmp.add_constraint(self.exp < lbda + mu)
+                    mu = Ptmp.add_variable('mu', n, lower=0)
+                    Ptmp.add_constraint(
+                        self.exp[:] < _broadcast(lbda, n) + mu)
                     Ptmp.add_constraint(self.k * lbda + (1 | mu) < exp)
 
             return Sumklargest_Constraint(
@@ -3181,17 +3283,19 @@ class Sum_k_Smallest_Exp(_ConvexExp):
             if exp.size != (1, 1):
                 raise Exception(
                     'lower bound of a sum_k_smallest must be scalar')
-            from .problem import Problem
-            Ptmp = Problem()
+            Ptmp = _Reformulation()
             if self.eigenvalues:
                 n = self.exp.size[0]
                 I = new_param('I', cvx.spdiag([1.] * n))
                 if self.k == n:
-                    return (I | self.exp) < exp
+                    return (I | self.exp) > exp
                 elif self.k == 1:
-                    cons = self.exp >> exp * I
-                    cons.myconstring = self.string + '>=' + exp.string
-                    return cons
+                    blocks = _block_diagonal_blocks(self.exp)
+                    if len(blocks) == 1:
+                        cons = self.exp >> exp * I
+                        cons.myconstring = self.string + '>=' + exp.string
+                        return cons
+                    _add_block_lmis(Ptmp, self.exp, blocks, exp, -1)
                 else:
                     s = Ptmp.add_variable('s', 1)
                     Z = Ptmp.add_variable('Z', (n, n), 'symmetric')
@@ -3208,8 +3312,9 @@ class Sum_k_Smallest_Exp(_ConvexExp):
                     return (1 | self.exp) > exp
                 else:
                     lbda = Ptmp.add_variable('lambda', 1)
-                    mu = Ptmp.add_variable('mu', self.exp.size, lower=0)
-                    Ptmp.add_constraint(-self.exp < lbda + mu)
+                    mu = Ptmp.add_variable('mu', n, lower=0)
+                    Ptmp.add_constraint(
+                        -self.exp[:] < _broadcast(lbda, n) + mu)
                     Ptmp.add_constraint(self.k * lbda + (1 | mu) < -exp)
 
             return Sumklargest_Constraint(
@@ -3236,6 +3341,12 @@ class Variable(AffinExp):
     derives from :class:`AffinExp<picos.AffinExp>`.
     """
 
+    __slots__ = ('name', 'parent_problem', 'Id', '_vtype',
+                 '_startIndex', '_endIndex', '_value', '_semiDef', '_bndtext',
+                 '_factors', '_value_alt', '_bnd', '_passed',
+                 'gurobi_startIndex', 'gurobi_endIndex',
+                 'cplex_startIndex', 'cplex_endIndex')
+
     def __init__(self, parent_problem,
                  name,
                  size,
@@ -3245,13 +3356,12 @@ class Variable(AffinExp):
                  lower=None,
                  upper=None):
 
-        # attributes of the parent class (AffinExp)
-        idmat = _svecm1_identity(vtype, size)
-        AffinExp.__init__(self, factors={self: idmat},
-                          constant=None,
-                          size=size,
-                          string=name
-                          )
+        # attributes of the parent class (AffinExp). The dict of factors
+        # {self: identity} is created on first access.
+        Expression.__init__(self, name)
+        self.constant = None
+        self._size = size
+        self._factors = None
 
         self.name = name
         """The name of the variable (str)"""
@@ -3276,19 +3386,16 @@ class Variable(AffinExp):
 
         self._value = None
 
-        self.value_alt = {}  # alternative values for solution pools
-
-        # dictionary of (lower,upper) bounds ( +/-infinite if the index is not
-        # in the dict)
-        self._bnd = _NonWritableDict()
+        # alternative values for solution pools, dictionary of bounds and
+        # list of solvers aware of this variable: created on first access
+        self._value_alt = None
+        self._bnd = None
+        self._passed = None
 
         self._semiDef = False  # True if this is a sym. variable X subject to X>>0
 
         self._bndtext = ''
 
-        self.passed = []
-        """list of solvers which are already aware of this variable"""
-
         if not(lower is None):
             self.set_lower(lower)
 
@@ -3308,6 +3415,42 @@ class Variable(AffinExp):
         return '# variable {0}:({1} x {2}),{3} #'.format(
             self.name, self.size[0], self.size[1], self.vtype)
 
+    @property
+    def factors(self):
+        """
+        dictionary ``{self: M}``, where ``M`` maps the (svec-)vectorized variable
+        to the vectorized matrix (cf. :attr:`AffinExp.factors <picos.AffinExp.factors>`)
+        """
+        if self._factors is None:
+            self._factors = {self: _svecm1_identity(self._vtype, self._size)}
+        return self._factors
+
+    @factors.setter
+    def factors(self, value):
+        self._factors = value
+
+    @property
+    def value_alt(self):
+        """alternative values for solution pools (dict)"""
+        if self._value_alt is None:
+            self._value_alt = {}
+        return self._value_alt
+
+    @value_alt.setter
+    def value_alt(self, value):
+        self._value_alt = value
+
+    @property
+    def passed(self):
+        """list of solvers which are already aware of this variable"""
+        if self._passed is None:
+            self._passed = []
+        return self._passed
+
+    @passed.setter
+    def passed(self, value):
+        self._passed = value
+
     @property
     def bnd(self):
         """
@@ -3315,6 +3458,10 @@ class Variable(AffinExp):
         ith element of the variable ``var``. None means +/- infinite.
         if ``var.bnd[i]`` is not defined, then ``var[i]`` is unbounded.
         """
+        # dictionary of (lower,upper) bounds ( +/-infinite if the index is not
+        # in the dict)
+        if self._bnd is None:
+            self._bnd = _NonWritableDict()
         return self._bnd
 
     @property
@@ -3392,6 +3539,16 @@ class Variable(AffinExp):
 
         self._semiDef = value
 
+    def _bounds_changed(self):
+        """resets the instances of the solvers which know the bounds of the
+        variable, and the real problem cached by the parent problem
+        (cf. :func:`Problem._cached_real_problem`)"""
+        for solver in self.passed:
+            texteval = 'self.parent_problem.reset_' + solver + '_instance()'
+            eval(texteval)
+        if self.parent_problem is not None:
+            self.parent_problem._realP = None
+
     def set_lower(self, lo):
         """
         sets a lower bound to the variable
@@ -3423,9 +3580,7 @@ class Variable(AffinExp):
         else:
             if lowexp:
                 self._bndtext.replace('nonnegative', 'bounded below')
-        for solver in self.passed:
-            texteval = 'self.parent_problem.reset_' + solver + '_instance()'
-            eval(texteval)
+        self._bounds_changed()
 
     def set_sparse_lower(self, indices, bnds):
         """
@@ -3492,9 +3647,7 @@ class Variable(AffinExp):
         elif ('low' not in self._bndtext):
             self._bndtext += ', some lower bounds'
 
-        for solver in self.passed:
-            texteval = 'self.parent_problem.reset_' + solver + '_instance()'
-            eval(texteval)
+        self._bounds_changed()
 
     def set_upper(self, up):
         """
@@ -3527,9 +3680,7 @@ class Variable(AffinExp):
             if upexp:
                 self._bndtext.replace('nonpositive', 'bounded above')
 
-        for solver in self.passed:
-            texteval = 'self.parent_problem.reset_' + solver + '_instance()'
-            eval(texteval)
+        self._bounds_changed()
 
     def set_sparse_upper(self, indices, bnds):
         """
@@ -3582,9 +3733,7 @@ class Variable(AffinExp):
         elif ('above' not in self._bndtext) and ('upper' not in self._bndtext):
             self._bndtext += ', some upper bounds'
 
-        for solver in self.passed:
-            texteval = 'self.parent_problem.reset_' + solver + '_instance()'
-            eval(texteval)
+        self._bounds_changed()
 
     def eval(self, ind=None):
         if ind is None:
@@ -3782,6 +3931,212 @@ class Variable(AffinExp):
         return AffinExp(newfacs, newcons, newsize, newstr)
 
 
+class VariableArray(object):
+    """This class stores an array of variables of the same size, created by
+    :func:`add_variable_array() <picos.Problem.add_variable_array>`.
+
+    The elements of the array are not stored as separate
+    :class:`Variable <picos.Variable>` objects: they share one contiguous
+    block of columns, which is held by a single variable
+    :attr:`variable <picos.VariableArray.variable>` of size ``(N*k,1)``,
+    where ``N`` is the number of elements and ``k`` the number of entries of
+    each element (the elements are stacked in the order of their flat index,
+    each one vectorized in column major order).
+
+    Indexing the array returns a lightweight view of the element, i.e., an
+    :class:`affine expression <picos.AffinExp>` which selects the
+    appropriate rows of the block:
+
+    >>> import picos as pic
+    >>> prob = pic.Problem()
+    >>> x = prob.add_variable_array('x', 4, 2)
+    >>> x[1]
+    # (2 x 1)-affine expression: x[1] #
+    >>> x[2,]
+    # (2 x 1)-affine expression: x[2] #
+
+    Constraints involving all the elements at once are generated in
+    a single call, by comparing the array with a scalar, a matrix
+    of the size of the elements, or a matrix of the size of the whole block;
+    see also :func:`apply() <picos.VariableArray.apply>`
+    and :func:`sum() <picos.VariableArray.sum>`.
+
+    >>> x >= 0
+    # (8x1)-affine constraint: x > |0| #
+    """
+
+    def __init__(self, variable, shape, size):
+        self.variable = variable
+        """The :class:`Variable <picos.Variable>` which stores the whole array"""
+
+        self.shape = shape
+        """The shape of the array (tuple)"""
+
+        self.size = size
+        """The size of each element of the array (tuple)"""
+
+    @property
+    def name(self):
+        """The name of the array (str)"""
+        return self.variable.name
+
+    @property
+    def numvars(self):
+        """The number of elements in the array"""
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        if len(self.shape) == 1:
+            for k in range(self.shape[0]):
+                yield self._view(k)
+        else:
+            for k in range(self.shape[0]):
+                yield self[k]
+
+    def __str__(self):
+        return repr(self)
+
+    def __repr__(self):
+        return '# array of {0} variables {1}:({2} x {3}),{4} #'.format(
+            self.numvars, self.name, self.size[0], self.size[1],
+            self.variable.vtype)
+
+    def _flat_index(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        if len(index) != len(self.shape):
+            raise IndexError('an array of shape {0} needs {1} indices'.format(
+                self.shape, len(self.shape)))
+        flat = 0
+        normalized = []
+        for ind, dim in zip(index, self.shape):
+            ind = ind.__index__()
+            if ind < 0:
+                ind += dim
+            if ind < 0 or ind >= dim:
+                raise IndexError('index out of range')
+            flat = flat * dim + ind
+            normalized.append(str(ind))
+        return flat, ','.join(normalized)
+
+    def _view(self, flat, indstr=None):
+        k = self.size[0] * self.size[1]
+        N = self.numvars
+        if indstr is None:
+            indstr = str(flat)
+        sel = cvx.spmatrix(1., range(k), range(flat * k, (flat + 1) * k),
+                           (k, N * k))
+        return AffinExp({self.variable: sel}, None, self.size,
+                        self.name + '[' + indstr + ']')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if len(self.shape) > 1:
+                raise IndexError('slices are only supported for 1d arrays')
+            return [self._view(k) for k in range(*index.indices(self.shape[0]))]
+        if (len(self.shape) > 1 and not isinstance(index, tuple)):
+            # subarray x[i] of a multidimensional array: list of views
+            if len(self.shape) > 2:
+                raise IndexError('too few indices for this array')
+            i, istr = self._flat_index((index, 0))
+            return [self._view(i + j, istr[:-1] + str(j))
+                    for j in range(self.shape[1])]
+        return self._view(*self._flat_index(index))
+
+    @property
+    def value(self):
+        """list of the values of the elements of the array (in flat order)"""
+        return [self._view(k).value for k in range(self.numvars)]
+
+    def _stacked(self, exp):
+        """
+        returns exp as a column of the size of the whole block,
+        by repeating it if it has the size of an element
+        """
+        if isinstance(exp, AffinExp):
+            if exp.size == self.size and self.numvars > 1:
+                return self._repeat(exp)
+            return exp
+        N = self.numvars
+        k = self.size[0] * self.size[1]
+        mat, matstr = _retrieve_matrix(exp, self.size)
+        if mat.size == self.size and N > 1:
+            mat = cvx.sparse([mat[:]] * N)
+        elif mat.size == (N * k, 1):
+            matstr = '[ {0} x 1 MAT ]'.format(N * k)
+        return AffinExp({}, constant=mat[:], size=(N * k, 1), string=matstr)
+
+    def _repeat(self, exp):
+        """repeats an expression of the size of the elements N times"""
+        N = self.numvars
+        fac = {}
+        for v, f in six.iteritems(exp.factors):
+            fac[v] = cvx.sparse([f] * N)
+        cst = exp.constant
+        if cst is not None:
+            cst = cvx.sparse([cvx.sparse(cst)[:]] * N)
+        return AffinExp(fac, cst, (N * self.size[0] * self.size[1], 1),
+                        '[' + exp.string + ']')
+
+    def apply(self, A):
+        """
+        returns the affine expression of size ``(N*p*m,1)`` stacking
+        the products ``A*x[i]`` for all elements ``x[i]`` (of size ``(n,m)``)
+        of the array, where ``A`` is a ``(p,n)`` matrix
+        (or anything that can be parsed by
+        :func:`_retrieve_matrix() <picos.tools._retrieve_matrix>`).
+        The coefficient matrix is built in one shot,
+        with :func:`_blocdiag() <picos.tools._blocdiag>`.
+
+        >>> import picos as pic
+        >>> prob = pic.Problem()
+        >>> x = prob.add_variable_array('x', 100, 3)
+        >>> x.apply([[1,1,1]]) <= 1
+        # (100x1)-affine constraint: |1|*x[:] < |1| #
+        """
+        N = self.numvars
+        n, m = self.size
+        Amat, Astr = _retrieve_matrix(A, n)
+        if Amat.size[1] != n:
+            raise Exception('incompatible dimensions')
+        p = Amat.size[0]
+        fac = _blocdiag(Amat, N * m)
+        return AffinExp({self.variable: fac}, None, (N * p * m, 1),
+                        Astr + '*' + self.name + '[:]')
+
+    def sum(self):
+        """
+        returns the affine expression of the size of the elements
+        equal to the sum of all elements of the array.
+        """
+        N = self.numvars
+        k = self.size[0] * self.size[1]
+        cols = np.arange(N * k)
+        fac = cvx.spmatrix(1., cols % k, cols, (k, N * k))
+        return AffinExp({self.variable: fac}, None, self.size,
+                        'Σ_i ' + self.name + '[i]')
+
+    def __lt__(self, exp):
+        return self.variable.__lt__(self._stacked(exp))
+
+    def __le__(self, exp):
+        return self.__lt__(exp)
+
+    def __gt__(self, exp):
+        return self.variable.__gt__(self._stacked(exp))
+
+    def __ge__(self, exp):
+        return self.__gt__(exp)
+
+    def __eq__(self, exp):
+        return self.variable.__eq__(self._stacked(exp))
+
+    __hash__ = object.__hash__
+
+
 class Set(object):
     """
     Parent class for set objects
@@ -3890,8 +4245,7 @@ class Truncated_Simplex(Set):
                     cons = (aff <= rhs)
                     cons.myconstring = exp.string + simptext
                 else:
-                    from .problem import Problem
-                    Ptmp = Problem()
+                    Ptmp = _Reformulation()
                     v = Ptmp.add_variable('v', n)
                     Ptmp.add_constraint(exp[:] < v)
                     Ptmp.add_constraint(-exp[:] < v)
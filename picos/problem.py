@@ -89,6 +89,7 @@ class Problem(object):
                            'A': None, 'b': None,  # equalities
                            'Gl': None, 'hl': None,  # inequalities
                            'Gq': None, 'hq': None,  # quadratic cone
+                           'dq': None,  # sizes of the cones of each Gq
                            'Gs': None, 'hs': None,  # semidefinite cone
                            'F': None, 'g': None,  # GP constraints
                            'quadcons': None}  # other quads
@@ -122,7 +123,10 @@ class Problem(object):
 
         self.groupsOfConstraints = {}
         self.listOfVars = {}
+        self.variableArrays = {}
         self.consNumbering = []
+        # real problem cached by solve() for complex problems
+        self._realP = None
 
         self._options = _NonWritableDict()
         if options is None:
@@ -189,7 +193,13 @@ class Problem(object):
                     '_npq',
                     '_nsk'):
                 continue
-            if '[' in vkey and ']' in vkey:
+            if vkey in self.variableArrays:
+                arr = self.variableArrays[vkey]
+                probstr += '\n' + vkey + ' \t: '
+                probstr += 'list of ' + str(arr.numvars) + ' variables, '
+                probstr += str(arr.size) + ', ' + arr.variable.vtype
+                probstr += arr.variable._bndtext
+            elif '[' in vkey and ']' in vkey:
                 lisname = vkey[:vkey.index('[')]
                 if lisname not in printedlis:
                     printedlis.append(lisname)
@@ -276,6 +286,7 @@ class Problem(object):
                            'A': None, 'b': None,  # equalities
                            'Gl': None, 'hl': None,  # inequalities
                            'Gq': None, 'hq': None,  # quadratic cone
+                           'dq': None,  # sizes of the cones of each Gq
                            'Gs': None, 'hs': None,  # semidefinite cone
                            'F': None, 'g': None,  # GP constraints
                            'quadcons': None}  # other quads
@@ -332,6 +343,7 @@ class Problem(object):
         self.reset_cplex_instance(False)
         self.reset_mosek_instance(False)
         self.reset_scip_instance(False)
+        self._realP = None
 
         for cons in self.constraints:
             cons.passed = []
@@ -384,6 +396,7 @@ class Problem(object):
         """
         for var in self.variables.values():
             var.bnd._reset()
+        self._realP = None
 
     def obj_value(self):
         """
@@ -558,7 +571,15 @@ class Problem(object):
 
           * ``timelimit = None`` : time limit for the solver, in seconds. The default
             ``None`` means no time limit.
-            *This option is currently ignored by cvxopt and smcp*.
+            *This option is ignored by cvxopt, smcp and sdpa, unless* ``solver_watchdog=True``
+            *or the problem is a mixed integer problem solved by cvxopt (by branch and bound)*.
+
+          * ``solver_watchdog = False`` : if ``True`` and a ``timelimit`` is given,
+            cvxopt, smcp and sdpa are run in a child process, which is terminated when the
+            time limit is reached. The solver then returns the status ``'timelimit'``, and
+            the last row of the progress table of the solver is given in
+            ``sol['last_iterate']`` (a dictionary whose keys are the column names,
+            plus ``'iteration'``).
 
           * ``treememory = None``  : size of the buffer for the branch and bound tree,
             in Megabytes.
@@ -580,7 +601,9 @@ class Problem(object):
             the solution
             specified (even partly) in the :attr:`value<picos.Variable.value>` attribute of the
             problem variables.
-            *This option currently works only with cplex, mosek and gurobi*.
+            *This option currently works only with cplex, mosek, gurobi and cvxopt.
+            With cvxopt, the values of all the variables must be given, and they are
+            used as the primal starting point of the interior point method*.
 
           * ``convert_quad_to_socp_if_needed = True`` : Do we convert the convex quadratics to
             second order cone constraints when the solver does not handle them directly ?
@@ -594,6 +617,43 @@ class Problem(object):
             When this option is set to ``None`` (default), PICOS chooses automatically whether the problem
             itself should be passed to the solver, or rather its dual.
 
+          * ``chordal_decomposition = False`` : If set to ``True``, the LMIs with a sparse aggregate
+            sparsity pattern are decomposed in smaller LMIs over the cliques of a chordal extension of
+            the pattern (cf. :func:`chordal_decomposition() <picos.Problem.chordal_decomposition>`),
+            and the decomposed problem is passed to the solver. The duals of the decomposed LMIs
+            are completed to positive semidefinite matrices.
+
+          * ``canonicalization_processes = 1`` : number of worker processes used to
+            compute the blocks of the canonical (cvxopt) form of the constraints
+            (the coefficients of the expressions are extracted and the sparse blocks
+            are assembled in the workers), which are then stacked in the order of
+            the constraints. If set to ``None``,
+            all the cores of the machine are used. With the default value ``1``, the
+            constraints are handled in the current process.
+            *This option concerns the solvers that use the cvxopt form of the problem
+            (cvxopt, smcp, sdpa, the writers and* :func:`dualize() <picos.Problem.dualize>` *)*.
+
+          * ``solution_cache = None`` : if set to the path of a directory (or to ``True``, for the
+            directory ``~/.picos/solution_cache``), the solutions are stored on the disk, and
+            :func:`solve() <picos.Problem.solve>` returns the stored solution of a problem whose
+            canonical form, solver and options are identical to those of a problem solved
+            before, without calling the solver. The returned dictionary then
+            contains ``sol['cached']=True``.
+
+          * ``solution_cache_size = 2**28`` : maximal size (in bytes) of the solution cache.
+            The least recently used solutions are deleted when the cache exceeds this size.
+
+          * ``small_problem_size = 0`` : if set to a positive number and no solver is specified,
+            the continuous LPs, SOCPs and SDPs with at most this number of scalar variables
+            (and at most ``4`` times this number of constraint rows) are solved by the dense
+            interior point method of :mod:`picos.dense_ipm`, without building the cvxopt
+            instance of the problem. This reduces the overhead per call to
+            :func:`solve() <picos.Problem.solve>` for tiny problems. This path is not taken
+            when one of the options ``solve_via_dual``, ``chordal_decomposition`` or
+            ``cone_handling='cuts'`` asks for a reformulation of the problem. If this method
+            fails (for example for an infeasible problem), the problem is passed to a solver
+            as usual. The default ``0`` disables it.
+
         * Specific options available for cvxopt/smcp:
 
           * ``feastol = None`` : feasibility tolerance passed to `cvx.solvers.options <http://abel.ee.ucla.edu/cvxopt/userguide/coneprog.html#algorithm-parameters>`_
@@ -608,6 +668,54 @@ class Problem(object):
             If ``reltol`` has the default value ``None``,
             then the value of the option ``tol``, multiplied by ``10``, is used.
 
+          * ``cone_handling = 'conic'`` : if set to ``'cuts'``, the second order cone
+            constraints are replaced by a polyhedral outer approximation, which is
+            refined by cutting planes after each LP solve, until the cones are violated
+            by at most ``cuts_tol``
+            (cf. :func:`outer_approximation() <picos.cutting_planes.outer_approximation>`).
+            The returned dictionary then contains the number of LPs solved
+            (``sol['cut_rounds']``) and of cuts generated (``sol['cuts']``). If the cuts
+            do not converge within ``cuts_maxrounds`` LPs, the problem is solved on its
+            cones. For mixed integer SOCPs, the nodes of the branch and bound are solved
+            in this way, each node inherits the cuts of its parent, and a node whose cuts
+            do not converge is solved on its cones. cvxopt solves the LPs with the same
+            interior point method as the cones, so that a node usually takes several times
+            longer than in the conic mode.
+            *This option currently works only with cvxopt*.
+
+          * ``cuts_tol = 1e-6`` : tolerance on the violation of the cones
+            (``||s1||-s0``, or minus the smallest eigenvalue of an LMI) when
+            ``cone_handling='cuts'``.
+
+          * ``cuts_maxrounds = 100`` : maximal number of LPs solved (per node of the
+            branch and bound) when ``cone_handling='cuts'``.
+
+          * ``cuts_on_lmis = False`` : if ``True`` and ``cone_handling='cuts'``, the LMIs
+            are also outer approximated, by the cuts ``v'Sv >= 0`` for the eigenvectors
+            ``v`` of the negative eigenvalues of their slack ``S``.
+
+        * Specific options available for the mixed integer problems solved by cvxopt:
+
+          Mixed integer LPs, SOCPs and SDPs are solved by the
+          :func:`branch_and_bound() <picos.branch_and_bound.branch_and_bound>`
+          of picos, whose continuous relaxations are solved by cvxopt. The options
+          ``timelimit``, ``gaplim``, ``nbsol``, ``uboundlimit``, ``lboundlimit``,
+          ``acceptable_gap_at_timelimit`` and ``boundMonitor`` are honoured, and
+          the returned dictionary contains the number of relaxations solved
+          (``sol['bnb_nodes']``), the number of integer feasible nodes
+          (``sol['bnb_solutions']``), the best bound (``sol['bound']``) and the
+          relative gap (``sol['gap']``). The status is ``'feasible'`` if a solution
+          was found, but its optimality could not be proven because the relaxation
+          of a node could not be solved.
+
+          * ``bnb_node_selection = 'best-bound'`` : order in which the nodes of the tree
+            are explored, ``'best-bound'`` (the node whose parent has the best bound first),
+            ``'depth-first'`` or ``'breadth-first'``.
+
+          * ``bnb_processes = 1`` : number of nodes whose relaxations are solved at a time,
+            in as many worker processes. If set to ``None``, all the cores of the
+            machine are used.
+
         * Specific options available for cplex:
 
           * ``cplex_params = {}`` : a dictionary of
@@ -625,9 +733,11 @@ class Problem(object):
 
           * ``uboundlimit = None`` : tells CPLEX to stop as soon as an upper
             bound smaller than this value is found.
+            *This option is also used by the branch and bound of cvxopt*.
 
           * ``lboundlimit = None`` : tells CPLEX to stop as soon as a lower
             bound larger than this value is found.
+            *This option is also used by the branch and bound of cvxopt*.
 
           * ``boundMonitor = True`` : tells CPLEX to store information about
             the evolution of the bounds during the solving process. At the end
@@ -726,6 +836,18 @@ class Problem(object):
                            'handleBarVars': True,
                            'handleConeVars': True,
                            'solve_via_dual': None,
+                           'chordal_decomposition': False,
+                           'canonicalization_processes': 1,
+                           'solution_cache': None,
+                           'solution_cache_size': 2**28,
+                           'solver_watchdog': False,
+                           'small_problem_size': 0,
+                           'bnb_node_selection': 'best-bound',
+                           'bnb_processes': 1,
+                           'cone_handling': 'conic',
+                           'cuts_tol': 1e-6,
+                           'cuts_maxrounds': 100,
+                           'cuts_on_lmis': False,
                            }
 
         self._options = _NonWritableDict(default_options)
@@ -893,27 +1015,7 @@ class Problem(object):
         if len(size) == 1:
             size = (int(size[0]), 1)
 
-        lisname = None
-        if '[' in name and ']' in name:  # list or dict of variables
-            lisname = name[:name.index('[')]
-            ind = name[name.index('[') + 1:name.index(']')]
-            if lisname in self.listOfVars:
-                oldn = self.listOfVars[lisname]['numvars']
-                self.listOfVars[lisname]['numvars'] += 1
-                if size != self.listOfVars[lisname]['size']:
-                    self.listOfVars[lisname]['size'] = 'different'
-                if vtype != self.listOfVars[lisname]['vtype']:
-                    self.listOfVars[lisname]['vtype'] = 'different'
-                if self.listOfVars[lisname][
-                        'type'] == 'list' and ind != str(oldn):
-                    self.listOfVars[lisname]['type'] = 'dict'
-            else:
-                self.listOfVars[lisname] = {
-                    'numvars': 1, 'size': size, 'vtype': vtype}
-                if ind == '0':
-                    self.listOfVars[lisname]['type'] = 'list'
-                else:
-                    self.listOfVars[lisname]['type'] = 'dict'
+        lisname = self._list_of_vars_entry(name, size, vtype)
 
         countvar = self.countVar
         numbervar = self.numberOfVars
@@ -994,16 +1096,163 @@ class Problem(object):
                                         vtype=vtype,
                                         lower=lower,
                                         upper=upper)
+        self._list_of_vars_bnd(lisname, self.variables[name])
+
+        return self.variables[name]
+
+    def _list_of_vars_entry(self, name, size, vtype):
+        """
+        updates the description of the list (or dict) of variables
+        ``self.listOfVars``, if ``name`` has the form ``lisname[ind]``,
+        and returns ``lisname`` (or ``None``).
+        """
+        lisname = None
+        if '[' in name and ']' in name:  # list or dict of variables
+            lisname = name[:name.index('[')]
+            ind = name[name.index('[') + 1:name.index(']')]
+            if lisname in self.listOfVars:
+                oldn = self.listOfVars[lisname]['numvars']
+                self.listOfVars[lisname]['numvars'] += 1
+                if size != self.listOfVars[lisname]['size']:
+                    self.listOfVars[lisname]['size'] = 'different'
+                if vtype != self.listOfVars[lisname]['vtype']:
+                    self.listOfVars[lisname]['vtype'] = 'different'
+                if self.listOfVars[lisname][
+                        'type'] == 'list' and ind != str(oldn):
+                    self.listOfVars[lisname]['type'] = 'dict'
+            else:
+                self.listOfVars[lisname] = {
+                    'numvars': 1, 'size': size, 'vtype': vtype}
+                if ind == '0':
+                    self.listOfVars[lisname]['type'] = 'list'
+                else:
+                    self.listOfVars[lisname]['type'] = 'dict'
+        return lisname
+
+    def _list_of_vars_bnd(self, lisname, var):
+        """updates the bound text of the list of variables ``lisname``"""
         if lisname is not None:
             if 'bnd' in self.listOfVars[lisname]:
                 bndtext = self.listOfVars[lisname]['bnd']
-                thisbnd = self.variables[name]._bndtext
+                thisbnd = var._bndtext
                 if bndtext != thisbnd:
                     self.listOfVars[lisname]['bnd'] = ', some bounds'
             else:
-                self.listOfVars[lisname]['bnd'] = self.variables[name]._bndtext
+                self.listOfVars[lisname]['bnd'] = var._bndtext
 
-        return self.variables[name]
+    def _adopt_variable(self, var, name):
+        """
+        registers the variable ``var`` of a
+        :class:`_Reformulation <picos.constraint._Reformulation>` under the
+        name ``name``, at the end of the vector of all variables
+        (the variable object is not copied).
+        """
+        if name in self.variables:
+            raise Exception('this variable already exists')
+        lisname = self._list_of_vars_entry(name, var.size, var.vtype)
+        nv = var._endIndex - var._startIndex
+        var.name = name
+        var.parent_problem = self
+        var.Id = self.countVar
+        var._startIndex = self.numberOfVars
+        var._endIndex = self.numberOfVars + nv
+        self.numberOfVars += nv
+        self.varNames.append(name)
+        self.countVar += 1
+        self.variables[name] = var
+        self._list_of_vars_bnd(lisname, var)
+
+    def add_variable_array(
+            self,
+            name,
+            shape,
+            size=1,
+            vtype='continuous',
+            lower=None,
+            upper=None):
+        """
+        adds an array of variables of the same size in the problem,
+        and returns the corresponding instance of the class
+        :class:`VariableArray <picos.VariableArray>`.
+
+        This is a lightweight alternative to a list of variables named
+        ``'x[0]'``, ``'x[1]'``, ... : all the elements are stored in one
+        contiguous block of columns, i.e., in a single
+        :class:`Variable <picos.Variable>` named ``name``,
+        and ``x[i]`` returns an affine expression selecting the ith element.
+
+        >>> prob=pic.Problem()
+        >>> x=prob.add_variable_array('x',5,(2,2))
+        >>> x
+        # array of 5 variables x:(2 x 2),continuous #
+        >>> x[3]
+        # (2 x 2)-affine expression: x[3] #
+        >>> c=prob.add_constraint(x.sum() == 'I')
+        >>> print(prob) #doctest: +NORMALIZE_WHITESPACE
+        ---------------------
+        optimization problem  (LP):
+        20 variables, 4 affine constraints
+        <BLANKLINE>
+        x   : list of 5 variables, (2, 2), continuous
+        <BLANKLINE>
+            find vars
+        such that
+          Σ_i x[i] = I
+        ---------------------
+
+        :param name: The name of the array of variables.
+        :type name: str.
+        :param shape: The number of elements in the array (``int``), or a
+                      ``tuple`` of ints for a multidimensional array
+                      (in which case ``x[i,j]`` is an element).
+        :type shape: int or tuple.
+        :param size: The size of each element (cf. :func:`add_variable() <picos.Problem.add_variable>`).
+        :type size: int or tuple.
+        :param vtype: variable :attr:`type <picos.Variable.vtype>`.
+                      Only ``'continuous'``, ``'binary'``, ``'integer'``,
+                      ``'semicont'`` and ``'semiint'`` are supported.
+        :type vtype: str.
+        :param lower: a lower bound for the elements of the array. Can be a scalar, a matrix
+                      of the size of the elements (the same bound is used for all of them),
+                      or a vector of the size of the whole block.
+        :param upper: an upper bound for the elements of the array (same format as ``lower``).
+
+        :returns: An instance of the class :class:`VariableArray <picos.VariableArray>`.
+        """
+        if isinstance(shape, six.integer_types):
+            shape = (int(shape),)
+        else:
+            shape = tuple(int(s) for s in shape)
+        if isinstance(size, six.integer_types):
+            size = (int(size), 1)
+        else:
+            size = tuple(int(x) for x in size)
+        if len(size) == 1:
+            size = (int(size[0]), 1)
+        if vtype not in ('continuous', 'binary', 'integer',
+                         'semicont', 'semiint'):
+            raise ValueError(
+                'vtype {0} is not supported for arrays of variables'.format(vtype))
+        if '[' in name or ']' in name:
+            raise ValueError('the name of an array cannot contain brackets')
+        N = int(np.prod(shape))
+        k = size[0] * size[1]
+        if N * k == 0:
+            raise ValueError('empty array of variables')
+
+        def stacked_bound(bnd):
+            if bnd is None:
+                return None
+            mat = _retrieve_matrix(bnd, size)[0]
+            if mat.size == size:
+                mat = cvx.sparse([mat[:]] * N)
+            return mat
+
+        var = self.add_variable(name, (N * k, 1), vtype,
+                                stacked_bound(lower), stacked_bound(upper))
+        arr = VariableArray(var, shape, size)
+        self.variableArrays[name] = arr
+        return arr
 
     def remove_variable(self, name):
         """
@@ -1025,6 +1274,8 @@ class Problem(object):
             raise Exception(
                 'variable does not exist. Maybe you tried to remove some item x[i] of the variable x ?')
         self.countVar -= 1
+        if name in self.variableArrays:
+            del self.variableArrays[name]
         var = self.variables[name]
         sz = var.size
         self.numberOfVars -= sz[0] * sz[1]
@@ -1081,6 +1332,9 @@ class Problem(object):
         for (iv, v) in sorted([(v.startIndex, v)
                                for v in self.variables.values()]):
             cvars[v.name] = cop.add_variable(v.name, v.size, v.vtype)
+        for name, arr in six.iteritems(self.variableArrays):
+            cop.variableArrays[name] = VariableArray(
+                cvars[name], arr.shape, arr.size)
         for c in self.constraints:
             """old version doesnt handle conevars and bounded vars
             c2=copy.deepcopy(c)
@@ -1093,7 +1347,8 @@ class Problem(object):
             E1 = _copy_exp_to_new_vars(c.Exp1, cvars)
             E2 = _copy_exp_to_new_vars(c.Exp2, cvars)
             E3 = _copy_exp_to_new_vars(c.Exp3, cvars)
-            c2 = Constraint(c.typeOfConstraint, None, E1, E2, E3)
+            c2 = Constraint(c.typeOfConstraint, None, E1, E2, E3,
+                            coneSizes=c.coneSizes)
             cop.add_constraint(c2, c.key)
         obj = _copy_exp_to_new_vars(self.objective[1], cvars)
         cop.set_objective(self.objective[0], obj)
@@ -1117,20 +1372,18 @@ class Problem(object):
         """
         # SPECIAL CASE OF A NONSTANDARD CONVEX CONSTRAINT
         if isinstance(cons, _Convex_Constraint):
-            for ui, vui in six.iteritems(cons.Ptmp.variables):
-                uiname = cons.prefix + str(self.countGeomean) + '_' + ui
-                self.add_variable(uiname, vui.size, vui.vtype)
-                si = self.variables[uiname].startIndex
-                ei = self.variables[uiname].endIndex
-                self.variables[uiname] = vui
-                self.variables[uiname]._startIndex = si
-                self.variables[uiname]._endIndex = ei
-                self.variables[uiname].name = uiname
+            # adopts the auxiliary variables of the reformulation
+            prefix = cons.prefix + str(self.countGeomean) + '_'
+            for ui in cons.Ptmp.varNames:
+                self._adopt_variable(cons.Ptmp.variables[ui], prefix + ui)
 
+            # the constraints of the reformulation are standard constraints,
+            # which are added (and later canonicalized) one by one
             indcons = self.countCons
             self.add_list_of_constraints(cons.Ptmp.constraints, key=key)
-            goc = self.groupsOfConstraints[indcons]
-            goc[1] = cons.constring() + '\n'
+            if indcons in self.groupsOfConstraints:
+                goc = self.groupsOfConstraints[indcons]
+                goc[1] = cons.constring() + '\n'
             self.countGeomean += 1
             if ret:
                 return cons
@@ -1185,6 +1438,13 @@ class Problem(object):
             if cons.typeOfConstraint[:2] == 'RS':
                 self.numberConeVars += 1
 
+        elif cons.typeOfConstraint[2:] == 'cones':
+            ncones = len(cons.coneSizes)
+            self.numberConeVars += (cons.Exp1.size[0] * cons.Exp1.size[1]) + ncones
+            self.numberConeConstraints += ncones
+            if cons.typeOfConstraint[:2] == 'RS':
+                self.numberConeVars += ncones
+
         elif cons.typeOfConstraint == 'lse':
             self.numberLSEVars += (cons.Exp1.size[0] * cons.Exp1.size[1])
             self.numberLSEConstraints += 1
@@ -1396,6 +1656,8 @@ class Problem(object):
         :type name: str.
         """
         var = name
+        if var in self.variableArrays:
+            return self.variableArrays[var]
         if var in self.listOfVars.keys():
             if self.listOfVars[var]['type'] == 'dict':
                 rvar = {}
@@ -1637,6 +1899,13 @@ class Problem(object):
                 self.numberConeConstraints -= 1
                 if cons.typeOfConstraint[:2] == 'RS':
                     self.numberConeVars -= 1
+            elif cons.typeOfConstraint[2:] == 'cones':
+                ncones = len(cons.coneSizes)
+                self.numberConeVars -= (
+                    (cons.Exp1.size[0] * cons.Exp1.size[1]) + ncones)
+                self.numberConeConstraints -= ncones
+                if cons.typeOfConstraint[:2] == 'RS':
+                    self.numberConeVars -= ncones
             elif cons.typeOfConstraint == 'lse':
                 self.numberLSEVars -= (cons.Exp1.size[0] * cons.Exp1.size[1])
                 self.numberLSEConstraints -= 1
@@ -1709,6 +1978,13 @@ class Problem(object):
                     self.numberConeConstraints -= 1
                     if cons.typeOfConstraint[:2] == 'RS':
                         self.numberConeVars -= 1
+                elif cons.typeOfConstraint[2:] == 'cones':
+                    ncones = len(cons.coneSizes)
+                    self.numberConeVars -= (
+                        (cons.Exp1.size[0] * cons.Exp1.size[1]) + ncones)
+                    self.numberConeConstraints -= ncones
+                    if cons.typeOfConstraint[:2] == 'RS':
+                        self.numberConeVars -= ncones
                 elif cons.typeOfConstraint == 'lse':
                     self.numberLSEVars -= (cons.Exp1.size[0]
                                            * cons.Exp1.size[1])
@@ -2557,7 +2833,9 @@ class Problem(object):
         # parse all variable for the obective (only if not obj_passed)
         newobjcoefs = []
         quad_terms = []
+        newobj = False
         if 'cplex' not in self.obj_passed:
+            newobj = True
             self.obj_passed.append('cplex')
 
             if self.objective[1] is None:
@@ -2798,6 +3076,11 @@ class Problem(object):
             print()
             print('Passing to cplex...')
 
+        if newobj and NUMVAR_OLD > 0:
+            # the coefficients of the previous objective are removed
+            c.objective.set_linear([(j, 0.) for j in range(NUMVAR_OLD)])
+            if c.objective.get_num_quadratic_nonzeros() > 0:
+                c.objective.set_quadratic([0.] * NUMVAR_OLD)
         c.variables.add(names=colnames, types=types)
         if lb:
             c.variables.set_lower_bounds(six.iteritems(lb))
@@ -2874,6 +3157,7 @@ class Problem(object):
             self.cvxoptVars['hl'] = cvx.matrix([], (0, 1), tc='d')
             self.cvxoptVars['Gq'] = []
             self.cvxoptVars['hq'] = []
+            self.cvxoptVars['dq'] = []
             self.cvxoptVars['Gs'] = []
             self.cvxoptVars['hs'] = []
             self.cvxoptVars['quadcons'] = []
@@ -2890,9 +3174,12 @@ class Problem(object):
                 self.cvxoptVars['Gs'][i] = cvx.sparse(
                     [[Gsi], [cvx.spmatrix([], [], [], (Gsi.size[0], nv), tc='d')]])
 
-        # objective
+        # objective: when the objective changed, only c (or the first K[0]
+        # rows of F and g for a GP) is updated in place
         if not((new_scip_cons_only and 'scip' in self.obj_passed) or
                (new_cvxopt_cons_only and 'cvxopt' in self.obj_passed)):
+            self.cvxoptVars['quadcons'] = [
+                qc for qc in self.cvxoptVars['quadcons'] if qc[0] != '_obj']
             if isinstance(self.objective[1], QuadExp):
                 self.cvxoptVars['quadcons'].append(('_obj', -1))
                 objexp = self.objective[1].aff
@@ -2911,17 +3198,26 @@ class Problem(object):
                     self.cvxoptVars['c'] = -cvx.matrix(c, tc='d').T
             else:
                 if self.objective[0] == 'find':
-                    self.cvxoptVars['F'] = cvx.matrix(0, (1, ss), tc='d')
-                    self.cvxoptVars['K'] = [0]
+                    F = cvx.matrix(0, (1, ss), tc='d')
+                    g = cvx.matrix(0, (1, 1), tc='d')
                 else:
                     (F, g) = self._makeGandh(objexp)
+                    F = cvx.matrix(F, tc='d')
+                    g = cvx.matrix(g, tc='d')
+                    if self.objective[0] == 'max':
+                        F, g = -F, -g
+                K = self.cvxoptVars.get('K')
+                if (not reset and K and self.cvxoptVars['F'] is not None
+                        and self.cvxoptVars['F'].size[1] == ss):
+                    # the rows of the LSE constraints are kept
+                    self.cvxoptVars['K'] = [F.size[0]] + K[1:]
+                    F = cvx.sparse([cvx.sparse(F),
+                                    self.cvxoptVars['F'][K[0]:, :]])
+                    g = cvx.matrix([g, self.cvxoptVars['g'][K[0]:]])
+                else:
                     self.cvxoptVars['K'] = [F.size[0]]
-                    if self.objective[0] == 'min':
-                        self.cvxoptVars['F'] = cvx.matrix(F, tc='d')
-                        self.cvxoptVars['g'] = cvx.matrix(g, tc='d')
-                    elif self.objective[0] == 'max':
-                        self.cvxoptVars['F'] = -cvx.matrix(F, tc='d')
-                        self.cvxoptVars['g'] = -cvx.matrix(g, tc='d')
+                self.cvxoptVars['F'] = F
+                self.cvxoptVars['g'] = g
 
             if not(aff_part_of_quad) and isinstance(
                     self.objective[1], QuadExp):
@@ -2946,7 +3242,13 @@ class Problem(object):
             prog = ProgressBar(0, limitbar, None, mode='fixed')
             oldprog = str(prog)
 
-        # constraints
+        # constraints: each constraint is described by a task
+        # (k, destination, segments, ss), where the segments refer to the
+        # expressions of the constraint by their names. The rows of each
+        # constraint are computed by _canonical_rows (possibly in a process
+        # pool, whose workers share self.constraints), and finally stacked
+        # in the order of the constraints
+        tasks = []
         for k, consk in enumerate(self.constraints):
             if self.options['verbose'] > 1:
                 #<--display progress
@@ -2967,83 +3269,104 @@ class Problem(object):
                 else:
                     consk.passed.append('cvxopt')
             # linear constraints
-            if consk.typeOfConstraint[:3] == 'lin':
+            if consk.typeOfConstraint[:3] in ('lin', 'sdp'):
                 sense = consk.typeOfConstraint[3]
-                (G_lhs, h_lhs) = self._makeGandh(consk.Exp1)
-                (G_rhs, h_rhs) = self._makeGandh(consk.Exp2)
-                if sense == '=':
-                    self.cvxoptVars['A'] = cvx.sparse(
-                        [self.cvxoptVars['A'], G_lhs - G_rhs])
-                    self.cvxoptVars['b'] = cvx.matrix(
-                        [self.cvxoptVars['b'], h_rhs - h_lhs])
-                elif sense == '<':
-                    self.cvxoptVars['Gl'] = cvx.sparse(
-                        [self.cvxoptVars['Gl'], G_lhs - G_rhs])
-                    self.cvxoptVars['hl'] = cvx.matrix(
-                        [self.cvxoptVars['hl'], h_rhs - h_lhs])
-                elif sense == '>':
-                    self.cvxoptVars['Gl'] = cvx.sparse(
-                        [self.cvxoptVars['Gl'], G_rhs - G_lhs])
-                    self.cvxoptVars['hl'] = cvx.matrix(
-                        [self.cvxoptVars['hl'], h_lhs - h_rhs])
+                if consk.typeOfConstraint[:3] == 'sdp':
+                    dest = 'Gs'
                 else:
-                    raise NameError('unexpected case')
-            elif consk.typeOfConstraint == 'SOcone':
-                if not(cone_as_quad):
-                    (A, b) = self._makeGandh(consk.Exp1)
-                    (c, d) = self._makeGandh(consk.Exp2)
-                    self.cvxoptVars['Gq'].append(cvx.sparse([-c, -A]))
-                    self.cvxoptVars['hq'].append(cvx.matrix([d, b]))
+                    dest = 'A' if sense == '=' else 'Gl'
+                if sense == '>':
+                    seg = [(-1., 'Exp1'), (1., 'Exp2')]
+                elif sense == '<' or (sense == '=' and dest == 'A'):
+                    seg = [(1., 'Exp1'), (-1., 'Exp2')]
                 else:
-                    self.cvxoptVars['quadcons'].append(
-                        (k, self.cvxoptVars['Gl'].size[0]))
-                    if aff_part_of_quad:
-                        raise Exception('cone_as_quad + aff_part_of_quad')
-            elif consk.typeOfConstraint == 'RScone':
+                    raise NameError('unexpected case')
+                tasks.append((k, dest, [seg], ss))
+            elif consk.typeOfConstraint in ('SOcone', 'RScone',
+                                            'SOcones', 'RScones'):
                 if not(cone_as_quad):
-                    (A, b) = self._makeGandh(consk.Exp1)
-                    (c1, d1) = self._makeGandh(consk.Exp2)
-                    (c2, d2) = self._makeGandh(consk.Exp3)
-                    self.cvxoptVars['Gq'].append(
-                        cvx.sparse([-c1 - c2, -2 * A, c2 - c1]))
-                    self.cvxoptVars['hq'].append(
-                        cvx.matrix([d1 + d2, 2 * b, d1 - d2]))
+                    if consk.typeOfConstraint[:2] == 'SO':
+                        # [-c;-A] x <= [d;b]
+                        segs = [[(-1., 'Exp2')], [(-1., 'Exp1')]]
+                    else:
+                        # [-c1-c2;-2A;c2-c1] x <= [d1+d2;2b;d1-d2]
+                        segs = [[(-1., 'Exp2'), (-1., 'Exp3')],
+                                [(-2., 'Exp1')],
+                                [(-1., 'Exp2'), (1., 'Exp3')]]
+                    # the rows of a block of cones are computed at once,
+                    # and stored in a single block of Gq (cf. _cone_block_rows)
+                    if consk.typeOfConstraint[-1] == 's':
+                        tasks.append((k, 'Gqs', segs, ss))
+                    else:
+                        tasks.append((k, 'Gq', segs, ss))
                 else:
-                    self.cvxoptVars['quadcons'].append(
-                        (k, self.cvxoptVars['Gl'].size[0]))
                     if aff_part_of_quad:
                         raise Exception('cone_as_quad + aff_part_of_quad')
+                    tasks.append((k, 'quad', [], ss))
             elif consk.typeOfConstraint == 'lse':
-                (F, g) = self._makeGandh(consk.Exp1)
-                self.cvxoptVars['F'] = cvx.sparse([self.cvxoptVars['F'], F])
-                self.cvxoptVars['g'] = cvx.matrix([self.cvxoptVars['g'], g])
-                self.cvxoptVars['K'].append(F.size[0])
+                tasks.append((k, 'lse', [[(1., 'Exp1')]], ss))
             elif consk.typeOfConstraint == 'quad':
-                self.cvxoptVars['quadcons'].append(
-                    (k, self.cvxoptVars['Gl'].size[0]))
                 if aff_part_of_quad:
                     # quadratic part handled later
-                    (G_lhs, h_lhs) = self._makeGandh(consk.Exp1.aff)
-                    self.cvxoptVars['Gl'] = cvx.sparse(
-                        [self.cvxoptVars['Gl'], G_lhs])
-                    self.cvxoptVars['hl'] = cvx.matrix(
-                        [self.cvxoptVars['hl'], -h_lhs])
-            elif consk.typeOfConstraint[:3] == 'sdp':
-                sense = consk.typeOfConstraint[3]
-                (G_lhs, h_lhs) = self._makeGandh(consk.Exp1)
-                (G_rhs, h_rhs) = self._makeGandh(consk.Exp2)
-                if sense == '<':
-                    self.cvxoptVars['Gs'].append(G_lhs - G_rhs)
-                    self.cvxoptVars['hs'].append(h_rhs - h_lhs)
-                elif sense == '>':
-                    self.cvxoptVars['Gs'].append(G_rhs - G_lhs)
-                    self.cvxoptVars['hs'].append(h_lhs - h_rhs)
+                    tasks.append((k, 'quad', [[(1., 'aff')]], ss))
                 else:
-                    raise NameError('unexpected case')
-
+                    tasks.append((k, 'quad', [], ss))
             else:
                 raise NameError('unexpected case')
 
+        try:
+            blocks = _parallel_map(_canonical_rows, tasks,
+                                   self.options['canonicalization_processes'],
+                                   initializer=_set_canonical_constraints,
+                                   initargs=(self.constraints,))
+        finally:
+            _set_canonical_constraints([])
+
+        # the rows of A and Gl are stacked at once
+        stacks = {'A': ([], [], [], []), 'Gl': ([], [], [], [])}
+        nrows = {'A': self.cvxoptVars['A'].size[0],
+                 'Gl': self.cvxoptVars['Gl'].size[0]}
+        for (k, dest, segs, _), block in zip(tasks, blocks):
+            if dest == 'quad':
+                self.cvxoptVars['quadcons'].append((k, nrows['Gl']))
+                if block is None:
+                    continue
+                dest = 'Gl'
+            if dest in ('A', 'Gl'):
+                I, J, V, h = block
+                stk = stacks[dest]
+                stk[0].append(I + nrows[dest])
+                stk[1].append(J)
+                stk[2].append(V)
+                stk[3].append(h)
+                nrows[dest] += len(h)
+                continue
+            G, h, dims = block
+            if dest == 'lse':
+                self.cvxoptVars['F'] = cvx.sparse([self.cvxoptVars['F'], G])
+                self.cvxoptVars['g'] = cvx.matrix([self.cvxoptVars['g'], -h])
+                self.cvxoptVars['K'].append(G.size[0])
+            elif dest in ('Gq', 'Gqs'):
+                self.cvxoptVars['Gq'].append(G)
+                self.cvxoptVars['hq'].append(h)
+                self.cvxoptVars['dq'].append(dims)
+            else:
+                self.cvxoptVars['Gs'].append(G)
+                self.cvxoptVars['hs'].append(h)
+        for (dest, rhs) in (('A', 'b'), ('Gl', 'hl')):
+            (I, J, V, h) = stacks[dest]
+            if not h:
+                continue
+            oldrows = self.cvxoptVars[dest].size[0]
+            G = _triplets_to_spmatrix(
+                np.concatenate(V), np.concatenate(I) - oldrows,
+                np.concatenate(J), (nrows[dest] - oldrows, ss))
+            if oldrows > 0:
+                G = cvx.sparse([self.cvxoptVars[dest], G])
+            self.cvxoptVars[dest] = G
+            self.cvxoptVars[rhs] = cvx.matrix(
+                [self.cvxoptVars[rhs], cvx.matrix(np.concatenate(h))])
+
         # hard-coded bounds
         if hard_coded_bounds:
             for (var, variable) in six.iteritems(self.variables):
@@ -3376,6 +3699,10 @@ class Problem(object):
         if 'mosek' not in self.obj_passed:
             newobj = True
             self.obj_passed.append('mosek')
+            if NUMVAR_OLD > 0:
+                # the coefficients of the previous objective are removed
+                task.putclist(list(range(NUMVAR_OLD)), [0.] * NUMVAR_OLD)
+                task.putqobj([], [], [])
             if self.objective[1]:
                 obj = self.objective[1]
                 subI = []
@@ -4341,6 +4668,48 @@ class Problem(object):
         self.set_objective('max', obj)
         return self.solve(**options)
 
+    def sweep_objective(self, objectives, **options):
+        """
+        solves the problem successively for each objective of the list
+        ``objectives``, whose elements are pairs ``(typ, expr)`` as in
+        :func:`set_objective() <picos.Problem.set_objective>`, and returns the
+        list of the dictionaries returned by
+        :func:`solve() <picos.Problem.solve>`.
+
+        Only the objective of the solver instance is updated between two
+        solves, and each solve is hot-started from the solution of the
+        previous one (cf. the option ``hotstart``). The problem keeps the last
+        objective of the list.
+
+        :keyword options: options passed to
+                          :func:`solve() <picos.Problem.solve>`.
+
+        **Example:**
+
+        >>> import picos as pic
+        >>> import cvxopt as cvx
+        >>> P = pic.Problem()
+        >>> x = P.add_variable('x', 2)
+        >>> P.add_constraint(x > 0)
+        >>> P.add_constraint((1 | x) < 1)
+        >>> sols = P.sweep_objective([('max', x[0]), ('max', x[1]),
+        ...                           ('min', x[0] - x[1])],
+        ...                          solver='cvxopt', verbose=0)
+        >>> [round(sol['obj'], 6) for sol in sols]
+        [1.0, 1.0, -1.0]
+        """
+        hotstart = self.options['hotstart']
+        sols = []
+        try:
+            for k, (typ, expr) in enumerate(objectives):
+                self.set_objective(typ, expr)
+                if k > 0:
+                    options['hotstart'] = True
+                sols.append(self.solve(**options))
+        finally:
+            self.set_option('hotstart', hotstart)
+        return sols
+
     def solve(self, **options):
         """
         Solves the problem.
@@ -4368,14 +4737,31 @@ class Problem(object):
         if options is None:
             options = {}
         self.update_options(**options)
-        if self.options['solver'] is None:
-            self.solver_selection()
 
         # self._eliminate_useless_variables()
 
         if isinstance(self.objective[1], GeneralFun):
+            if self.options['solver'] is None:
+                self.solver_selection()
             return self._sqpsolve(options)
 
+        # is the solution in the cache ?
+        cache = None
+        if self.options['solution_cache']:
+            cache = _SolutionCache(self.options['solution_cache'],
+                                   self.options['solution_cache_size'])
+            cachekey = self._solution_cache_key()
+            record = cache.load(cachekey)
+            if record is not None:
+                return self._set_cached_solution(record)
+
+        # small problems are solved by the dense interior point method
+        dense = None
+        if self.options['solver'] is None:
+            dense = self._dense_solve()
+            if dense is None:
+                self.solver_selection()
+
         # is it a complex SDP that we must transform to a real problem ?
         complexSDP = self.is_complex()
 
@@ -4383,22 +4769,36 @@ class Problem(object):
             # do we pass the primal or the dual to the solver ?
             solve_via_dual = self.options['solve_via_dual']
             if solve_via_dual is None:
-                if (self.numberSDPConstraints > 0 and len([1 for v in self.variables.values(
+                if not self.is_continuous():
+                    solve_via_dual = False
+                elif (self.numberSDPConstraints > 0 and len([1 for v in self.variables.values(
                 ) if v.semiDef]) < 0.3 * self.numberSDPConstraints):  # thats empirical !
                     solve_via_dual = True
                 else:
                     solve_via_dual = False
 
+        # decompose the sparse LMIs
+        chordalP = None
+        if (dense is None and not complexSDP
+                and self.options['chordal_decomposition']
+                and self.numberSDPConstraints > 0):
+            chordalP = self.chordal_decomposition()
+            if not any(m[0] == 'lmi' for m in chordalP._chordal_map):
+                chordalP = None
+
+        if dense is not None:
+            primals, duals, obj, sol = dense
+
         # transform the problem in case of a complex SDP
-        if complexSDP:
+        elif complexSDP:
             if self.options['verbose'] > 0:
                 print('*** Making the problem real...  ***')
 
-            realP = self.to_real()
+            realP = self._cached_real_problem()
             if self.options['verbose'] > 0:
                 print(
                     '*** OK, solve the real problem and transform the solution as in the original problem...  ***')
-            sol = realP.solve()
+            sol = realP.solve(solution_cache=None)
             obj = sol['obj']
             if 'noprimals' in self.options and self.options['noprimals']:
                 pass
@@ -4435,6 +4835,41 @@ class Problem(object):
                     else:
                         duals.append(cst.dual)
 
+        # solve the problem with decomposed LMIs instead
+        elif chordalP is not None:
+            if self.options['verbose'] > 0:
+                print('*** Solving the problem with decomposed LMIs...  ***')
+            sol = chordalP.solve(solution_cache=None)
+            obj = sol['obj']
+            if 'noprimals' in self.options and self.options['noprimals']:
+                pass
+            else:
+                primals = {}
+                for var in self.variables.values():
+                    primals[var.name] = chordalP.get_valued_variable(var.name)
+
+            if 'noduals' in self.options and self.options['noduals']:
+                pass
+            else:
+                duals = []
+                for m in chordalP._chordal_map:
+                    if m[0] == 'cons':
+                        duals.append(chordalP.constraints[m[1]].dual)
+                        continue
+                    # complete the partial dual given by the clique duals
+                    n, cliques, indices = m[1:]
+                    Z = np.zeros((n, n))
+                    for C, j in zip(cliques, indices):
+                        Zk = chordalP.constraints[j].dual
+                        if Zk is None:
+                            Z = None
+                            break
+                        Z[np.ix_(C, C)] = np.asarray(Zk)
+                    if Z is None:
+                        duals.append(None)
+                    else:
+                        duals.append(cvx.matrix(_psd_completion(Z, cliques)))
+
         # solve the dual problem instead
         elif solve_via_dual:
             converted = False
@@ -4471,7 +4906,7 @@ class Problem(object):
                         print ('I retry to solve without dualizing')
                     return self.solve(solve_via_dual=False)
 
-                sol = dual.solve()
+                sol = dual.solve(solution_cache=None)
                 obj = -sol['obj']
                 if 'noprimals' in self.options and self.options['noprimals']:
                     pass
@@ -4519,14 +4954,24 @@ class Problem(object):
                         eqiter = iter(dual.get_valued_variable('mue'))
                     if 'mul' in dual.variables:
                         initer = iter(dual.get_valued_variable('mul'))
+                    def cone_dual(icone):
+                        k, p = dual._dualized_cones[icone]
+                        lb = dual.get_variable('lbda_' + str(k))[p].value
+                        if k > 1:
+                            z = dual.get_variable('zs_' + str(k))[p].value
+                            return cvx.matrix([lb, z])
+                        else:
+                            return cvx.matrix(lb)
                     for cons in self.constraints:
                         if cons.typeOfConstraint[2:] == 'cone':
-                            z = dual.get_valued_variable(
-                                'zs[{0}]'.format(icone))
-                            lb = dual.get_valued_variable(
-                                'lbda[{0}]'.format(icone))
-                            duals.append(cvx.matrix([lb, z]))
+                            duals.append(cone_dual(icone))
                             icone += 1
+                        elif cons.typeOfConstraint[2:] == 'cones':
+                            ncones = len(cons.coneSizes)
+                            duals.append(cons._block_dual(
+                                [cone_dual(i)
+                                 for i in range(icone, icone + ncones)]))
+                            icone += ncones
                         elif cons.typeOfConstraint == 'lin=':
                             szcons = cons.Exp1.size[0] * cons.Exp1.size[1]
                             dd = []
@@ -4557,7 +5002,8 @@ class Problem(object):
                 # For cplex
                 elif (self.options['solver'] == 'cplex'):
 
-                    primals, duals, obj, sol = self._cplex_solve()
+                    primals, duals, obj, sol = self._with_single_cones(
+                        self._cplex_solve)
 
                 # for mosek
                 elif (self.options['solver'] == 'MSK'  # obsolete value, use lower case
@@ -4565,16 +5011,19 @@ class Problem(object):
                         or self.options['solver'] == 'mosek7'
                         or self.options['solver'] == 'mosek6'):
 
-                    primals, duals, obj, sol = self._mosek_solve()
+                    primals, duals, obj, sol = self._with_single_cones(
+                        self._mosek_solve)
 
                 # for scip
                 elif (self.options['solver'] in ('zibopt', 'scip')):
 
-                    primals, duals, obj, sol = self._zibopt_solve()
+                    primals, duals, obj, sol = self._with_single_cones(
+                        self._zibopt_solve)
 
                 # for gurobi
                 elif (self.options['solver'] == 'gurobi'):
-                    primals, duals, obj, sol = self._gurobi_solve()
+                    primals, duals, obj, sol = self._with_single_cones(
+                        self._gurobi_solve)
 
                 # for SDPA
                 elif (self.options['solver'] == 'sdpa'):
@@ -4585,7 +5034,7 @@ class Problem(object):
                 if self.options['convert_quad_to_socp_if_needed']:
                     pcop = self.copy()
                     pcop.convert_quad_to_socp()
-                    sol = pcop.solve()
+                    sol = pcop.solve(solution_cache=None)
                     self.status = sol['status']
                     for vname, v in six.iteritems(self.variables):
                         v.value = pcop.get_variable(vname).value
@@ -4593,6 +5042,8 @@ class Problem(object):
                         dui = pcop.constraints[i].dual
                         if not(dui is None):
                             cs.set_dualVar(dui)
+                    if cache is not None:
+                        cache.store(cachekey, self._solution_record(sol))
                     return sol
                 else:
                     raise
@@ -4613,8 +5064,319 @@ class Problem(object):
             obj = self.objective[1].eval()[0]
         sol['obj'] = obj
         self.status = sol['status']
+        if cache is not None:
+            cache.store(cachekey, self._solution_record(sol))
         return sol
 
+    def _solution_cache_key(self):
+        """
+        returns the key of the problem in the solution cache: a hash of the
+        canonical (cvxopt) form of the problem (of its real version for a
+        complex problem), of the quadratic terms, of the variables, of the
+        solver and of the options.
+        """
+        import hashlib
+        h = hashlib.sha1()
+
+        def feed(M):
+            if M is None:
+                h.update(b'N')
+            elif isinstance(M, (list, tuple)):
+                h.update(('L' + str(len(M))).encode())
+                for m in M:
+                    feed(m)
+            elif isinstance(M, (cvx.matrix, cvx.spmatrix)):
+                M = cvx.sparse(M)
+                h.update(repr((M.size, M.typecode)).encode())
+                for a in (M.I, M.J, M.V):
+                    h.update(np.asarray(a).tobytes())
+            else:
+                h.update(repr(M).encode())
+
+        def feed_quad(qd):
+            for (x, y) in sorted(qd, key=lambda xy: (xy[0].startIndex,
+                                                     xy[1].startIndex)):
+                feed((x.startIndex, y.startIndex))
+                feed(qd[x, y])
+
+        P = self._cached_real_problem() if self.is_complex() else self
+        saved = P.cvxoptVars
+        P.reset_cvxopt_instance(onlyvar=False)
+        try:
+            P._make_cvxopt_instance(hard_coded_bounds=True)
+            for k in sorted(P.cvxoptVars):
+                feed(k)
+                feed(P.cvxoptVars[k])
+        finally:
+            P.cvxoptVars = saved
+        for cs in P.constraints:
+            if cs.typeOfConstraint == 'quad':
+                feed_quad(cs.Exp1.quad)
+        objective = P.objective[1]
+        if isinstance(objective, QuadExp):
+            feed_quad(objective.quad)
+            objective = objective.aff
+        elif isinstance(objective, LogSumExp):
+            objective = objective.Exp
+        feed(self.objective[0])
+        if objective is not None:
+            feed(objective.constant)
+
+        # the solution is stored with the names of the variables of self
+        for v in sorted(self.variables.values(), key=lambda v: v.startIndex):
+            feed((v.name, v.startIndex, v.size, v.vtype))
+        for k in sorted(self.options):
+            if k in ('verbose', 'solution_cache', 'solution_cache_size',
+                     'canonicalization_processes'):
+                continue
+            val = self.options[k]
+            if isinstance(val, dict):
+                val = sorted(val.items())
+            feed((k, val))
+        return h.hexdigest()
+
+    def _solution_record(self, sol):
+        """
+        returns the dictionary stored in the solution cache for the solution
+        ``sol`` returned by the solver (the values of the variables and the
+        duals are taken in the problem).
+        """
+        primals = {}
+        for name, var in six.iteritems(self.variables):
+            if var.is_valued():
+                primals[name] = cvx.matrix(var.value)
+        return {'primals': primals,
+                'duals': [cs.dual for cs in self.constraints],
+                'status': sol['status'],
+                'obj': sol['obj']}
+
+    def _set_cached_solution(self, record):
+        """
+        sets the primal and dual values stored in the solution cache,
+        and returns the solution dictionary (with ``sol['cached']=True``)
+        """
+        if not self.options['noprimals']:
+            for name, value in six.iteritems(record['primals']):
+                self.set_var_value(name, value, optimalvar=True)
+        if not self.options['noduals']:
+            for cs, d in zip(self.constraints, record['duals']):
+                cs.set_dualVar(d)
+        self.status = record['status']
+        return {'status': record['status'], 'obj': record['obj'],
+                'time': 0., 'cached': True}
+
+    def _dense_solve(self):
+        """
+        Solves a small continuous LP, SOCP or SDP with the dense interior point
+        method :func:`dense_conelp() <picos.dense_ipm.dense_conelp>`. The dense
+        arrays of the problem are built directly from the constraints, without
+        the cvxopt instance (cf. the option ``small_problem_size``).
+
+        Returns ``(primals, duals, obj, sol)`` as :func:`_cvxopt_solve`, or
+        ``None`` if the problem is not small, is not a continuous conic problem,
+        or if no optimal solution was found by the dense method.
+        """
+        size = self.options['small_problem_size']
+        ss = self.numberOfVars
+        if not size or ss == 0 or ss > size or self.is_complex():
+            return None
+        if (self.options['solve_via_dual']
+                or self.options['chordal_decomposition']
+                or self.options['cone_handling'] == 'cuts'):
+            return None
+        if any(v.vtype not in ('continuous', 'symmetric')
+               for v in self.variables.values()):
+            return None
+        if not (self.objective[0] == 'find'
+                or isinstance(self.objective[1], AffinExp)):
+            return None
+
+        from .dense_ipm import dense_conelp, svec_lower_indices
+        import time
+        tstart = time.time()
+
+        def dense_block(segs):
+            return dense_rows(_canonical_block(segs))
+
+        def dense_rows(block):
+            I, J, V, h = block
+            G = np.zeros((len(h), ss))
+            np.add.at(G, (I, J), V)
+            return G, h
+
+        # blocks of rows (G, h) of the equalities, of the linear inequalities
+        # and of the cones, and position of each constraint in its block
+        # (with the number of cones of a block of cones)
+        eqs, lins, socs, sdps = [], [], [], []
+        where = []
+        nrows = 0
+        for cs in self.constraints:
+            tp = cs.typeOfConstraint
+            if tp in ('SOcones', 'RScones'):
+                e1 = _affexp_arrays(cs.Exp1)
+                e2 = _affexp_arrays(cs.Exp2)
+                if tp == 'SOcones':
+                    segs = [[(-1., e2)], [(-1., e1)]]
+                else:
+                    e3 = _affexp_arrays(cs.Exp3)
+                    segs = [[(-1., e2), (-1., e3)], [(-2., e1)],
+                            [(-1., e2), (1., e3)]]
+                where.append((socs, len(socs), len(cs.coneSizes)))
+                I, J, V, h, dims = _cone_block_rows(
+                    _canonical_block(segs), cs.coneSizes, tp == 'RScones')
+                G, h = dense_rows((I, J, V, h))
+                for k0, k1 in zip(np.cumsum(dims) - dims, np.cumsum(dims)):
+                    socs.append((G[k0:k1], h[k0:k1]))
+                nrows += len(h)
+                if nrows > 4 * size:
+                    return None
+                continue
+            if tp[:3] in ('lin', 'sdp'):
+                e1 = _affexp_arrays(cs.Exp1)
+                e2 = _affexp_arrays(cs.Exp2)
+                if tp[3] == '>':
+                    seg = [(-1., e1), (1., e2)]
+                else:
+                    seg = [(1., e1), (-1., e2)]
+                G, h = dense_block([seg])
+                if tp[:3] == 'sdp':
+                    n = cs.Exp1.size[0]
+                    r, c, w = svec_lower_indices(n)
+                    G = G[r + n * c] * w[:, np.newaxis]
+                    h = h[r + n * c] * w
+                    blocks = sdps
+                else:
+                    blocks = eqs if tp[3] == '=' else lins
+            elif tp == 'SOcone':
+                e1 = _affexp_arrays(cs.Exp1)
+                e2 = _affexp_arrays(cs.Exp2)
+                G, h = dense_block([[(-1., e2)], [(-1., e1)]])
+                blocks = socs
+            elif tp == 'RScone':
+                e1 = _affexp_arrays(cs.Exp1)
+                e2 = _affexp_arrays(cs.Exp2)
+                e3 = _affexp_arrays(cs.Exp3)
+                G, h = dense_block([[(-1., e2), (-1., e3)], [(-2., e1)],
+                                    [(-1., e2), (1., e3)]])
+                blocks = socs
+            else:
+                return None
+            where.append((blocks, len(blocks), None))
+            blocks.append((G, h))
+            nrows += len(h)
+            if nrows > 4 * size:
+                return None
+
+        # hard-coded bounds
+        for variable in self.variables.values():
+            for ind, (lo, up) in six.iteritems(variable.bnd):
+                G, h = dense_block([[(1., _affexp_arrays(variable[ind]))]])
+                if lo is not None:
+                    lins.append((-G, np.array([-lo], dtype=float)))
+                if up is not None:
+                    lins.append((G, np.array([up], dtype=float)))
+
+        if self.objective[0] == 'find':
+            c = np.zeros(ss)
+        else:
+            c = dense_block([[(1., _affexp_arrays(self.objective[1]))]])[0][0]
+            if self.objective[0] == 'max':
+                c = -c
+
+        def stack(blocks):
+            if not blocks:
+                return np.zeros((0, ss)), np.zeros(0)
+            return (np.vstack([G for G, h in blocks]),
+                    np.concatenate([h for G, h in blocks]))
+
+        A, b = stack(eqs)
+        # the equalities of the form 0==0 are removed
+        keep = np.any(A != 0, axis=1)
+        if np.any(b[~keep] != 0):
+            return None
+        G, h = stack(lins + socs + sdps)
+        dims = {'l': _bsum([len(hk) for Gk, hk in lins]),
+                'q': [len(hk) for Gk, hk in socs],
+                's': [int(round(np.sqrt(2 * len(hk) + 0.25) - 0.5))
+                      for Gk, hk in sdps]}
+
+        opts = {'abstol': self.options['tol'],
+                'reltol': 10 * self.options['tol'],
+                'feastol': self.options['tol'],
+                'maxiters': self.options['maxit']}
+        for key in ('abstol', 'reltol', 'feastol'):
+            if self.options[key] is not None:
+                opts[key] = self.options[key]
+        if self.options['verbose'] > 0:
+            print('--------------------------')
+            print('  dense interior point')
+            print('--------------------------')
+        try:
+            res = dense_conelp(c, G, h, dims, A[keep], b[keep], opts)
+        except np.linalg.LinAlgError:
+            res = None
+        if (res is None or res['status'] != 'optimal'
+                or not np.all(np.isfinite(res['x']))):
+            if self.options['verbose'] > 0:
+                print('no optimal solution found, the problem is passed '
+                      'to the solver')
+            return None
+        tend = time.time()
+
+        primals = {}
+        if not self.options['noprimals']:
+            for var in self.variables.values():
+                varvect = cvx.matrix(res['x'][var.startIndex:var.endIndex])
+                if var.vtype == 'symmetric':
+                    varvect = svecm1(varvect)
+                primals[var.name] = cvx.matrix(varvect, var.size)
+
+        duals = []
+        if not self.options['noduals']:
+            y = np.zeros(len(b))
+            y[keep] = res['y']
+            # offsets of the blocks in y and z
+            start = {}
+            for blocks, k0 in ((eqs, 0), (lins, 0), (socs, dims['l']),
+                               (sdps, dims['l'] + _bsum(dims['q']))):
+                for i, (Gk, hk) in enumerate(blocks):
+                    start[id(blocks), i] = k0
+                    k0 += len(hk)
+            for cs, (blocks, i, ncones) in zip(self.constraints, where):
+                if ncones is not None:
+                    dk = []
+                    for j in range(i, i + ncones):
+                        k0 = start[id(blocks), j]
+                        zk = res['z'][k0:k0 + len(blocks[j][1])].copy()
+                        zk[1:] = -zk[1:]
+                        dk.append(cvx.matrix(zk))
+                    duals.append(cs._block_dual(dk))
+                    continue
+                k0 = start[id(blocks), i]
+                k1 = k0 + len(blocks[i][1])
+                if blocks is eqs:
+                    duals.append(cvx.matrix(y[k0:k1]))
+                elif blocks is lins:
+                    duals.append(cvx.matrix(res['z'][k0:k1]))
+                elif blocks is socs:
+                    zk = res['z'][k0:k1].copy()
+                    zk[1:] = -zk[1:]
+                    duals.append(cvx.matrix(zk))
+                else:
+                    n = cs.Exp1.size[0]
+                    r, c, w = svec_lower_indices(n)
+                    Z = np.zeros((n, n))
+                    Z[r, c] = res['z'][k0:k1] / w
+                    Z[c, r] = res['z'][k0:k1] / w
+                    duals.append(cvx.matrix(Z))
+
+        obj = 0.5 * (res['primal objective'] + res['dual objective'])
+        if self.objective[0] == 'max':
+            obj = -obj
+        sol = {'dense_ipm_sol': res, 'status': 'optimal',
+               'time': tend - tstart}
+        return primals, duals, obj, sol
+
     def _cvxopt_solve(self):
         """
         Solves a problem with the cvxopt solver.
@@ -4624,17 +5386,22 @@ class Problem(object):
         # Can we solve this problem ? #
         #-----------------------------#
 
-        if self.type in ('unknown type',
-                         'MISDP',
-                         'MISOCP',
-                         'MIQCP',
-                         'MIQP',
-                         'MIP',
-                         'Mixed (MISOCP+quad)') and (self.options['solver'] == 'cvxopt'):
+        if self.type == 'unknown type' and (self.options['solver'] == 'cvxopt'):
             raise NotAppropriateSolverError(
                 "'cvxopt' cannot solve problems of type {0}".format(
                     self.type))
 
+        # mixed integer problems are solved by branch and bound
+        elif self.type in ('MIQCP', 'MIQP', 'Mixed (MISOCP+quad)') and (
+                self.options['solver'] == 'cvxopt'):
+            raise QuadAsSocpError(
+                'Please convert the quadratic constraints as cone constraints ' +
+                'with the function convert_quad_to_socp().')
+
+        elif self.type in ('MISDP', 'MISOCP', 'MIP') and (
+                self.options['solver'] == 'cvxopt'):
+            return self._bnb_solve()
+
         elif self.type in ('unknown type', 'GP', 'MISDP', 'MISOCP', 'MIQCP', 'MIQP', 'MIP', 'Mixed (MISOCP+quad)') and (
                 self.options['solver'] == 'smcp'):
             raise NotAppropriateSolverError(
@@ -4657,36 +5424,7 @@ class Problem(object):
         #--------------------#
         #  sets the options  #
         #--------------------#
-        import cvxopt.solvers
-        abstol = self.options['abstol']
-        if abstol is None:
-            abstol = self.options['tol']
-        reltol = self.options['reltol']
-        if reltol is None:
-            reltol = 10 * self.options['tol']
-        feastol = self.options['feastol']
-        if feastol is None:
-            feastol = self.options['tol']
-        maxit = self.options['maxit']
-        if maxit is None:
-            maxit = 999999
-        cvx.solvers.options['maxiters'] = maxit
-        cvx.solvers.options['abstol'] = abstol
-        cvx.solvers.options['feastol'] = feastol
-        cvx.solvers.options['reltol'] = reltol
-        cvx.solvers.options['show_progress'] = bool(
-            self.options['verbose'] > 0)
-        try:
-            import smcp.solvers
-            smcp.solvers.options['maxiters'] = maxit
-            smcp.solvers.options['abstol'] = abstol
-            smcp.solvers.options['feastol'] = feastol
-            smcp.solvers.options['reltol'] = reltol
-            smcp.solvers.options['show_progress'] = bool(
-                self.options['verbose'] > 0)
-        except:
-            #smcp is not available
-            pass
+        self._set_cvxopt_options()
 
         if self.options['solver'].upper() == 'CVXOPT':
             currentsolver = None
@@ -4706,10 +5444,10 @@ class Problem(object):
                 print('-----------------------------------')
                 print('         cvxopt GP solver')
                 print('-----------------------------------')
-            sol = cvx.solvers.gp(self.cvxoptVars['K'],
-                                 self.cvxoptVars['F'], self.cvxoptVars['g'],
-                                 self.cvxoptVars['Gl'], self.cvxoptVars['hl'],
-                                 self.cvxoptVars['A'], self.cvxoptVars['b'])
+            sol = self._solver_call(cvx.solvers.gp, self.cvxoptVars['K'],
+                                    self.cvxoptVars['F'], self.cvxoptVars['g'],
+                                    self.cvxoptVars['Gl'], self.cvxoptVars['hl'],
+                                    self.cvxoptVars['A'], self.cvxoptVars['b'])
         # changes to adapt the problem for the conelp interface:
         elif currentsolver == 'mosek':
             if len(self.cvxoptVars['Gs']) > 0:
@@ -4719,7 +5457,8 @@ class Problem(object):
                     print('------------------------------------------')
                     print('  mosek LP solver interfaced by cvxopt')
                     print('------------------------------------------')
-                sol = cvx.solvers.lp(
+                sol = self._solver_call(
+                    cvx.solvers.lp,
                     self.cvxoptVars['c'],
                     self.cvxoptVars['Gl'],
                     self.cvxoptVars['hl'],
@@ -4732,12 +5471,14 @@ class Problem(object):
                     print('-------------------------------------------')
                     print('  mosek SOCP solver interfaced by cvxopt')
                     print('-------------------------------------------')
-                sol = cvx.solvers.socp(
+                Gq, hq = self._cvxopt_single_cones()
+                sol = self._solver_call(
+                    cvx.solvers.socp,
                     self.cvxoptVars['c'],
                     self.cvxoptVars['Gl'],
                     self.cvxoptVars['hl'],
-                    self.cvxoptVars['Gq'],
-                    self.cvxoptVars['hq'],
+                    Gq,
+                    hq,
                     self.cvxoptVars['A'],
                     self.cvxoptVars['b'],
                     solver=currentsolver)
@@ -4747,7 +5488,7 @@ class Problem(object):
             dims['s'] = [int(np.sqrt(Gsi.size[0]))
                          for Gsi in self.cvxoptVars['Gs']]
             dims['l'] = self.cvxoptVars['Gl'].size[0]
-            dims['q'] = [Gqi.size[0] for Gqi in self.cvxoptVars['Gq']]
+            dims['q'] = [d for dq in self.cvxoptVars['dq'] for d in dq]
             G = self.cvxoptVars['Gl']
             h = self.cvxoptVars['hl']
             # handle the equalities as 2 ineq for smcp
@@ -4759,13 +5500,11 @@ class Problem(object):
                     h = cvx.matrix([h, -self.cvxoptVars['b']])
                     dims['l'] += (2 * self.cvxoptVars['A'].size[0])
 
-            for i in range(len(dims['q'])):
-                G = cvx.sparse([G, self.cvxoptVars['Gq'][i]])
-                h = cvx.matrix([h, self.cvxoptVars['hq'][i]])
-
-            for i in range(len(dims['s'])):
-                G = cvx.sparse([G, self.cvxoptVars['Gs'][i]])
-                h = cvx.matrix([h, self.cvxoptVars['hs'][i]])
+            # the blocks of rows of the cones are stacked at once
+            G = cvx.sparse([G] + self.cvxoptVars['Gq'] +
+                           [cvx.sparse(Gs) for Gs in self.cvxoptVars['Gs']])
+            h = cvx.matrix([h] + self.cvxoptVars['hq'] +
+                           self.cvxoptVars['hs'])
 
             # Remove the lines in A and b corresponding to 0==0
             JP = list(set(self.cvxoptVars['A'].I))
@@ -4792,21 +5531,47 @@ class Problem(object):
                 except:
                     raise Exception('library smcp not found')
                 if self.options['smcp_feas']:
-                    sol = smcp.solvers.conelp(
-                        self.cvxoptVars['c'], G, h, dims, feas=self.options['smcp_feas'])
+                    sol = self._solver_call(
+                        smcp.solvers.conelp, self.cvxoptVars['c'], G, h, dims,
+                        feas=self.options['smcp_feas'])
                 else:
-                    sol = smcp.solvers.conelp(self.cvxoptVars['c'],
-                                              G, h, dims)
+                    sol = self._solver_call(smcp.solvers.conelp,
+                                            self.cvxoptVars['c'],
+                                            G, h, dims)
+            elif self._cuts_options(dims) is not None:
+                from .cutting_planes import outer_approximation
+                if self.options['verbose'] > 0:
+                    print('-------------------------------------------')
+                    print('  cvxopt CONELP solver with cutting planes')
+                    print('-------------------------------------------')
+                start = None
+                if self.options['hotstart']:
+                    start = self._cvxopt_primalstart(G, h, dims)
+                    if start is not None:
+                        start = start['x']
+                sol = self._solver_call(outer_approximation,
+                                        self.cvxoptVars['c'],
+                                        G, h, dims,
+                                        self.cvxoptVars['A'],
+                                        self.cvxoptVars['b'],
+                                        start=start,
+                                        verbose=self.options['verbose'],
+                                        **self._cuts_options(dims))
             else:
 
                 if self.options['verbose'] > 0:
                     print('--------------------------')
                     print('  cvxopt CONELP solver')
                     print('--------------------------')
-                sol = cvx.solvers.conelp(self.cvxoptVars['c'],
-                                         G, h, dims,
-                                         self.cvxoptVars['A'],
-                                         self.cvxoptVars['b'])
+                primalstart = None
+                if self.options['hotstart']:
+                    primalstart = self._cvxopt_primalstart(G, h, dims)
+                sol = self._solver_call(cvx.solvers.conelp,
+                                        self.cvxoptVars['c'],
+                                        G, h, dims,
+                                        self.cvxoptVars['A'],
+                                        self.cvxoptVars['b'],
+                                        primalstart=primalstart)
             probtype = 'ConeLP'
 
         tend = time.time()
@@ -4890,6 +5655,25 @@ class Problem(object):
                         else:
                             printnodual = True
                             duals.append(None)
+                    # block of SOCP constraints [Rotated or not]
+                    elif consk.typeOfConstraint[2:] == 'cones':
+                        if not (sol[zqkey] is None):
+                            dk = []
+                            for nk in consk.coneSizes:
+                                if probtype == 'ConeLP':
+                                    consSz = nk + 1
+                                    if consk.typeOfConstraint[:2] == 'RS':
+                                        consSz += 1
+                                    dk.append(sol[zqkey][indzq:indzq + consSz])
+                                    indzq += consSz
+                                else:
+                                    dk.append(sol[zqkey][indzq])
+                                    indzq += 1
+                                dk[-1][1:] = -dk[-1][1:]
+                            duals.append(consk._block_dual(dk))
+                        else:
+                            printnodual = True
+                            duals.append(None)
                     # SOCP constraint [Rotated or not]
                     elif consk.typeOfConstraint[2:] == 'cone':
                         if not (sol[zqkey] is None):
@@ -4969,8 +5753,276 @@ class Problem(object):
                 obj = -obj
 
         solt = {'cvxopt_sol': sol, 'status': status, 'time': tend - tstart}
+        if 'cut_rounds' in sol:
+            solt['cut_rounds'] = sol['cut_rounds']
+            solt['cuts'] = sol['cuts']
+        if 'last_iterate' in sol:
+            solt['last_iterate'] = sol['last_iterate']
         return primals, duals, obj, solt
 
+    def _cvxopt_primalstart(self, G, h, dims):
+        """
+        returns the primal starting point ``{'x': x, 's': s}`` of
+        ``cvxopt.solvers.conelp`` given by the values of the variables
+        (cf. the option ``hotstart``), whose slacks ``s = h - G x`` are
+        pushed into the interior of the cone ``dims``, or ``None`` if a
+        variable is not valued.
+        """
+        x = cvx.matrix(0., (self.numberOfVars, 1))
+        for var in self.variables.values():
+            if not var.is_valued():
+                return None
+            val = var.value
+            if var.vtype in ('symmetric',):
+                val = svec(val)
+            x[var.startIndex:var.endIndex] = cvx.matrix(
+                cvx.matrix(val), (var.endIndex - var.startIndex, 1))
+        s = h - G * x
+        mu = 1e-4
+        if len(s):
+            mu = max(mu, 0.1 * float(np.max(np.abs(np.asarray(s)))))
+        _shift_into_cone(s, dims, mu)
+        return {'x': x, 's': s}
+
+    def _cvxopt_single_cones(self):
+        """
+        returns the lists ``(Gq, hq)`` of the rows of the single cones of the
+        cvxopt instance (the blocks of cones of ``cvxoptVars['Gq']`` are split),
+        as expected by ``cvxopt.solvers.socp``.
+        """
+        Gq, hq = [], []
+        for G, h, dq in zip(self.cvxoptVars['Gq'], self.cvxoptVars['hq'],
+                            self.cvxoptVars['dq']):
+            if len(dq) == 1:
+                Gq.append(G)
+                hq.append(h)
+            else:
+                Gk, hk = _split_rows(G, h, dq)
+                Gq.extend(Gk)
+                hq.extend(hk)
+        return Gq, hq
+
+    def _bnb_solve(self):
+        """
+        Solves a mixed integer LP, SOCP or SDP with the
+        :func:`branch_and_bound() <picos.branch_and_bound.branch_and_bound>`
+        of picos, whose continuous relaxations are solved by cvxopt
+        (cf. the options ``bnb_node_selection`` and ``bnb_processes``).
+        """
+        from .branch_and_bound import branch_and_bound
+        import time
+        tstart = time.time()
+
+        if any(v.vtype in ('semicont', 'semiint')
+               for v in self.variables.values()):
+            raise NotAppropriateSolverError(
+                "'cvxopt' cannot handle semicont and semiint variables")
+
+        self._make_cvxopt_instance(
+            reset=False,
+            new_cvxopt_cons_only=True,
+            hard_coded_bounds=True)
+        self._set_cvxopt_options()
+        cv = self.cvxoptVars
+
+        dims = {'l': cv['Gl'].size[0],
+                'q': [d for dq in cv['dq'] for d in dq],
+                's': [int(np.sqrt(Gsi.size[0])) for Gsi in cv['Gs']]}
+        G = cvx.sparse([cv['Gl']] + cv['Gq'] +
+                       [cvx.sparse(Gs) for Gs in cv['Gs']])
+        h = cvx.matrix([cv['hl']] + cv['hq'] + cv['hs'])
+
+        # Remove the lines in A and b corresponding to 0==0
+        rows = sorted(set(cv['A'].I))
+        rowset = set(rows)
+        if any(bi for i, bi in enumerate(cv['b']) if i not in rowset):
+            raise Exception('infeasible constraint of the form 0=a')
+        P = cvx.spmatrix([1.] * len(rows), range(len(rows)), rows,
+                         (len(rows), cv['A'].size[0]))
+
+        # integer columns, with the bounds of the binary variables
+        integers, lower, upper = [], [], []
+        for var in self.variables.values():
+            if var.vtype in ('binary', 'integer'):
+                n = var.endIndex - var.startIndex
+                integers.extend(range(var.startIndex, var.endIndex))
+                if var.vtype == 'binary':
+                    lower.extend([0.] * n)
+                    upper.extend([1.] * n)
+                else:
+                    lower.extend([-np.inf] * n)
+                    upper.extend([np.inf] * n)
+
+        sense, offset = 1., 0.
+        if self.objective[0] == 'max':
+            sense = -1.
+        if (self.objective[0] != 'find' and
+                self.objective[1].constant is not None):
+            offset = self.objective[1].constant[0]
+
+        if self.options['verbose'] > 0:
+            print('----------------------------------------')
+            print('  branch and bound on cvxopt relaxations')
+            print('----------------------------------------')
+        sol = branch_and_bound(
+            cv['c'], G, h, dims, P * cv['A'], P * cv['b'], integers,
+            lower, upper, sense=sense, offset=offset,
+            node_selection=self.options['bnb_node_selection'],
+            gaplim=self.options['gaplim'] or 0.,
+            timelimit=self.options['timelimit'],
+            nbsol=self.options['nbsol'],
+            uboundlimit=self.options['uboundlimit'],
+            lboundlimit=self.options['lboundlimit'],
+            acceptable_gap_at_timelimit=self.options[
+                'acceptable_gap_at_timelimit'],
+            processes=self.options['bnb_processes'],
+            solver_options=dict(cvx.solvers.options),
+            cuts=self._cuts_options(dims),
+            monitor=self.options['boundMonitor'],
+            verbose=self.options['verbose'])
+        if self.options['verbose'] > 0:
+            print('branch and bound status: ' + sol['status'] +
+                  ' ({0} nodes)'.format(sol['nodes']))
+
+        primals = {}
+        if sol['x'] is not None and not self.options['noprimals']:
+            for var in self.variables.values():
+                varvect = cvx.matrix(sol['x'][var.startIndex:var.endIndex])
+                if var.vtype in ('symmetric',):
+                    varvect = svecm1(varvect)
+                primals[var.name] = cvx.matrix(varvect, var.size)
+
+        solt = {'status': sol['status'],
+                'time': time.time() - tstart,
+                'bnb_nodes': sol['nodes'],
+                'bnb_solutions': sol['solutions'],
+                'bound': sol['bound'],
+                'gap': sol['gap']}
+        if 'cut_rounds' in sol:
+            solt['cut_rounds'] = sol['cut_rounds']
+            solt['cuts'] = sol['cuts']
+        if self.options['boundMonitor']:
+            solt['bounds_monitor'] = sol['bounds_monitor']
+        obj = 'toEval' if sol['x'] is not None else None
+        return primals, [], obj, solt
+
+    def _cuts_options(self, dims):
+        """
+        returns the keyword arguments of
+        :func:`outer_approximation() <picos.cutting_planes.outer_approximation>`
+        if the cones ``dims`` of the cvxopt instance must be outer approximated
+        (cf. the option ``cone_handling``), and ``None`` otherwise.
+        """
+        handling = self.options['cone_handling']
+        if handling not in ('conic', 'cuts'):
+            raise ValueError("cone_handling must be 'conic' or 'cuts'")
+        lmi = bool(self.options['cuts_on_lmis'])
+        if handling == 'conic' or not (dims['q'] or (lmi and dims['s'])):
+            return None
+        return {'tol': self.options['cuts_tol'],
+                'maxrounds': self.options['cuts_maxrounds'],
+                'lmi': lmi}
+
+    def _set_cvxopt_options(self):
+        """
+        passes the tolerances, the iteration limit and the verbosity
+        of the problem to cvxopt (and smcp, if it is available).
+        """
+        import cvxopt.solvers
+        abstol = self.options['abstol']
+        if abstol is None:
+            abstol = self.options['tol']
+        reltol = self.options['reltol']
+        if reltol is None:
+            reltol = 10 * self.options['tol']
+        feastol = self.options['feastol']
+        if feastol is None:
+            feastol = self.options['tol']
+        maxit = self.options['maxit']
+        if maxit is None:
+            maxit = 999999
+        cvx.solvers.options['maxiters'] = maxit
+        cvx.solvers.options['abstol'] = abstol
+        cvx.solvers.options['feastol'] = feastol
+        cvx.solvers.options['reltol'] = reltol
+        cvx.solvers.options['show_progress'] = bool(
+            self.options['verbose'] > 0)
+        try:
+            import smcp.solvers
+            smcp.solvers.options['maxiters'] = maxit
+            smcp.solvers.options['abstol'] = abstol
+            smcp.solvers.options['feastol'] = feastol
+            smcp.solvers.options['reltol'] = reltol
+            smcp.solvers.options['show_progress'] = bool(
+                self.options['verbose'] > 0)
+        except:
+            #smcp is not available
+            pass
+
+    def _solver_call(self, func, *args, **kwargs):
+        """
+        returns ``func(*args, **kwargs)``, where ``func`` is a solver
+        function of cvxopt or smcp. If the option ``solver_watchdog`` is set
+        together with a ``timelimit``, the solver runs in a child process
+        (cf. :func:`_run_with_watchdog() <picos.tools._run_with_watchdog>`),
+        and the returned dictionary has the status ``'timelimit'`` if the
+        child had to be terminated, with the last iterate reported by the
+        solver under the key ``'last_iterate'``.
+        """
+        if (not self.options['solver_watchdog']
+                or self.options['timelimit'] is None):
+            return func(*args, **kwargs)
+        modules = [('cvxopt.solvers', dict(cvx.solvers.options))]
+        if 'smcp' in sys.modules:
+            import smcp
+            modules.append(('smcp.solvers', dict(smcp.solvers.options)))
+        finished, sol, last = _run_with_watchdog(
+            func, args, kwargs, self.options['timelimit'],
+            echo=self.options['verbose'] > 0, solver_options=modules)
+        if not finished:
+            sol = dict.fromkeys(['x', 'y', 'z', 's', 'zl', 'zq', 'zs', 'znl',
+                                 'primal objective', 'dual objective'])
+            sol['status'] = 'timelimit'
+        sol['last_iterate'] = last
+        return sol
+
+    def _with_single_cones(self, func, *args):
+        """
+        returns ``func(*args)``, where ``func`` is a solver interface or a
+        writer which handles one cone per constraint: the blocks of cones of
+        the problem (constraints of type ``SOcones`` or ``RScones``) are
+        replaced by their single cones (cf.
+        :func:`Constraint.cones() <picos.Constraint.cones>`) during the call.
+        If ``func`` is a solver interface (returning
+        ``(primals, duals, obj, sol)``), the duals of the single cones are
+        gathered by block.
+        """
+        constraints = self.constraints
+        if not any(cs.typeOfConstraint[2:] == 'cones' for cs in constraints):
+            return func(*args)
+        self.constraints = []
+        for cs in constraints:
+            if cs.typeOfConstraint[2:] == 'cones':
+                self.constraints.extend(cs.cones())
+            else:
+                self.constraints.append(cs)
+        try:
+            ret = func(*args)
+        finally:
+            self.constraints = constraints
+        if isinstance(ret, tuple) and len(ret) == 4 and ret[1]:
+            primals, duals, obj, sol = ret
+            duals = iter(duals)
+            gathered = []
+            for cs in constraints:
+                if cs.typeOfConstraint[2:] == 'cones':
+                    gathered.append(cs._block_dual(
+                        [six.next(duals, None) for k in cs.coneSizes]))
+                else:
+                    gathered.append(six.next(duals, None))
+            ret = (primals, gathered, obj, sol)
+        return ret
+
     def _cplex_solve(self):
         """
         Solves a problem with the cvxopt solver.
@@ -6344,13 +7396,28 @@ class Problem(object):
         import os
         from subprocess import call
         tstart = time.time()
-        if self.options['verbose'] >= 1:
-            call([self.sdpa_executable, self.sdpa_dats_filename,
-                  self.sdpa_out_filename])
+        cmd = [self.sdpa_executable, self.sdpa_dats_filename,
+               self.sdpa_out_filename]
+        if (self.options['solver_watchdog']
+                and self.options['timelimit'] is not None):
+            finished, last = _popen_with_watchdog(
+                cmd, self.options['timelimit'],
+                echo=self.options['verbose'] >= 1)
+            if not finished:
+                tend = time.time()
+                os.remove(self.sdpa_dats_filename)
+                if os.path.exists(self.sdpa_out_filename):
+                    os.remove(self.sdpa_out_filename)
+                if self.options['verbose'] > 0:
+                    print('SDPA solution status: timelimit')
+                solt = {'status': 'timelimit', 'time': tend - tstart,
+                        'last_iterate': last}
+                return ({}, [], None, solt)
+        elif self.options['verbose'] >= 1:
+            call(cmd)
         else:
             with open(os.devnull, "w") as fnull:
-                call([self.sdpa_executable, self.sdpa_dats_filename,
-                      self.sdpa_out_filename], stdout=fnull, stderr=fnull)
+                call(cmd, stdout=fnull, stderr=fnull)
         tend = time.time()
         #-----------------------#
         # retrieve the solution #
@@ -6405,90 +7472,249 @@ class Problem(object):
     def _sqpsolve(self, options):
         """
         Solves the problem by sequential Quadratic Programming.
+
+        The constraints are canonicalized once, in a single subproblem.
+        At each iteration, only the coefficients of the quadratic model of
+        the objective and the centers and radii of the trust regions
+        (one cone per variable, when ``harmonic_steps`` is set) are updated.
+        With cvxopt, the QP is solved by ``coneqp`` on the cached matrices,
+        warm-started from the previous iterate. With the other solvers, the
+        model is passed as a new objective of the subproblem, but the solver
+        instance is rebuilt at each iteration with trust regions, because
+        the backends cannot update the constants of a cone constraint.
+        The time spent in each iteration is returned in ``sol['sqp_timings']``.
         """
-        import copy
-        for v in self.variables:
-            if self.variables[v].value is None:
-                self.set_var_value(v, cvx.uniform(self.variables[v].size))
-        # lower the display level for mosek
-        self.options['verbose'] -= 1
-        oldvar = self._eval_all()
-        subprob = copy.deepcopy(self)
-        if self.options['verbose'] > 0:
+        import time
+        for v, var in self.variables.items():
+            if not var.is_valued():
+                self.set_var_value(v, cvx.uniform(*var.size))
+        verbose = self.options['verbose']
+        maxit = self.options['maxit']
+        if maxit is None:
+            maxit = 100
+        fun = self.objective[1]
+        sgn = 1. if self.objective[0] == 'min' else -1.
+        variables = sorted(self.variables.values(),
+                           key=lambda v: v.startIndex)
+        starts = np.array([v.startIndex for v in variables])
+        ss = self.numberOfVars
+
+        # the argument of the function, as a matrix in the space of all vars
+        A, b = self._makeGandh(fun.Exp)
+        A = cvx.sparse(A)
+
+        # the subproblem, with the constraints of the problem only
+        subprob = self.copy()
+        subprob.set_objective('find', None)
+        # lower the display level for the subproblems
+        subprob.set_option('verbose', verbose - 1)
+        use_coneqp = self.options['solver'] in ('cvxopt', 'CVXOPT')
+        if use_coneqp:
+            if subprob.numberQuadConstraints > 0:
+                subprob.convert_quad_to_socp()
+            subprob._make_cvxopt_instance(hard_coded_bounds=True)
+            subprob._set_cvxopt_options()
+            cv = subprob.cvxoptVars
+            # remove the lines of A corresponding to 0==0
+            rows = sorted(set(cv['A'].I))
+            rowset = set(rows)
+            if any(bi for i, bi in enumerate(cv['b']) if i not in rowset):
+                raise Exception('infeasible constraint of the form 0=a')
+            Psel = cvx.spmatrix([1.] * len(rows), range(len(rows)), rows,
+                                (len(rows), cv['A'].size[0]))
+            Aeq = Psel * cv['A']
+            beq = Psel * cv['b']
+            dims = {'l': cv['Gl'].size[0],
+                    'q': [d for dq in cv['dq'] for d in dq],
+                    's': [int(np.sqrt(Gsi.size[0])) for Gsi in cv['Gs']]}
+            hl = [cv['hl']] + cv['hq']
+
+        # trust regions: ||x-x0|| <= rho for each variable, as cone rows
+        # [0; -I] x + [rho; -x0], of which only the right-hand side changes
+        sizes = np.diff(np.append(starts, ss))
+        tI = np.arange(ss) + np.repeat(np.arange(1, len(starts) + 1), sizes)
+        Gt = _triplets_to_spmatrix(-np.ones(ss), tI, np.arange(ss),
+                                   (ss + len(starts), ss))
+        trust = []
+        if use_coneqp:
+            Gs = [cvx.sparse(Gsi) for Gsi in cv['Gs']]
+            G = cvx.sparse([cv['Gl']] + cv['Gq'] + Gs)
+            Gtrust = cvx.sparse([cv['Gl']] + cv['Gq'] + [Gt] + Gs)
+
+        def xvec(prob):
+            # values of the variables of prob, in the space of all variables
+            vals = []
+            for v in variables:
+                val = prob.get_variable(v.name).value
+                if v.vtype == 'symmetric':
+                    val = svec(val)
+                vals.append(np.asarray(cvx.matrix(val), dtype=float).ravel())
+            return np.concatenate(vals)
+
+        def model_exp(PQ, q):
+            # the quadratic expression x'*PQ*x/2 + q'*x of the subproblem
+            PQ = cvx.sparse(PQ)
+            I = np.asarray(PQ.I).ravel()
+            J = np.asarray(PQ.J).ravel()
+            V = 0.5 * np.asarray(PQ.V).ravel()
+            bi = np.searchsorted(starts, I, 'right') - 1
+            bj = np.searchsorted(starts, J, 'right') - 1
+            key = bi * len(variables) + bj
+            order = np.argsort(key, kind='mergesort')
+            cuts = np.flatnonzero(np.diff(key[order])) + 1
+            svars = [subprob.get_variable(v.name) for v in variables]
+            quad = {}
+            for blk in np.split(order, cuts):
+                if len(blk) == 0:
+                    continue
+                i, j = bi[blk[0]], bj[blk[0]]
+                quad[svars[i], svars[j]] = _triplets_to_spmatrix(
+                    V[blk], I[blk] - starts[i], J[blk] - starts[j],
+                    (sizes[i], sizes[j]))
+            factors = {}
+            for i, x in enumerate(svars):
+                factors[x] = cvx.sparse(
+                    cvx.matrix(q[int(starts[i]):int(starts[i] + sizes[i])]).T)
+            aff = AffinExp(factors, constant=cvx.matrix(0.), size=(1, 1),
+                           string='model of ' + fun.string)
+            return QuadExp(quad, aff, 'model of ' + fun.string)
+
+        if verbose > 0:
             print('solve by SQP method with proximal convexity enforcement')
-            print('it:     crit\t\tproxF\tstep')
-            print('---------------------------------------')
+            print('it:     crit\t\tproxF\tstep\t    time')
+            print('-----------------------------------------------')
+        timings = []
+        x0 = xvec(self)
+        qpsol = None
+        tstart = time.time()
         converged = False
         k = 1
         while not converged:
-            obj, grad, hess = self.objective[
-                1].fun(self.objective[1].Exp.eval())
-            diffExp = self.objective[1].Exp - self.objective[1].Exp.eval()
-            quadobj0 = obj + grad.T * diffExp + 0.5 * diffExp.T * hess * diffExp
+            tit = time.time()
+            e0 = A * cvx.matrix(x0) + b
+            obj, grad, hess = fun.fun(cvx.matrix(e0, fun.Exp.size))
+            grad = cvx.matrix(grad)[:]
+            # model: sgn*(grad'd + d'hess d/2) + proxF*||d||**2, d=A(x-x0)
+            hess = cvx.sparse(hess)
+            m = hess.size[0]
             proxF = self.options['step_sqp']
-            # VARIANT IN CONSTRAINTS: DO NOT FORCE CONVEXITY...
-            # for v in subprob.variables.keys():
-            #        x=subprob.get_varExp(v)
-            #        x0=self.get_variable(v).eval()
-            #        subprob.add_constraint((x-x0).T*(x-x0)<0.5)
-            solFound = False
-            while (not solFound):
-                if self.objective[0] == 'max':
-                    # (proximal + force convexity)
-                    quadobj = quadobj0 - proxF * abs(diffExp)**2
+            while True:
+                K = sgn * cvx.matrix(hess) + cvx.spdiag([2 * proxF] * m)
+                try:
+                    np.linalg.cholesky(np.asarray(K))
+                    break
+                except np.linalg.LinAlgError:  # model not convex
+                    proxF *= (1 + cvx.uniform(1)[0])
+                if proxF >= 100 * self.options['step_sqp']:
+                    raise Exception(
+                        'function not convex before proxF reached 100 times the initial value')
+            PQ = A.T * cvx.sparse(K) * A
+            q = sgn * A.T * grad - PQ * cvx.matrix(x0)
+            rho = (10. / float(k - 1))**0.5 if k > 1 else None
+            ht = None
+            if self.options['harmonic_steps'] and k > 1:
+                ht = cvx.matrix(np.insert(-x0, starts, rho))
+            tmodel = time.time() - tit
+
+            if use_coneqp:
+                qdims = dict(dims)
+                if ht is None:
+                    Gk, hk = G, cvx.matrix(hl + cv['hs'])
                 else:
-                    # (proximal + force convexity)
-                    quadobj = quadobj0 + proxF * abs(diffExp)**2
-                subprob = copy.deepcopy(self)
-                subprob.set_objective(self.objective[0], quadobj)
-                if self.options['harmonic_steps'] and k > 1:
-                    for v in subprob.variables.keys():
-                        x = subprob.get_varExp(v)
-                        x0 = self.get_variable(v).eval()
-                        subprob.add_constraint(
-                            (x - x0).T * (x - x0) < (10. / float(k - 1)))
+                    Gk, hk = Gtrust, cvx.matrix(hl + [ht] + cv['hs'])
+                    qdims['q'] = dims['q'] + [int(d) + 1 for d in sizes]
+                # warm-start from the previous iterate, with slacks and
+                # duals pushed into the interior of the cones (coneqp
+                # replaces missing ones by e, which is not consistent with x)
+                initvals = None
+                if qpsol is not None:
+                    sk = hk - Gk * qpsol['x']
+                    mu = max([1e-4] + [0.1 * abs(si) for si in sk])
+                    _shift_into_cone(sk, qdims, mu)
+                    zk = +qpsol['z']
+                    if zk.size[0] == sk.size[0]:
+                        _shift_into_cone(zk, qdims, mu)
+                    else:  # the trust regions were added
+                        zk = +sk
+                    initvals = {'x': qpsol['x'], 's': sk,
+                                'y': qpsol['y'], 'z': zk}
                 try:
-                    sol = subprob.solve()
-                    solFound = True
-                except Exception as ex:
-                    if str(ex)[:6] == '(1296)':  # function not convex
-                        proxF *= (1 + cvx.uniform(1))
-                    else:
-                        # reinit the initial verbosity
-                        self.options['verbose'] += 1
+                    qpsol = subprob._solver_call(
+                        cvx.solvers.coneqp, PQ, q, Gk, hk, qdims, Aeq, beq,
+                        initvals=initvals)
+                except (ArithmeticError, ValueError):
+                    if initvals is None:
                         raise
-            if proxF >= 100 * self.options['step_sqp']:
-                # reinit the initial verbosity
-                self.options['verbose'] += 1
-                raise Exception(
-                    'function not convex before proxF reached 100 times the initial value')
-
-            for v in subprob.variables:
-                self.set_var_value(v, subprob.get_valued_variable(v))
-            newvar = self._eval_all()
-            step = np.linalg.norm(newvar - oldvar)
-            if isinstance(step, cvx.matrix):
-                step = step[0]
-            oldvar = newvar
-            if self.options['verbose'] > 0:
+                    qpsol = None
+                if initvals is not None and (qpsol is None or
+                                             qpsol['status'] != 'optimal'):
+                    # the warm start may have led the solver astray
+                    qpsol = subprob._solver_call(
+                        cvx.solvers.coneqp, PQ, q, Gk, hk, qdims, Aeq, beq)
+                if qpsol['status'] != 'optimal':
+                    raise Exception('the QP subproblem could not be solved'
+                                    ' (status: ' + qpsol['status'] + ')')
+                status = qpsol['status']
+                x1 = np.asarray(qpsol['x']).ravel()
+            else:
+                if ht is not None:
+                    if not trust:
+                        for v in variables:
+                            x = subprob.get_variable(v.name)
+                            trust.append(subprob.add_constraint(
+                                Constraint('SOcone', None, x - 0,
+                                           AffinExp({}, constant=cvx.matrix(0.),
+                                                    size=(1, 1))),
+                                ret=True))
+                    for i, (v, cs) in enumerate(zip(variables, trust)):
+                        ci = cvx.matrix(x0[starts[i]:starts[i] + sizes[i]])
+                        if v.vtype == 'symmetric':
+                            ci = svecm1(ci)
+                        cs.Exp1.constant = -ci[:]
+                        cs.Exp2.constant = cvx.matrix(rho)
+                    # the backends cannot update the constants of the cones
+                    # of an instance, which is rebuilt
+                    subprob.reset_solver_instances()
+                subprob.set_objective('min', model_exp(PQ, q))
+                qpsol = subprob.solve()
+                status = qpsol['status']
+                x1 = xvec(subprob)
+
+            for i, v in enumerate(variables):
+                vi = cvx.matrix(x1[starts[i]:starts[i] + sizes[i]])
+                if v.vtype == 'symmetric':
+                    vi = svecm1(vi)
+                self.set_var_value(v.name, cvx.matrix(vi, v.size))
+            step = np.linalg.norm(x1 - x0)
+            x0 = x1
+            timings.append({'model': tmodel,
+                            'qp': time.time() - tit - tmodel,
+                            'total': time.time() - tit})
+            if verbose > 0:
                 if k == 1:
-                    print(
-                        '  {0}:         --- \t{1:6.3f} {2:10.4e}'.format(k, proxF, step))
+                    print('  {0}:         --- \t{1:6.3f} {2:10.4e} {3:8.3f}'.format(
+                        k, proxF, step, timings[-1]['total']))
                 else:
                     print(
-                        '  {0}:   {1:16.9e} {2:6.3f} {3:10.4e}'.format(
-                            k, obj, proxF, step))
+                        '  {0}:   {1:16.9e} {2:6.3f} {3:10.4e} {4:8.3f}'.format(
+                            k, obj, proxF, step, timings[-1]['total']))
             k += 1
             # have we converged ?
             if step < self.options['tol']:
                 converged = True
-            if k > self.options['maxit']:
+            elif k > maxit:
                 converged = True
                 print('Warning: no convergence after {0} iterations'.format(k))
 
-        # reinit the initial verbosity
-        self.options['verbose'] += 1
-        sol['lastStep'] = step
+        sol = {'status': status,
+               'time': time.time() - tstart,
+               'obj': fun.eval()[0],
+               'lastStep': step,
+               'sqp_iterations': k - 1,
+               'sqp_timings': timings}
+        if use_coneqp:
+            sol['cvxopt_sol'] = qpsol
+        self.status = status
         return sol
 
     def what_type(self):
@@ -6607,11 +7833,14 @@ class Problem(object):
                 'cvxopt',
                 'smcp']
         elif tp in ('MIP', 'MIQCP', 'MIQP'):
-            order = ['cplex', 'gurobi', 'mosek7', 'mosek6', 'zibopt']
+            order = ['cplex', 'gurobi', 'mosek7', 'mosek6', 'zibopt',
+                     'cvxopt']
         elif tp == 'Mixed (SOCP+quad)':
             order = ['mosek7', 'mosek6', 'cplex', 'gurobi', 'cvxopt', 'smcp']
         elif tp in ('MISOCP', 'Mixed (MISOCP+quad)'):
-            order = ['mosek7', 'mosek6', 'cplex', 'gurobi']
+            order = ['mosek7', 'mosek6', 'cplex', 'gurobi', 'cvxopt']
+        elif tp == 'MISDP':
+            order = ['cvxopt']
         elif tp == 'Mixed (SDP+quad)':
             order = ['mosek7', 'cvxopt', 'smcp']
         else:
@@ -6626,7 +7855,7 @@ class Problem(object):
         raise NotAppropriateSolverError(
             'no solver available for problem of type {0}'.format(tp))
 
-    def write_to_file(self, filename, writer='picos'):
+    def write_to_file(self, filename, writer='picos', fixed_mps=False):
         """
         This function writes the problem to a file.
 
@@ -6647,7 +7876,9 @@ class Problem(object):
                                   `cplex LP format <http://pic.dhe.ibm.com/infocenter/cplexzos/v12r4/index.jsp?topic=%2Fcom.ibm.cplex.zos.help%2Fhomepages%2Freffileformatscplex.html>`_
 
                                 * ``'.mps'``: `MPS format <http://docs.mosek.com/6.0/pyapi/node021.html>`_
-                                  (recquires mosek, gurobi or cplex).
+                                  . The picos writer handles only (mixed integer) linear programs, and
+                                  writes the free MPS format (or the fixed MPS format if ``fixed_mps=True``).
+                                  Such files can be read with :func:`import_mps() <picos.tools.import_mps>`.
 
                                 * ``'.opf'``: `OPF format <http://docs.mosek.com/6.0/pyapi/node023.html>`_
                                   (recquires mosek).
@@ -6657,12 +7888,16 @@ class Problem(object):
                                   stored as semidefinite constraints with an *arrow pattern*.
 
         :type filename: str.
-        :param writer: The default writer is ``picos``, which has its own *LP*, *CBF*, and
+        :param writer: The default writer is ``picos``, which has its own *LP*, *MPS*, *CBF*, and
                        *sparse SDPA* write functions. If cplex, mosek or gurobi is installed,
                        the user can pass the option ``writer='cplex'``, ``writer='gurobi'`` or
                        ``writer='mosek'``, and the write function of this solver
                        will be used.
         :type writer: str.
+        :param fixed_mps: if ``True``, the picos writer uses the fixed MPS format
+                          (the columns are then named ``C`` followed by their index in base 36,
+                          so that the names fit in 8 characters).
+        :type fixed_mps: bool.
 
         .. Warning :: * In the case of a SOCP, when the selected writer is ``'mosek'``, the written file may
                         contain some changes of variables with respect to the original formulation
@@ -6743,15 +7978,15 @@ class Problem(object):
 
         if writer == 'cplex':
             if self.cplex_Instance is None:
-                self._make_cplex_instance()
+                self._with_single_cones(self._make_cplex_instance)
             self.cplex_Instance.write(filename)
         elif writer == 'mosek':
             if self.msk_task is None:
-                self._make_mosek_instance()
+                self._with_single_cones(self._make_mosek_instance)
             self.msk_task.writedata(filename)
         elif writer == 'gurobi':
             if self.gurobi_Instance is None:
-                self._make_gurobi_instance()
+                self._with_single_cones(self._make_gurobi_instance)
             self.gurobi_Instance.write(filename)
         elif writer == 'picos':
             if filename[-3:] == '.lp':
@@ -6759,7 +7994,9 @@ class Problem(object):
             elif filename[-6:] == '.dat-s':
                 self._write_sdpa(filename)
             elif filename[-4:] == '.cbf':
-                self._write_cbf(filename)
+                self._with_single_cones(self._write_cbf, filename)
+            elif filename[-4:] == '.mps':
+                self._write_mps(filename, fixed_mps)
             else:
                 raise Exception('unexpected file extension')
         else:
@@ -6955,6 +8192,168 @@ class Problem(object):
         print('done.')
         f.close()
 
+    def _write_mps(self, filename, fixed=False):
+        """
+        writes the (MI)LP in free MPS format (or in fixed MPS format if
+        ``fixed=True``). The section ``COLUMNS`` is written column by column
+        from the compressed column storage of the matrix of the problem,
+        by chunks of lines.
+        """
+        # add extension
+        if filename[-4:] != '.mps':
+            filename += '.mps'
+        # check mps compatibility
+        if (self.numberConeConstraints +
+                self.numberQuadConstraints +
+                self.numberLSEConstraints +
+                self.numberSDPConstraints) > 0:
+            raise Exception('the picos MPS writer only accepts (MI)LP')
+        for v in self.variables.values():
+            if v.vtype not in ('continuous', 'integer', 'binary'):
+                raise Exception(
+                    'vtype {0} not handled by the MPS writer'.format(v.vtype))
+        # a fresh instance, without the hard-coded bounds (written in BOUNDS)
+        self._make_cvxopt_instance()
+        nv = self.numberOfVars
+        c = self.cvxoptVars['c']
+        if c is None:
+            c = cvx.matrix(0., (nv, 1))
+        elif self.objective[0] == 'max':
+            # the sense is written in the section OBJSENSE
+            c = -c
+        A = self.cvxoptVars['A']
+        Gl = self.cvxoptVars['Gl']
+        p, q = A.size[0], Gl.size[0]
+
+        # names
+        if fixed:
+            def rowname(prefix, i):
+                return prefix + np.base_repr(i, 36)
+            varnames = ['C' + np.base_repr(j, 36) for j in range(nv)]
+        else:
+            def rowname(prefix, i):
+                return prefix + str(i)
+            varnames = [None] * nv
+            for name, v in six.iteritems(self.variables):
+                name = name.replace(' ', '_')
+                for k, j in enumerate(range(v.startIndex, v.endIndex)):
+                    if v.size == (1, 1):
+                        varnames[j] = name
+                    elif v.size[1] == 1:
+                        varnames[j] = '{0}({1})'.format(name, k)
+                    else:
+                        varnames[j] = '{0}({1},{2})'.format(
+                            name, k % v.size[0], k // v.size[0])
+        objname = 'obj'
+        rownames = ([objname] + [rowname('eq', i) for i in range(p)] +
+                    [rowname('in', i) for i in range(q)])
+
+        def line(*fields):
+            return _mps_line(fields, fixed)
+
+        def num(v):
+            return _mps_number(v, fixed)
+
+        integer = np.zeros(nv, dtype=bool)
+        for v in self.variables.values():
+            if v.vtype in ('integer', 'binary'):
+                integer[v.startIndex:v.endIndex] = True
+
+        print('writing problem in ' + filename + '...')
+        f = open(filename, 'w')
+        f.write('NAME          PICOS\n' if fixed else 'NAME PICOS\n')
+        if self.objective[0] == 'max':
+            f.write('OBJSENSE\n')
+            f.write(line('', 'MAX'))
+        f.write('ROWS\n')
+        f.write(line('N', objname))
+        f.writelines(line('E', rownames[1 + i]) for i in range(p))
+        f.writelines(line('L', rownames[1 + p + i]) for i in range(q))
+
+        # matrix with the objective row, the equalities and the inequalities,
+        # in compressed column storage
+        M = cvx.sparse([cvx.sparse(c).T, A, Gl])
+        colptr, rowind, vals = [np.asarray(a).ravel() for a in M.CCS]
+        f.write('COLUMNS\n')
+        inmarker = False
+        nmarker = 0
+        chunk = []
+        for j in range(nv):
+            if integer[j] != inmarker:
+                inmarker = integer[j]
+                chunk.append(line('', 'MARKER' + str(nmarker), "'MARKER'",
+                                  '', "'INTORG'" if inmarker else "'INTEND'"))
+                nmarker += 1
+            k0, k1 = colptr[j], colptr[j + 1]
+            if k0 == k1:
+                chunk.append(line('', varnames[j], objname, num(0.)))
+            for k in range(k0, k1, 2):
+                if k + 1 < k1:
+                    chunk.append(line('', varnames[j],
+                                      rownames[rowind[k]], num(vals[k]),
+                                      rownames[rowind[k + 1]],
+                                      num(vals[k + 1])))
+                else:
+                    chunk.append(line('', varnames[j],
+                                      rownames[rowind[k]], num(vals[k])))
+            if len(chunk) >= 10000:
+                f.writelines(chunk)
+                chunk = []
+        if inmarker:
+            chunk.append(line('', 'MARKER' + str(nmarker), "'MARKER'",
+                              '', "'INTEND'"))
+        f.writelines(chunk)
+
+        # right hand side (the constant of the objective is written with a
+        # minus sign on the objective row)
+        f.write('RHS\n')
+        rhs = []
+        if self.objective[0] != 'find':
+            cst = self.objective[1].constant
+            if cst is not None and cst[0] != 0:
+                rhs.append((objname, -cst[0]))
+        for i, bi in enumerate(self.cvxoptVars['b']):
+            if bi != 0:
+                rhs.append((rownames[1 + i], bi))
+        for i, hi in enumerate(self.cvxoptVars['hl']):
+            if hi != 0:
+                rhs.append((rownames[1 + p + i], hi))
+        f.writelines(line('', 'RHS', r, num(v)) for r, v in rhs)
+
+        # bounds (the default bounds of MPS are [0,+inf])
+        f.write('BOUNDS\n')
+        chunk = []
+        for v in self.variables.values():
+            binary = (v.vtype == 'binary')
+            for k, j in enumerate(range(v.startIndex, v.endIndex)):
+                lo, up = v.bnd.get(k, (None, None))
+                if binary:
+                    lo = 0. if lo is None else max(lo, 0.)
+                    up = 1. if up is None else min(up, 1.)
+                    if lo == 0 and up == 1:
+                        chunk.append(line('BV', 'BND', varnames[j]))
+                        continue
+                if lo is not None and lo == up:
+                    chunk.append(line('FX', 'BND', varnames[j], num(lo)))
+                    continue
+                if lo is None:
+                    chunk.append(line('MI' if up is not None else 'FR',
+                                      'BND', varnames[j]))
+                elif lo != 0 or (up is not None and up < 0):
+                    chunk.append(line('LO', 'BND', varnames[j], num(lo)))
+                if up is not None:
+                    chunk.append(line('UP', 'BND', varnames[j], num(up)))
+                elif lo is not None and integer[j]:
+                    # some readers give the bounds [0,1] to integer columns
+                    chunk.append(line('PL', 'BND', varnames[j]))
+            if len(chunk) >= 10000:
+                f.writelines(chunk)
+                chunk = []
+        f.writelines(chunk)
+        f.write('ENDATA\n')
+        f.close()
+        print('done.')
+
     def _write_sdpa(self, filename):
         """
         Write a problem to sdpa format
@@ -6975,7 +8374,7 @@ class Problem(object):
         dims['s'] = [int(np.sqrt(Gsi.size[0]))
                      for Gsi in self.cvxoptVars['Gs']]
         dims['l'] = self.cvxoptVars['Gl'].size[0]
-        dims['q'] = [Gqi.size[0] for Gqi in self.cvxoptVars['Gq']]
+        dims['q'] = [d for dq in self.cvxoptVars['dq'] for d in dq]
         G = self.cvxoptVars['Gl']
         h = self.cvxoptVars['hl']
 
@@ -6987,13 +8386,9 @@ class Problem(object):
             h = cvx.matrix([h, -self.cvxoptVars['b']])
             dims['l'] += (2 * self.cvxoptVars['A'].size[0])
 
-        for i in range(len(dims['q'])):
-            G = cvx.sparse([G, self.cvxoptVars['Gq'][i]])
-            h = cvx.matrix([h, self.cvxoptVars['hq'][i]])
-
-        for i in range(len(dims['s'])):
-            G = cvx.sparse([G, self.cvxoptVars['Gs'][i]])
-            h = cvx.matrix([h, self.cvxoptVars['hs'][i]])
+        G = cvx.sparse([G] + self.cvxoptVars['Gq'] +
+                       [cvx.sparse(Gs) for Gs in self.cvxoptVars['Gs']])
+        h = cvx.matrix([h] + self.cvxoptVars['hq'] + self.cvxoptVars['hs'])
 
         # Remove the lines in A and b corresponding to 0==0
         JP = list(set(self.cvxoptVars['A'].I))
@@ -7683,6 +9078,265 @@ class Problem(object):
 
         return x, X, params  # TODO interface + check returned params !
 
+    def _read_mps(self, filename, fixed=False):
+        """
+        reads a MPS file line by line (cf. :func:`import_mps() <picos.tools.import_mps>`)
+        """
+        import array
+        try:
+            f = open(filename, 'r')
+        except IOError:
+            filename += '.mps'
+            f = open(filename, 'r')
+        print('importing problem data from ' + filename + '...')
+        self.__init__()
+
+        objsense = 'min'
+        objrow = None
+        rows = {}       # name -> index
+        rowtypes = []   # 'E', 'L' or 'G'
+        cols = {}       # name -> index
+        colnames = []
+        integer = array.array('b')
+        # triplets of the matrix, and objective
+        I = array.array('l')
+        J = array.array('l')
+        V = array.array('d')
+        cobj = {}
+        rhs = {}
+        ranges = {}
+        lower = {}
+        upper = {}
+        objconst = 0.
+        section = None
+        inmarker = False
+        lastcol = None
+
+        for line in f:
+            if not line.strip() or line[0] in '*':
+                continue
+            if not line[0].isspace():
+                # section header
+                words = line.split()
+                section = words[0].upper()
+                if section == 'OBJSENSE' and len(words) > 1:
+                    objsense = 'max' if words[1].upper().startswith(
+                        'MAX') else 'min'
+                elif section == 'ENDATA':
+                    break
+                elif section not in ('NAME', 'OBJSENSE', 'ROWS', 'COLUMNS',
+                                     'RHS', 'RANGES', 'BOUNDS'):
+                    raise Exception(
+                        'section {0} not supported by the MPS reader'.format(
+                            section))
+                continue
+            if section == 'OBJSENSE':
+                objsense = 'max' if line.split()[0].upper().startswith(
+                    'MAX') else 'min'
+                continue
+            fields = _mps_fields(line, fixed)
+            if section == 'ROWS':
+                tp, name = fields[0].upper(), fields[1]
+                if tp == 'N':
+                    if objrow is None:
+                        objrow = name
+                    else:
+                        # other free rows are ignored
+                        rows[name] = -1
+                elif tp in ('E', 'L', 'G'):
+                    rows[name] = len(rowtypes)
+                    rowtypes.append(tp)
+                else:
+                    raise Exception('unexpected row type ' + tp)
+            elif section == 'COLUMNS':
+                if "'MARKER'" in fields:
+                    if "'INTORG'" in fields:
+                        inmarker = True
+                    elif "'INTEND'" in fields:
+                        inmarker = False
+                    continue
+                if fixed:
+                    fields = fields[1:]
+                name = fields[0]
+                if name != lastcol:
+                    if name not in cols:
+                        cols[name] = len(colnames)
+                        colnames.append(name)
+                        integer.append(inmarker)
+                    lastcol = name
+                j = cols[name]
+                for k in range(1, len(fields) - 1, 2):
+                    rname, val = fields[k], float(fields[k + 1])
+                    if rname == objrow:
+                        cobj[j] = cobj.get(j, 0.) + val
+                    else:
+                        i = rows[rname]
+                        if i >= 0:
+                            I.append(i)
+                            J.append(j)
+                            V.append(val)
+            elif section in ('RHS', 'RANGES'):
+                if fixed:
+                    fields = fields[2:] if len(fields) > 2 else []
+                elif len(fields) % 2 == 1:
+                    # set name
+                    fields = fields[1:]
+                for k in range(0, len(fields) - 1, 2):
+                    rname, val = fields[k], float(fields[k + 1])
+                    if section == 'RHS':
+                        if rname == objrow:
+                            objconst = -val
+                        elif rows[rname] >= 0:
+                            rhs[rows[rname]] = val
+                    elif rows[rname] >= 0:
+                        ranges[rows[rname]] = val
+            elif section == 'BOUNDS':
+                tp = fields[0].upper()
+                if fixed:
+                    name = fields[2]
+                    val = fields[3] if len(fields) > 3 else None
+                elif tp in ('FR', 'MI', 'PL', 'BV'):
+                    name = fields[-1] if len(fields) <= 3 else fields[2]
+                    val = None
+                else:
+                    name = fields[-2]
+                    val = fields[-1]
+                j = cols[name]
+                if tp in ('UP', 'UI'):
+                    val = float(val)
+                    if val < 0 and lower.get(j, 0.) == 0:
+                        lower[j] = -INFINITY
+                    upper[j] = val
+                elif tp in ('LO', 'LI'):
+                    lower[j] = float(val)
+                elif tp == 'FX':
+                    lower[j] = upper[j] = float(val)
+                elif tp == 'FR':
+                    lower[j], upper[j] = -INFINITY, INFINITY
+                elif tp == 'MI':
+                    lower[j] = -INFINITY
+                elif tp == 'PL':
+                    upper[j] = INFINITY
+                elif tp == 'BV':
+                    lower[j], upper[j] = 0., 1.
+                else:
+                    raise Exception(
+                        'bound type {0} not supported by the MPS reader'.format(
+                            tp))
+                if tp in ('UI', 'LI', 'BV'):
+                    integer[j] = True
+        f.close()
+
+        # lower and upper bounds of the rows
+        m = len(rowtypes)
+        n = len(colnames)
+        rowtypes = np.array(rowtypes)
+        b = np.zeros(m)
+        for i, val in six.iteritems(rhs):
+            b[i] = val
+        rlo = np.where(rowtypes == 'L', -np.inf, b)
+        rup = np.where(rowtypes == 'G', np.inf, b)
+        for i, r in six.iteritems(ranges):
+            if rowtypes[i] == 'L':
+                rlo[i] = b[i] - abs(r)
+            elif rowtypes[i] == 'G':
+                rup[i] = b[i] + abs(r)
+            elif r > 0:
+                rup[i] = b[i] + r
+            else:
+                rlo[i] = b[i] + r
+
+        # partition of the columns in continuous, integer and binary columns
+        clo = np.zeros(n)
+        cup = np.inf * np.ones(n)
+        for j, val in six.iteritems(lower):
+            clo[j] = val
+        for j, val in six.iteritems(upper):
+            cup[j] = val
+        clo[clo <= -INFINITY] = -np.inf
+        cup[cup >= INFINITY] = np.inf
+        isint = np.array(integer, dtype=bool)
+        isbin = isint & (clo == 0) & (cup == 1)
+        vtypes = np.where(isbin, 'binary',
+                          np.where(isint, 'integer', 'continuous'))
+        groups = [('continuous', 'x_cont'), ('integer', 'x_int'),
+                  ('binary', 'x_bin')]
+        colpos = np.zeros(n, dtype=int)
+        x = {}
+        columns = {}
+        for vtype, vname in groups:
+            idx = np.flatnonzero(vtypes == vtype)
+            if not len(idx):
+                continue
+            colpos[idx] = np.arange(len(idx))
+            lo = up = None
+            if vtype != 'binary':
+                lo = cvx.matrix(np.maximum(clo[idx], -2 * INFINITY))
+                up = cvx.matrix(np.minimum(cup[idx], 2 * INFINITY))
+            x[vtype] = self.add_variable(vname, len(idx), vtype, lo, up)
+            columns[vtype] = [colnames[j] for j in idx]
+
+        # objective
+        c = {}
+        obj = new_param('objconst', objconst)
+        cJ = np.array(sorted(cobj), dtype=int)
+        cV = np.array([cobj[j] for j in cJ])
+        for vtype in x:
+            sel = (vtypes[cJ] == vtype)
+            if np.any(sel):
+                c[vtype] = new_param('c_' + vtype, _triplets_to_spmatrix(
+                    cV[sel], colpos[cJ[sel]], np.zeros(sel.sum(), dtype=int),
+                    (x[vtype].size[0], 1)))
+                obj += c[vtype] | x[vtype]
+        if objrow is None:
+            self.set_objective('find', None)
+        else:
+            self.set_objective(objsense, obj)
+
+        # constraints
+        I = np.array(I, dtype=int)
+        J = np.array(J, dtype=int)
+        V = np.array(V, dtype=float)
+        AA = {}
+        bb = {}
+        rownames = {}
+        names = [None] * m
+        for name, i in six.iteritems(rows):
+            if i >= 0:
+                names[i] = name
+        for sense, sel in (('=', rlo == rup),
+                           ('<', (rlo < rup) & np.isfinite(rup)),
+                           ('>', (rlo < rup) & np.isfinite(rlo))):
+            ridx = np.flatnonzero(sel)
+            if not len(ridx):
+                continue
+            rpos = -np.ones(m, dtype=int)
+            rpos[ridx] = np.arange(len(ridx))
+            rownames[sense] = [names[i] for i in ridx]
+            bb[sense] = new_param('b' + sense, cvx.matrix(
+                rlo[ridx] if sense == '>' else rup[ridx]))
+            exp = None
+            insel = rpos[I] >= 0
+            for vtype in x:
+                s = insel & (vtypes[J] == vtype)
+                AA[sense, vtype] = new_param(
+                    'A' + sense + '_' + vtype, _triplets_to_spmatrix(
+                        V[s], rpos[I[s]], colpos[J[s]],
+                        (len(ridx), x[vtype].size[0])))
+                term = AA[sense, vtype] * x[vtype]
+                exp = term if exp is None else exp + term
+            if sense == '=':
+                self.add_constraint(exp == bb[sense])
+            elif sense == '<':
+                self.add_constraint(exp < bb[sense])
+            else:
+                self.add_constraint(exp > bb[sense])
+
+        print('done.')
+        data = {'c': c, 'A': AA, 'b': bb,
+                'columns': columns, 'rows': rownames}
+        return x, data
+
     def _read_cbf_block(self, blocname, f, parsed_blocks):
         if blocname == 'OBJSENSE':
             objsense = f.readline().split()[0].lower()
@@ -7818,7 +9472,7 @@ class Problem(object):
                 I.append(i)
                 J.append(j)
                 V.append(v)
-            return cvx.spmatrix(
+            return _triplets_to_spmatrix(
                 V, I, J, (parsed_blocks['CON'][0], parsed_blocks['VAR'][0]))
         elif blocname == 'BCOORD':
             n = int(f.readline())
@@ -7829,7 +9483,7 @@ class Problem(object):
                 i, v = int(lsplit[0]), float(lsplit[1])
                 I.append(i)
                 V.append(v)
-            return cvx.spmatrix(
+            return _triplets_to_spmatrix(
                 V, I, [0] * len(I), (parsed_blocks['CON'][0], 1))
         elif blocname == 'HCOORD':
             n = int(f.readline())
@@ -7909,6 +9563,7 @@ class Problem(object):
         Returns an equivalent problem,
         where the n x n- hermitian matrices have been replaced by
         symmetric matrices of size 2n x 2n.
+        The bounds of the real variables are copied to the new problem.
         """
         import copy
         real = Problem()
@@ -7942,6 +9597,9 @@ class Problem(object):
                         'antisym').factors.keys())[0]
             else:
                 cvars[v.name] = real.add_variable(v.name, v.size, v.vtype)
+                for i, bnd in v.bnd.items():
+                    cvars[v.name].bnd._set(i, bnd)
+                cvars[v.name]._bndtext = v._bndtext
 
         for c in self.constraints:
             if c.typeOfConstraint.startswith('sdp'):
@@ -8028,7 +9686,11 @@ class Problem(object):
                         'complex expression in the RHS of a nonlinear constraint')
                 E2 = _copy_exp_to_new_vars(c.Exp2, cvars, complex=False)
                 E3 = _copy_exp_to_new_vars(c.Exp3, cvars, complex=False)
-                c2 = Constraint(c.typeOfConstraint, None, E1, E2, E3)
+                if c.typeOfConstraint[2:] == 'cones' and not c.Exp1.is_real():
+                    raise Exception(
+                        'complex expression in a block of cones')
+                c2 = Constraint(c.typeOfConstraint, None, E1, E2, E3,
+                                coneSizes=c.coneSizes)
                 real.add_constraint(c2, c.key)
 
         if not(self.objective[1] is None) and not(self.objective[1].is_real()):
@@ -8053,6 +9715,164 @@ class Problem(object):
 
         return real
 
+    def chordal_decomposition(self):
+        """
+        Returns an equivalent problem, where the sparse
+        Linear Matrix Inequalities have been decomposed in smaller LMIs.
+
+        For each constraint ``M(x) >> 0`` (or ``M(x) << 0``), the aggregate sparsity
+        pattern of ``M`` (the union of the sparsity patterns of its constant and of its
+        coefficient matrices) is extended to a chordal pattern, whose maximal cliques
+        :math:`C_1,\ldots,C_m` form a clique tree. If there is more than one clique,
+        the LMI is replaced by the :math:`m` LMIs
+
+        .. math::
+
+            M_k(x) + E_k(W_k) - \sum_{j \in \operatorname{ch}(k)} E_k(W_j) \succeq 0,
+
+        of size :math:`|C_k| \times |C_k|`, where every entry of
+        :math:`M(x)` is assigned to exactly one block :math:`M_k(x)`,
+        :math:`W_k` is a new symmetric variable
+        indexed by the intersection of :math:`C_k` with its parent clique,
+        :math:`E_k` embeds such a matrix at its position in the kth block, and
+        :math:`\operatorname{ch}(k)` is the set of children of :math:`C_k`
+        (the overlap variables cancel out when the blocks are summed back).
+        Other constraints are copied as is.
+
+        The decomposition is applied automatically by :func:`solve() <picos.Problem.solve>`
+        when the option ``chordal_decomposition`` is set to ``True``.
+        The dual of a decomposed LMI is then the maximum determinant positive semidefinite completion
+        of the duals of the smaller LMIs, which are its blocks on the cliques.
+        """
+        dec = Problem()
+        cvars = {}
+        for (iv, v) in sorted([(v.startIndex, v)
+                               for v in self.variables.values()]):
+            cvars[v.name] = dec.add_variable(v.name, v.size, v.vtype)
+            for i, bnd in six.iteritems(v.bnd):
+                cvars[v.name].bnd._set(i, bnd)
+            cvars[v.name]._bndtext = v._bndtext
+
+        # _chordal_map[i] describes the new constraint(s) of self.constraints[i]:
+        # ('cons', j) if it was copied as dec.constraints[j], and
+        # ('lmi', n, cliques, [j_1,...,j_m]) if it was decomposed, where
+        # dec.constraints[j_k] is the LMI of the kth clique
+        dec._chordal_map = []
+        for i, c in enumerate(self.constraints):
+            E1 = _copy_exp_to_new_vars(c.Exp1, cvars)
+            E2 = _copy_exp_to_new_vars(c.Exp2, cvars)
+            if c.typeOfConstraint.startswith('sdp'):
+                if c.typeOfConstraint == 'sdp>':
+                    M = E1 - E2
+                else:
+                    M = E2 - E1
+                n = M.size[0]
+                rows = [np.asarray(fac.I).ravel()
+                        for fac in M.factors.values()]
+                if M.constant is not None:
+                    rows.append(np.asarray(
+                        cvx.sparse(M.constant).I).ravel())
+                rows = np.unique(np.concatenate(rows))
+                cliques, parents = _chordal_cliques(n, rows % n, rows // n)
+                if len(cliques) > 1:
+                    dec._chordal_map.append(
+                        ('lmi', n, cliques,
+                         self._add_decomposed_lmi(dec, i, M, cliques, parents)))
+                    continue
+            E3 = _copy_exp_to_new_vars(c.Exp3, cvars)
+            c2 = Constraint(c.typeOfConstraint, None, E1, E2, E3)
+            dec.add_constraint(c2, c.key)
+            dec._chordal_map.append(('cons', len(dec.constraints) - 1))
+
+        obj = _copy_exp_to_new_vars(self.objective[1], cvars)
+        dec.set_objective(self.objective[0], obj)
+        dec._options = _NonWritableDict(self.options)
+        dec.set_option('chordal_decomposition', False)
+        return dec
+
+    def _add_decomposed_lmi(self, dec, i, M, cliques, parents):
+        """
+        adds in ``dec`` the LMIs over the cliques which replace ``M >> 0``
+        (the ith constraint of ``self``), cf. :func:`chordal_decomposition()
+        <picos.Problem.chordal_decomposition>`, and returns their indices in
+        ``dec.constraints``.
+        """
+        n = M.size[0]
+        # position of each row of M in each clique
+        local = [dict((r, a) for a, r in enumerate(C)) for C in cliques]
+        # the entry (r,s) of M is assigned to the first clique containing r and s
+        owner = {}
+        for k, C in enumerate(cliques):
+            for s in C:
+                for r in C:
+                    owner.setdefault(r + n * s, k)
+        assigned = [[] for C in cliques]
+        for rs in sorted(owner):
+            assigned[owner[rs]].append(rs)
+
+        # overlap variables
+        W = [None] * len(cliques)
+        children = [[] for C in cliques]
+        for k, p in enumerate(parents):
+            if p is not None:
+                children[p].append(k)
+                sep = [r for r in cliques[k] if r in local[p]]
+                W[k] = (sep, dec.add_variable(
+                    'chordal[{0}]_W[{1}]'.format(i, k), (len(sep), len(sep)),
+                    'symmetric'))
+
+        def embed(k, sep, Wk, sign):
+            ck = len(cliques[k])
+            sk = len(sep)
+            I = [local[k][r] + ck * local[k][s] for s in sep for r in sep]
+            T = cvx.spmatrix(sign, I, list(range(sk * sk)), (ck * ck, sk * sk))
+            return T * Wk.factors[Wk]
+
+        indices = []
+        for k, C in enumerate(cliques):
+            ck = len(C)
+            rs = np.asarray(assigned[k], dtype=int)
+            T = cvx.spmatrix(
+                1., [local[k][r] + ck * local[k][s]
+                     for (r, s) in zip((rs % n).tolist(), (rs // n).tolist())],
+                rs.tolist(), (ck * ck, n * n))
+            factors = dict((v, T * fac) for (v, fac) in six.iteritems(M.factors))
+            if M.constant is None:
+                constant = None
+            else:
+                constant = T * cvx.sparse(M.constant)
+            if W[k] is not None:
+                factors[W[k][1]] = embed(k, W[k][0], W[k][1], 1.)
+            for j in children[k]:
+                factors[W[j][1]] = embed(k, W[j][0], W[j][1], -1.)
+            Mk = AffinExp(factors, constant, (ck, ck),
+                          '[' + M.string + ']_' + str(k))
+            dec.add_constraint(Mk >> 0)
+            indices.append(len(dec.constraints) - 1)
+        return indices
+
+    def _cached_real_problem(self):
+        """
+        returns the real problem of :func:`to_real() <picos.Problem.to_real>`,
+        which is cached as long as the variables, the constraints and the
+        objective of ``self`` are the same objects, so that solving the
+        same complex problem again does not redo the conversion. The cache
+        is also cleared when the bounds of a variable change, and by
+        :func:`reset_solver_instances`.
+        The options of the real problem are updated with those of ``self``.
+        """
+        objects = ([self.objective[1]] + list(self.constraints) +
+                   [var for (name, var) in sorted(self.variables.items())])
+        if self._realP is not None:
+            typ, oldobjects, realP = self._realP
+            if (typ == self.objective[0] and len(oldobjects) == len(objects)
+                    and all(a is b for a, b in zip(oldobjects, objects))):
+                realP.update_options(**self.options)
+                return realP
+        realP = self.to_real()
+        self._realP = (self.objective[0], objects, realP)
+        return realP
+
     def dualize(self):
         """
         Returns a Problem containing the Lagrangian dual of the current problem ``self``.
@@ -8076,64 +9896,114 @@ class Problem(object):
 
         dual = Problem()
         self._make_cvxopt_instance(hard_coded_bounds=True)
-        cc = new_param('cc', self.cvxoptVars['c'])
-        lincons = cc
-        obj = 0
+        cvxoptVars = self.cvxoptVars
+        # the primal instance with hard coded bounds must not be reused by
+        # a subsequent call to solve()
+        self.reset_cvxopt_instance()
+
+        # The dual constraint lincons == maff and the dual objective are
+        # assembled from the sparse canonical blocks (one factor matrix per
+        # dual variable), rather than by summing one expression per cone.
+        nvars = cvxoptVars['c'].size[0]
+        linfacs = {}
+        objfacs = {}
+        linstr = ['cc']
+        objstr = []
         # equalities
-        Ae = new_param('Ae', self.cvxoptVars['A'])
-        be = new_param('be', -self.cvxoptVars['b'])
-        if Ae.size[0] > 0:
-            mue = dual.add_variable('mue', Ae.size[0])
-            lincons += (Ae.T * mue)
-            obj += be.T * mue
+        A = cvxoptVars['A']
+        if A.size[0] > 0:
+            mue = dual.add_variable('mue', A.size[0])
+            linfacs[mue] = A.T
+            objfacs[mue] = cvx.sparse(-cvxoptVars['b']).T
+            linstr.append('Ae.T*mue')
+            objstr.append('be.T*mue')
         # inequalities
-        Al = new_param('Al', self.cvxoptVars['Gl'])
-        bl = new_param('bl', -self.cvxoptVars['hl'])
-        if Al.size[0] > 0:
-            mul = dual.add_variable('mul', Al.size[0])
+        Gl = cvxoptVars['Gl']
+        if Gl.size[0] > 0:
+            mul = dual.add_variable('mul', Gl.size[0])
             dual.add_constraint(mul > 0)
-            lincons += (Al.T * mul)
-            obj += bl.T * mul
-        # soc cons
-        i = 0
-        As, bs, fs, ds, zs, lbda = [], [], [], [], [], []
-        for Gq, hq in zip(self.cvxoptVars['Gq'], self.cvxoptVars['hq']):
-            As.append(new_param('As[' + str(i) + ']', -Gq[1:, :]))
-            bs.append(new_param('bs[' + str(i) + ']', hq[1:]))
-            fs.append(new_param('fs[' + str(i) + ']', -Gq[0, :].T))
-            ds.append(new_param('ds[' + str(i) + ']', hq[0]))
-            zs.append(dual.add_variable('zs[' + str(i) + ']', As[i].size[0]))
-            lbda.append(dual.add_variable('lbda[' + str(i) + ']', 1))
-            dual.add_constraint(abs(zs[i]) < lbda[i])
-            lincons += (As[i].T * zs[i] - fs[i] * lbda[i])
-            obj += (bs[i].T * zs[i] - ds[i] * lbda[i])
-            i += 1
+            linfacs[mul] = Gl.T
+            objfacs[mul] = cvx.sparse(-cvxoptVars['hl']).T
+            linstr.append('Al.T*mul')
+            objstr.append('bl.T*mul')
+        # soc cons: the cones of the same size k share two arrays of
+        # variables, lbda_k (the dual of the first row) and zs_k (the others)
+        qdims = np.array([d for dq in cvxoptVars['dq'] for d in dq],
+                         dtype=int)
+        if len(qdims):
+            Gq = cvx.sparse(cvxoptVars['Gq'])
+            hq = np.asarray(cvx.matrix(cvxoptVars['hq'])).ravel()
+            Iq = np.asarray(Gq.I).ravel()
+            Jq = np.asarray(Gq.J).ravel()
+            Vq = np.asarray(Gq.V).ravel()
+        # position of each cone in the arrays, to retrieve the duals
+        dual._dualized_cones = [None] * len(qdims)
+        for k in sorted(set(qdims.tolist())):
+            cones = np.flatnonzero(qdims == k)
+            N = len(cones)
+            # rows of the cones of size k, numbered consecutively
+            rowsel = np.repeat(qdims == k, qdims)
+            newrow = np.cumsum(rowsel) - 1
+            sel = rowsel[Iq]
+            I = newrow[Iq[sel]]
+            J = Jq[sel]
+            V = Vq[sel]
+            hk = hq[rowsel]
+            head = (I % k == 0)
+            lbda = dual.add_variable_array('lbda_' + str(k), N, 1)
+            linfacs[lbda.variable] = cvx.spmatrix(
+                V[head], J[head], I[head] // k, (nvars, N))
+            objfacs[lbda.variable] = cvx.sparse(cvx.matrix(-hk[::k])).T
+            if k > 1:
+                tail = ~head
+                zs = dual.add_variable_array('zs_' + str(k), N, k - 1)
+                linfacs[zs.variable] = cvx.spmatrix(
+                    -V[tail], J[tail],
+                    (I[tail] // k) * (k - 1) + I[tail] % k - 1,
+                    (nvars, N * (k - 1)))
+                objfacs[zs.variable] = cvx.sparse(cvx.matrix(
+                    np.delete(hk, np.arange(0, N * k, k)))).T
+                if k > 2:
+                    # ||zs[p]|| < lbda[p] for all p, as a block of cones
+                    dual.add_constraint(Constraint(
+                        'SOcones', None, zs.variable, lbda.variable))
+                else:
+                    dual.add_list_of_constraints(
+                        [abs(zs[p]) < lbda[p] for p in range(N)],
+                        'p', '[{0}]'.format(N))
+            else:
+                dual.add_constraint(lbda >= 0)
+            for p, i in enumerate(cones):
+                dual._dualized_cones[i] = (k, p)
+            linstr.append('As_{0}.T*zs_{0} - fs_{0}*lbda_{0}'.format(k))
+            objstr.append('bs_{0}.T*zs_{0} - ds_{0}*lbda_{0}'.format(k))
         # sdp cons
-        j = 0
-        X = []
-        M0 = []
-        factors = {}
-        for Gs, hs in zip(self.cvxoptVars['Gs'], self.cvxoptVars['hs']):
+        maffacs = {}
+        sdpobj = []
+        for j, (Gs, hs) in enumerate(zip(cvxoptVars['Gs'], cvxoptVars['hs'])):
             nbar = int(Gs.size[0]**0.5)
-            svecs = [svec(cvx.matrix(Gs[:, k], (nbar, nbar)),
-                          ignore_sym=True).T for k in range(Gs.size[1])]
-            msvec = cvx.sparse(svecs)
-            X.append(
-                dual.add_variable(
-                    'X[' + str(j) + ']', (nbar, nbar), 'symmetric'))
-            factors[X[j]] = -msvec
-            dual.add_constraint(X[j] >> 0)
-            M0.append(new_param('M0[' + str(j) + ']', -
-                                cvx.matrix(hs, (nbar, nbar))))
-            obj += (M0[j] | X[j])
-            j += 1
-
-        if factors:
-            maff = AffinExp(
-                factors=factors, size=(
-                    msvec.size[0], 1), string='M dot X')
+            X = dual.add_variable('X[' + str(j) + ']', (nbar, nbar), 'symmetric')
+            maffacs[X] = -_svec_columns(Gs, nbar)
+            dual.add_constraint(X >> 0)
+            M0 = new_param('M0[' + str(j) + ']',
+                           -cvx.matrix(hs, (nbar, nbar)))
+            sdpobj.append(M0 | X)
+
+        lincons = AffinExp(factors=linfacs,
+                           constant=cvx.sparse(cvxoptVars['c']),
+                           size=(nvars, 1), string=' + '.join(linstr))
+        if maffacs:
+            maff = AffinExp(factors=maffacs, size=(nvars, 1),
+                            string='M dot X')
         else:
             maff = 0
+        obj = AffinExp(factors=objfacs, size=(1, 1),
+                       string=' + '.join(objstr))
+        if not objfacs:
+            obj.constant = cvx.matrix(0., (1, 1))
+            obj.string = '0'
+        for term in sdpobj:
+            obj += term
         dual.add_constraint(lincons == maff)
         dual.set_objective('max', obj)
         dual._options = _NonWritableDict(self.options)
@@ -40,7 +40,10 @@ __all__ = ['_retrieve_matrix',
            'putIndices',
            '_blocdiag',
            'svec',
+           '_svec_columns',
+           '_svec_stack',
            'svecm1',
+           '_svecm1_columns',
            'ltrim1',
            '_utri',
            'lowtri',
@@ -51,6 +54,7 @@ __all__ = ['_retrieve_matrix',
            'available_solvers',
            'offset_in_lil',
            'import_cbf',
+           'import_mps',
            'diag_vect',
            '_quad2norm',
            '_copy_exp_to_new_vars',
@@ -67,6 +71,7 @@ __all__ = ['_retrieve_matrix',
            '_flatten',
            '_remove_in_lil',
            'norm',
+           'norms',
            '_read_sdpa',
            'tracepow',
            'trace',
@@ -85,6 +90,30 @@ __all__ = ['_retrieve_matrix',
            '_cplx_mat_to_real_mat',
            '_cplx_vecmat_to_real_vecmat',
            '_is_idty',
+           '_chordal_cliques',
+           '_psd_completion',
+           '_triplets_to_spmatrix',
+           '_vec',
+           '_affexp_arrays',
+           '_canonical_block',
+           '_canonical_rows',
+           '_set_canonical_constraints',
+           '_parallel_map',
+           '_SolutionCache',
+           '_run_with_watchdog',
+           '_popen_with_watchdog',
+           '_mps_fields',
+           '_mps_line',
+           '_mps_number',
+           '_stacked_scalars',
+           '_cone_block_rows',
+           '_split_rows',
+           '_shift_into_cone',
+           '_sparse_times',
+           '_geomean_tree',
+           '_power_cone_tree',
+           '_block_diagonal_blocks',
+           '_principal_submatrix',
            ]
 
 
@@ -211,8 +240,8 @@ def _break_cols(mat, sizes):
         if block == 0:
             J[block].append(j)
         else:
-            J[block].append(j - cumsz[block - 1])
-    return [cvx.spmatrix(V[k], I[k], J[k], (mat.size[0], sz))
+            J[block].append(int(j - cumsz[block - 1]))
+    return [_triplets_to_spmatrix(V[k], I[k], J[k], (mat.size[0], sz))
             for k, sz in enumerate(sizes)]
 
 
@@ -232,8 +261,8 @@ def _break_rows(mat, sizes):
         if block == 0:
             I[block].append(i)
         else:
-            I[block].append(i - cumsz[block - 1])
-    return [cvx.spmatrix(V[k], I[k], J[k], (sz, mat.size[1]))
+            I[block].append(int(i - cumsz[block - 1]))
+    return [_triplets_to_spmatrix(V[k], I[k], J[k], (sz, mat.size[1]))
             for k, sz in enumerate(sizes)]
 
 
@@ -293,6 +322,10 @@ def norm(exp, num=2, denom=1):
     in the second argument (rational approximations will be used), and the third argument will
     be ignored.
 
+    The inequalities on a p-norm are reformulated with a minimal number of rotated second order
+    cones for the rational exponent, and the cones of all the entries of ``exp`` form a single block
+    of cones. The method ``cone_count()`` of the constraint reports the size of the reformulation.
+
     **Example:**
 
     >>> import picos as pic
@@ -301,6 +334,8 @@ def norm(exp, num=2, denom=1):
     >>> y = P.add_variable('y',3)
     >>> pic.norm(y,7,3) < x
     # p-norm ineq : norm_7/3( y)<x#
+    >>> (pic.norm(y,7,3) < x).cone_count()['RScone'] # 3 rotated cones per entry of y
+    9
     >>> pic.norm(y,-0.4) > x
     # generalized p-norm ineq : norm_-2/5( y)>x#
     >>> X = P.add_variable('X',(3,2))
@@ -335,6 +370,34 @@ def norm(exp, num=2, denom=1):
         return NormP_Exp(exp, frac.numerator, frac.denominator)
 
 
+def norms(exp, axis=1):
+    """returns a :class:`Norms <picos.Norms>` object representing the Euclidean norms of the
+    rows (``axis=1``) or of the columns (``axis=0``) of the affine expression ``exp``.
+    This can be used to enter at once the constraints :math:`\Vert X_{i,:} \Vert \leq t_i`
+    for all rows :math:`i` of a matrix :math:`X` (``t`` can also be a scalar which bounds all the norms).
+    The constraint is stored as a single block of second order cones,
+    which is canonicalized in one pass (rather than as one constraint per row),
+    and its dual is a matrix with one column per cone.
+
+    **Example:**
+
+    >>> import picos as pic
+    >>> P = pic.Problem()
+    >>> X = P.add_variable('X',(4,3))
+    >>> t = P.add_variable('t',4)
+    >>> pic.norms(X, axis=1) < t
+    # 4 SOC constraints: ||X[i,:]|| < t[i] #
+    >>> pic.norms(X - 1, axis=0) < 2
+    # 3 SOC constraints: ||(X -|1|)[:,j]|| < 2.0 #
+    """
+    from .expression import AffinExp
+    from .expression import Norms
+    if not isinstance(exp, AffinExp):
+        mat, name = _retrieve_matrix(exp)
+        exp = AffinExp({}, constant=mat[:], size=mat.size, string=name)
+    return Norms(exp, axis)
+
+
 def tracepow(exp, num=1, denom=1, coef=None):
     """Returns a :class:`TracePow_Exp <picos.TracePow_Exp>` object representing the trace of the pth-power of the symmetric matrix ``exp``, where ``exp`` is an :class:`AffinExp <picos.AffinExp>` which we denote by :math:`X`.
     This can be used to enter constraints of the form :math:`\operatorname{trace} X^p \leq t` with :math:`p\geq1` or :math:`p < 0`, or :math:`\operatorname{trace} X^p \geq t` with :math:`0 \leq p \leq 1`.
@@ -345,7 +408,8 @@ def tracepow(exp, num=1, denom=1, coef=None):
     semidefinite and :math:`0<p<1`.
 
     Trace of power inequalities are internally reformulated as a set of Linear Matrix Inequalities (SDP),
-    or second order cone inequalities if ``exp`` is a scalar.
+    or second order cone inequalities if ``exp`` is a scalar (in which case the number of
+    rotated cones is minimal for the rational exponent).
 
     The exponent :math:`p` of the norm must be specified either by
     a couple numerator (2d argument) / denominator (3d arguments),
@@ -450,6 +514,10 @@ def lambda_max(exp):
     """
     largest eigenvalue of a square matrix expression (cf. :func:`pic.sum_k_largest(exp,1) <picos.tools.sum_k_largest_lambda>`)
 
+    If the sparsity pattern of ``exp`` is block diagonal (up to a symmetric permutation),
+    the constraint ``lambda_max(exp) < t`` is split into one LMI per diagonal block
+    (and the blocks of size 1 form a single linear inequality).
+
     >>> import picos as pic
     >>> prob = pic.Problem()
     >>> x = prob.add_variable('X',(3,3),'symmetric')
@@ -514,7 +582,9 @@ def sum_k_smallest_lambda(exp, k):
 
 def lambda_min(exp):
     """
-    smallest eigenvalue of a square matrix expression (cf. :func:`pic.sum_k_smallest(exp,1) <picos.tools.sum_k_smallest_lambda>`)
+    smallest eigenvalue of a square matrix expression (cf. :func:`pic.sum_k_smallest(exp,1) <picos.tools.sum_k_smallest_lambda>`).
+    As for :func:`lambda_max() <picos.tools.lambda_max>`, the constraint is split into
+    one LMI per diagonal block of a block diagonal ``exp``.
 
     >>> import picos as pic
     >>> prob = pic.Problem()
@@ -926,16 +996,17 @@ def _blocdiag(X, n, sub1=0, sub2='n'):
         '''
     if not isinstance(X, cvx.base.spmatrix):
         X = cvx.sparse(X)
-    I = []
-    J = []
-    V = []
-    i0 = 0
-    for k in range(sub1, sub2):
-        I.extend([xi + i0 for xi in X.I])
-        J.extend([xj + X.size[1] * k for xj in X.J])
-        V.extend(X.V)
-        i0 += X.size[0]
-    return cvx.spmatrix(V, I, J, (i0, X.size[1] * n))
+    # the blocks are generated with index arithmetic on the (I,J,V) arrays
+    # of X, rather than with a python loop over its nonzero elements
+    nblocks = max(sub2 - sub1, 0)
+    m, p = X.size
+    shifts = np.arange(nblocks)
+    I = np.asarray(X.I).ravel()[np.newaxis, :] + m * shifts[:, np.newaxis]
+    J = (np.asarray(X.J).ravel()[np.newaxis, :] +
+         p * (shifts[:, np.newaxis] + sub1))
+    V = np.tile(np.asarray(X.V).ravel(), nblocks)
+    return cvx.spmatrix(V, I.ravel(), J.ravel(),
+                        (m * nblocks, p * n), X.typecode)
 
 
 def lse(exp):
@@ -1041,6 +1112,13 @@ def diag_vect(exp):
     return expcopy
 
 
+# cache of the matrices parsed from strings such as 'I', '|1|' or 'e_i(n,m)',
+# indexed by (string, exSize)
+_literal_cache = {}
+_literal_cache_maxsize = 512
+_literal_cache_maxnnz = 100000
+
+
 def _retrieve_matrix(mat, exSize=None):
     """
     parses the variable *mat* and convert it to a :func:`cvxopt sparse matrix <cvxopt:cvxopt.spmatrix>`.
@@ -1061,6 +1139,7 @@ def _retrieve_matrix(mat, exSize=None):
                     * :func:`cvxopt matrix <cvxopt:cvxopt.matrix>`
                     * :func:`cvxopt sparse matrix <cvxopt:cvxopt.spmatrix>`
                     * :func:`numpy array <numpy:numpy.array>`
+                    * scipy.sparse matrix (CSR, CSC, COO, ...)
                     * ``int`` or ``real`` [creates a vector/matrix of the size exSize *(or of size (1,1) if exSize is None)*,
                       whith all entries equal to **mat**.
                     * following strings:
@@ -1097,6 +1176,16 @@ def _retrieve_matrix(mat, exSize=None):
 
     """
     retstr = None
+    fresh = False  # True if retmat is a new spmatrix that can be returned as is
+    cache_key = None
+    if isinstance(mat, str):
+        cache_key = (mat, exSize)
+        try:
+            cached = _literal_cache.get(cache_key)
+        except TypeError:  # unhashable exSize
+            cached = cache_key = None
+        if cached is not None:
+            return cvx.sparse(cached[0]), cached[1]
     from .expression import Expression
     if isinstance(mat, Expression) and mat.is_valued():
         if isinstance(
@@ -1107,6 +1196,13 @@ def _retrieve_matrix(mat, exSize=None):
             retmat = mat.value
         else:
             retmat = cvx.matrix(mat.value)
+    elif (isinstance(mat, np.ndarray) and mat.ndim <= 2
+          and mat.dtype.kind in 'biufc'):
+        retmat = _ndarray_to_spmatrix(mat)
+        fresh = True
+    elif _is_scipy_sparse(mat):
+        retmat = _scipy_sparse_to_spmatrix(mat)
+        fresh = True
     elif isinstance(mat, np.ndarray):
         if np.iscomplex(mat).any():
             try:
@@ -1296,7 +1392,8 @@ def _retrieve_matrix(mat, exSize=None):
         raise NameError('unexpected mat variable')
 
     # make sure it's sparse
-    retmat = cvx.sparse(retmat)
+    if not fresh:
+        retmat = cvx.sparse(retmat)
 
     # look for a more appropriate string...
     if retstr is None:
@@ -1329,10 +1426,134 @@ def _retrieve_matrix(mat, exSize=None):
             retstr += 'e_' + str(i)
     #(1,1) matrix but not appropriate size
     if retmat.size == (1, 1) and (exSize not in [(1, 1), 1, None]):
-        return _retrieve_matrix(retmat[0], exSize)
+        retmat, retstr = _retrieve_matrix(retmat[0], exSize)
+    if cache_key is not None and len(retmat.V) <= _literal_cache_maxnnz:
+        if len(_literal_cache) >= _literal_cache_maxsize:
+            _literal_cache.clear()
+        _literal_cache[cache_key] = (cvx.sparse(retmat), retstr)
     return retmat, retstr
 
 
+def _vec(mat):
+    """
+    returns a copy of the matrix ``mat`` as a column vector, as ``mat[:]``
+    (cvxopt builds ``mat[:]`` in quadratic time for a sparse matrix with many
+    columns, while the size of a copy is changed in place).
+    """
+    vec = +mat
+    vec.size = (mat.size[0] * mat.size[1], 1)
+    return vec
+
+
+def _ndarray_to_spmatrix(arr):
+    """
+    converts a numeric numpy array with at most 2 dimensions
+    into a :func:`cvxopt sparse matrix <cvxopt:cvxopt.spmatrix>`.
+    The array is passed to cvxopt as a dense matrix, whose zeros are
+    dropped by ``cvx.sparse`` (in linear time, while cvxopt inserts the
+    triplets of a column in quadratic time),
+    so no python loop over the elements takes place.
+    1-dimensional arrays are converted to column vectors.
+    """
+    arr = np.asarray(arr)  # np.matrix -> ndarray
+    if arr.ndim == 0:
+        arr = arr.reshape((1, 1))
+    elif arr.ndim == 1:
+        arr = arr.reshape((arr.shape[0], 1))
+    m, n = arr.shape
+    # column major order, as in cvxopt (no copy for fortran arrays)
+    flat = arr.ravel(order='F')
+    if np.iscomplexobj(flat) and flat.imag.any():
+        tc = 'z'
+        flat = flat.astype(complex, copy=False)
+    else:
+        tc = 'd'
+        flat = flat.real.astype(float, copy=False)
+    if m == 0 or n == 0:
+        return cvx.spmatrix([], [], [], (m, n), tc)
+    return cvx.sparse(cvx.matrix(flat, (m, n), tc))
+
+
+def _is_scipy_sparse(mat):
+    """
+    returns True if mat is a scipy.sparse matrix. scipy is not
+    imported unless mat looks like a sparse matrix.
+    """
+    if not hasattr(mat, 'tocoo'):
+        return False
+    try:
+        import scipy.sparse
+    except ImportError:
+        return False
+    return scipy.sparse.issparse(mat)
+
+
+def _scipy_sparse_to_spmatrix(mat):
+    """
+    converts a scipy.sparse matrix (CSR, CSC, COO,...)
+    into a :func:`cvxopt sparse matrix <cvxopt:cvxopt.spmatrix>`,
+    by passing its coordinate arrays to :func:`_triplets_to_spmatrix`
+    (duplicate entries are summed).
+    """
+    coo = mat.tocoo()
+    V, I, J = coo.data, coo.row, coo.col
+    nz = (V != 0)
+    if not nz.all():  # explicitly stored zeros
+        V, I, J = V[nz], I[nz], J[nz]
+    if np.iscomplexobj(V) and V.imag.any():
+        tc = 'z'
+        V = V.astype(complex, copy=False)
+    else:
+        tc = 'd'
+        V = V.real.astype(float, copy=False)
+    return _triplets_to_spmatrix(V, I, J, coo.shape, tc)
+
+
+def _svec_tril_indices(n):
+    """
+    returns the arrays ``(r, c)`` of the row and column indices of the
+    elements of the lower triangle of a ``n x n`` matrix, in the order of the
+    svec representation (``r[k] >= c[k]``, column major).
+    """
+    c, r = np.triu_indices(n)
+    return r, c
+
+
+def _svec_index_inverse(k):
+    """
+    returns the arrays ``(r, c)`` such that ``k == c*(c+1)//2 + r`` and
+    ``0 <= r <= c``, for an array ``k`` of svec indices.
+    """
+    k = np.asarray(k, dtype=int)
+    c = (np.sqrt(1 + 8 * k) - 1).astype(int) // 2
+    # correct the rounding errors of the floating point square root
+    c += (c + 1) * (c + 2) // 2 <= k
+    c -= c * (c + 1) // 2 > k
+    return k - c * (c + 1) // 2, c
+
+
+def _sv_typecode(V):
+    return 'z' if np.iscomplexobj(V) else 'd'
+
+
+def _symmetric_columns(I, J, V, n):
+    """
+    returns True if all the ``n x n`` matrices stored (column major) in the
+    columns of the sparse matrix with triplets ``(I, J, V)`` are symmetric,
+    up to 1e-6. The triplets must be sorted by column, then by row, as
+    in a cvxopt spmatrix.
+    """
+    if len(V) == 0:
+        return True
+    # the value of mat[j,i] is found by a binary search of its key
+    nn = n * n
+    keys = J * nn + I
+    tkeys = J * nn + (I % n) * n + I // n
+    pos = np.minimum(np.searchsorted(keys, tkeys), len(keys) - 1)
+    Vt = np.where(keys[pos] == tkeys, V[pos], 0)
+    return not np.any(abs(Vt - V) > 1e-6)
+
+
 def svec(mat, ignore_sym=False):
     """
     returns the svec representation of the cvx matrix ``mat``.
@@ -1348,52 +1569,125 @@ def svec(mat, ignore_sym=False):
     if s0 != mat.size[1]:
         raise ValueError('mat must be square')
 
-    I = []
-    J = []
-    V = []
-    for (i, j, v) in zip((mat.I), (mat.J), (mat.V)):
-        if not ignore_sym:
-            if abs(mat[j, i] - v) > 1e-6:
-                raise ValueError('mat must be symmetric')
-        if i <= j:
-            isvec = j * (j + 1) // 2 + i
-            J.append(0)
-            I.append(isvec)
-            if i == j:
-                V.append(v)
-            else:
-                V.append(np.sqrt(2) * v)
+    i = np.asarray(mat.I, dtype=int).ravel()
+    j = np.asarray(mat.J, dtype=int).ravel()
+    V = np.asarray(mat.V).ravel()
+    if not ignore_sym and not _symmetric_columns(i + s0 * j, 0, V, s0):
+        raise ValueError('mat must be symmetric')
+    keep = i <= j
+    i, j, V = i[keep], j[keep], V[keep]
+    V = np.where(i == j, V, np.sqrt(2) * V)
+    # cvxopt inserts the triplets of a column one by one (quadratic time),
+    # so the svec is built as a row and transposed
+    return cvx.spmatrix(V, np.zeros_like(i), j * (j + 1) // 2 + i,
+                        (1, s0 * (s0 + 1) // 2), _sv_typecode(V)).T
+
+
+def _svec_stack(mats, ignore_sym=False):
+    """
+    batched version of :func:`svec() <picos.tools.svec>`: returns the
+    sparse matrix whose kth column is ``svec(mats[k], ignore_sym)``, where
+    ``mats`` is a list of square matrices of the same size.
+    """
+    mats = [m if isinstance(m, cvx.spmatrix) else cvx.sparse(m)
+            for m in mats]
+    if not mats:
+        raise ValueError('mats must be a nonempty list of matrices')
+    n = mats[0].size[0]
+    for m in mats:
+        if m.size != (n, n):
+            raise ValueError('mats must be square matrices of the same size')
+    # column k of M is the (column major) vectorization of mats[k]
+    M = cvx.sparse([[m[:]] for m in mats])
+    if not ignore_sym and not _symmetric_columns(
+            np.asarray(M.I, dtype=int).ravel(),
+            np.asarray(M.J, dtype=int).ravel(), np.asarray(M.V).ravel(), n):
+        raise ValueError('mat must be symmetric')
+    return _svec_columns(M, n, drop_zeros=False).T
+
+
+def _svec_columns(M, n, drop_zeros=True):
+    """
+    returns the sparse matrix whose kth row is ``svec(mat(M[:,k]),ignore_sym=True).T``,
+    where ``mat(M[:,k])`` is the ``n x n`` matrix stored (column major) in the
+    kth column of ``M``. All columns are processed at once, with array operations
+    on the triplets ``(I,J,V)`` of ``M``, and no column is densified.
+    """
+    if not isinstance(M, cvx.spmatrix):
+        M = cvx.sparse(M)
+    I = np.asarray(M.I).ravel()
+    J = np.asarray(M.J).ravel()
+    V = np.asarray(M.V).ravel()
+    i = I % n
+    j = I // n
+    keep = (i <= j) & (V != 0) if drop_zeros else (i <= j)
+    i, j, J, V = i[keep], j[keep], J[keep], V[keep]
+    V = np.where(i == j, V, np.sqrt(2) * V)
+    return cvx.spmatrix(V, J, j * (j + 1) // 2 + i,
+                        (M.size[1], n * (n + 1) // 2), M.typecode)
+
+
+def _svecm1_triplets(I, V, triu):
+    """
+    maps the svec indices ``I`` and values ``V`` of a vector to the
+    ``(row, column, value)`` triplets of the corresponding symmetric matrix
+    (or upper triangular matrix, if ``triu`` is True).
+    """
+    r, c = _svec_index_inverse(I)
+    off = r != c
+    V = np.where(off, V / np.sqrt(2), V)
+    if triu:
+        return r, c, V
+    return (np.concatenate((r, c[off])), np.concatenate((c, r[off])),
+            np.concatenate((V, V[off])))
+
 
-    return cvx.spmatrix(V, I, J, (s0 * (s0 + 1) // 2, 1))
+def _svec_dimension(v):
+    n = int(np.sqrt(1 + 8 * v) - 1) // 2
+    if n * (n + 1) // 2 != v:
+        raise ValueError('vec should be of dimension n(n+1)/2')
+    return n
 
 
 def svecm1(vec, triu=False):
+    """
+    inverse of :func:`svec() <picos.tools.svec>`: returns the symmetric
+    ``n x n`` sparse matrix whose svec representation is the vector ``vec``
+    of size ``n(n+1)/2``. If ``triu`` is True, only the upper triangle
+    of the matrix is returned.
+    """
     if vec.size[1] > 1:
         raise ValueError('should be a column vector')
-    v = vec.size[0]
-    n = int(np.sqrt(1 + 8 * v) - 1) // 2
-    if n * (n + 1) // 2 != v:
-        raise ValueError('vec should be of dimension n(n+1)/2')
+    n = _svec_dimension(vec.size[0])
     if not isinstance(vec, cvx.spmatrix):
         vec = cvx.sparse(vec)
-    I = []
-    J = []
-    V = []
-    for i, v in zip(vec.I, vec.V):
-        c = int(np.sqrt(1 + 8 * i) - 1) // 2
-        r = i - c * (c + 1) // 2
-        I.append(r)
-        J.append(c)
-        if r == c:
-            V.append(v)
-        else:
-            if triu:
-                V.append(v / np.sqrt(2))
-            else:
-                I.append(c)
-                J.append(r)
-                V.extend([v / np.sqrt(2)] * 2)
-    return cvx.spmatrix(V, I, J, (n, n))
+    I = np.asarray(vec.I, dtype=int).ravel()
+    V = np.asarray(vec.V).ravel()
+    r, c, V = _svecm1_triplets(I, V, triu)
+    return cvx.spmatrix(V, r, c, (n, n), _sv_typecode(V))
+
+
+def _svecm1_columns(M, triu=False):
+    """
+    batched version of :func:`svecm1() <picos.tools.svecm1>`: returns the
+    ``(n**2 x K)`` sparse matrix whose kth column is the (column major)
+    vectorization of ``svecm1(M[:,k],triu)``, where ``M`` has
+    ``n(n+1)/2`` rows and ``K`` columns.
+    """
+    if not isinstance(M, cvx.spmatrix):
+        M = cvx.sparse(M)
+    n = _svec_dimension(M.size[0])
+    I = np.asarray(M.I, dtype=int).ravel()
+    J = np.asarray(M.J, dtype=int).ravel()
+    V = np.asarray(M.V).ravel()
+    if not triu:
+        off = _svec_index_inverse(I)
+        off = off[0] != off[1]
+        J = np.concatenate((J, J[off]))
+    r, c, V = _svecm1_triplets(I, V, triu)
+    # built transposed, as in svec()
+    return cvx.spmatrix(V, J, r + n * c, (M.size[1], n * n),
+                        _sv_typecode(V)).T
 
 
 def ltrim1(vec, uptri=True):
@@ -1406,42 +1700,25 @@ def ltrim1(vec, uptri=True):
         raise ValueError('should be a column vector')
     from .expression import AffinExp
     v = vec.size[0]
-    n = int(np.sqrt(1 + 8 * v) - 1) // 2
-    if n * (n + 1) // 2 != v:
-        raise ValueError('vec should be of dimension n(n+1)/2')
+    n = _svec_dimension(v)
+    r, c = _svec_tril_indices(n)
     if isinstance(vec, cvx.matrix) or isinstance(vec, cvx.spmatrix):
         if not isinstance(vec, cvx.matrix):
             vec = cvx.matrix(vec)
-        M = cvx.matrix(0., (n, n))
-        r = 0
-        c = 0
-        for v in vec:
-            if r == n:
-                c += 1
-                r = c
-            M[r, c] = v
-            if r > c and uptri:
-                M[c, r] = v
-            r += 1
-
-        return M
+        vals = np.asarray(vec).ravel()
+        M = np.zeros((n, n), dtype=vals.dtype)
+        M[r, c] = vals
+        if uptri:
+            M[c, r] = vals
+        return cvx.matrix(M, tc=vec.typecode)
     elif isinstance(vec, AffinExp):
-        I, J, V = [], [], []
-        r = 0
-        c = 0
-        for i in range(v):
-            if r == n:
-                c += 1
-                r = c
-            I.append(r + n * c)
-            J.append(i)
-            V.append(1)
-            if r > c and uptri:
-                I.append(c + n * r)
-                J.append(i)
-                V.append(1)
-            r += 1
-        H = cvx.spmatrix(V, I, J, (n**2, v))
+        k = np.arange(v)
+        I, J = r + n * c, k
+        if uptri:
+            low = r > c
+            I = np.concatenate((I, c[low] + n * r[low]))
+            J = np.concatenate((J, k[low]))
+        H = cvx.spmatrix(np.ones(len(I)), I, J, (n**2, v))
         Hvec = H * vec
         newfacs = Hvec.factors
         newcons = Hvec.constant
@@ -1552,37 +1829,26 @@ def _svecm1_identity(vtype, size):
         s0 = size[0]
         if size[1] != s0:
             raise ValueError('should be square')
-        I = range(s0 * s0)
-        J = []
-        V = []
-        for i in I:
-            rc = (i % s0, i // s0)
-            (r, c) = (min(rc), max(rc))
-            j = c * (c + 1) // 2 + r
-            J.append(j)
-            if r == c:
-                V.append(1)
-            else:
-                V.append(1 / np.sqrt(2))
-        idmat = cvx.spmatrix(V, I, J, (s0 * s0, s0 * (s0 + 1) // 2))
+        I = np.arange(s0 * s0)
+        r, c = I % s0, I // s0
+        (r, c) = (np.minimum(r, c), np.maximum(r, c))
+        V = np.where(r == c, 1., 1 / np.sqrt(2))
+        idmat = cvx.spmatrix(V, I, c * (c + 1) // 2 + r,
+                             (s0 * s0, s0 * (s0 + 1) // 2))
     elif vtype == 'antisym':
         s0 = size[0]
         if size[1] != s0:
             raise ValueError('should be square')
-        I = []
-        J = []
-        V = []
-        k = 0
-        for j in range(1, s0):
-            for i in range(j):
-                I.append(s0 * j + i)
-                J.append(k)
-                V.append(1)
-                I.append(s0 * i + j)
-                J.append(k)
-                V.append(-1)
-                k += 1
-        idmat = cvx.spmatrix(V, I, J, (s0 * s0, s0 * (s0 - 1) // 2))
+        # the kth column corresponds to the kth element (i,j) of the strict
+        # upper triangle, taken column by column
+        i, j = np.triu_indices(s0, 1)
+        order = np.lexsort((i, j))
+        i, j = i[order], j[order]
+        k = np.arange(len(i))
+        idmat = cvx.spmatrix(
+            np.concatenate((np.ones(len(k)), -np.ones(len(k)))),
+            np.concatenate((s0 * j + i, s0 * i + j)),
+            np.concatenate((k, k)), (s0 * s0, s0 * (s0 - 1) // 2))
     else:
         sp = size[0] * size[1]
         idmat = cvx.spmatrix([1] * sp, range(sp), range(sp), (sp, sp))
@@ -1634,7 +1900,8 @@ def new_param(name, value):
                 or isinstance(x, complex) for x in value]):
             # list with numeric data
             term, termString = _retrieve_matrix(value, None)
-            return AffinExp({}, constant=term[:], size=term.size, string=name)
+            return AffinExp({}, constant=_vec(term), size=term.size,
+                            string=name)
         elif (all([isinstance(x, list) for x in value]) and
               all([len(x) == len(value[0]) for x in value]) and
               all([isinstance(xi, int) or isinstance(xi, float) for x in value for xi in x])
@@ -1642,7 +1909,8 @@ def new_param(name, value):
             # list of numeric lists of the same length
             sz = len(value), len(value[0])
             term, termString = _retrieve_matrix(value, sz)
-            return AffinExp({}, constant=term[:], size=term.size, string=name)
+            return AffinExp({}, constant=_vec(term), size=term.size,
+                            string=name)
         else:
             L = []
             for i, l in enumerate(value):
@@ -1662,7 +1930,8 @@ def new_param(name, value):
         return D
     else:
         term, termString = _retrieve_matrix(value, None)
-        return AffinExp({}, constant=term[:], size=term.size, string=name)
+        return AffinExp({}, constant=_vec(term), size=term.size,
+                        string=name)
 
 
 def available_solvers():
@@ -1774,6 +2043,85 @@ def import_cbf(filename):
     return (P, x, X, data)
 
 
+def import_mps(filename, fixed=False):
+    """
+    Imports the data from a MPS file, and creates a :class:`Problem` object.
+    The file is read line by line, in free MPS format, or in fixed MPS format
+    if ``fixed=True`` (in which case the names may contain spaces).
+
+    The columns of the file are gathered in (at most) three vector variables
+    ``x_cont``, ``x_int`` and ``x_bin``, for the continuous, integer and
+    binary columns (an integer column with bounds ``[0,1]`` is binary), and
+    the rows are gathered in (at most) three vector constraints, for the
+    equalities, the ``<`` inequalities and the ``>`` inequalities
+    (a ranged row appears in the last two). As in MPS, the default bounds of a
+    column are ``[0, +inf]``, also for the integer columns; a negative upper
+    bound ``UP`` on a column whose lower bound is ``0`` sets its lower bound
+    to ``-inf``. The semicontinuous bounds ``SC`` are not supported.
+
+    This function returns a tuple ``(P,x,data)``, where:
+
+     * ``P`` is the imported picos :class:`Problem` object.
+     * ``x`` is a dictionary ``{vtype: Variable}`` of the variables of ``P``.
+     * ``data`` is a dictionary containing the picos parameters used to define
+       the problem: ``data['c'][vtype]`` (objective), ``data['A'][sense,vtype]``
+       and ``data['b'][sense]``, where ``sense`` is ``'='``, ``'<'`` or ``'>'``,
+       together with the names of the columns (``data['columns'][vtype]``)
+       and of the rows (``data['rows'][sense]``) of the file.
+    """
+    from .problem import Problem
+    P = Problem()
+    x, data = P._read_mps(filename, fixed)
+    return (P, x, data)
+
+
+def _mps_fields(line, fixed=False):
+    """
+    returns the list of the fields of a data line of a MPS file
+    (the fields of the fixed format are in the columns 2-3, 5-12, 15-22,
+    25-36, 40-47 and 50-61).
+    """
+    if not fixed:
+        return line.split()
+    line = line.rstrip('\r\n')
+    fields = [line[1:3], line[4:12], line[14:22], line[24:36], line[39:47],
+              line[49:61]]
+    fields = [fld.strip() for fld in fields]
+    while fields and not fields[-1]:
+        fields.pop()
+    return fields
+
+
+def _mps_number(v, fixed=False):
+    """
+    formats the number ``v`` for a MPS file (on at most 12 characters in
+    fixed format)
+    """
+    if not fixed:
+        return repr(float(v))
+    for prec in range(12, 0, -1):
+        s = '%.*g' % (prec, v)
+        if len(s) <= 12:
+            return s
+    raise ValueError('cannot write {0} on 12 characters'.format(v))
+
+
+def _mps_line(fields, fixed=False):
+    """returns a data line of a MPS file, with the fields ``fields``"""
+    if not fixed:
+        return ' ' + ' '.join(fields) + '\n'
+    widths = (2, 8, 8, 12, 8, 12)
+    seps = (' ', ' ', '  ', '  ', '   ', '  ')
+    s = ''
+    for fld, w, sep in zip(fields, widths, seps):
+        if len(fld) > w:
+            raise ValueError(
+                'the field {0} is too long for the fixed MPS format'.format(
+                    fld))
+        s += sep + fld.ljust(w)
+    return s.rstrip() + '\n'
+
+
 def _flatten(l):
     """ flatten a (recursive) list of list """
     for el in l:
@@ -1797,6 +2145,14 @@ def _remove_in_lil(lil, elem):
         lil.remove([])
 
 
+# factors V (with V.T*V=Q) computed by _quad2norm, indexed by the
+# triplets of the (symmetrized) quadratic matrix Q
+_quad2norm_cache = {}
+# symbolic cholmod factorizations, indexed by the sparsity pattern of Q
+_symbolic_cache = {}
+_quad2norm_cache_maxsize = 512
+
+
 def _quad2norm(qd):
     """
     transform the list of bilinear terms qd
@@ -1821,45 +2177,132 @@ def _quad2norm(qd):
         offsets[v] = ofs
         ofs += v.size[0] * v.size[1]
 
-    # construct quadratic matrix
-    Q = cvx.spmatrix([], [], [], (ofs, ofs))
+    # construct quadratic matrix (all terms at once, duplicates are summed)
     I, J, V = [], [], []
     for (xi, xj), Qij in six.iteritems(qd):
-        oi = offsets[xi]
-        oj = offsets[xj]
-        Qtmp = cvx.spmatrix(Qij.V, Qij.I + oi, Qij.J + oj, (ofs, ofs))
-        Q += 0.5 * (Qtmp + Qtmp.T)
-    # cholesky factorization V.T*V=Q
-    # remove zero rows and cols
-    nz = set(Q.I)
-    P = cvx.spmatrix(1., range(len(nz)), list(nz), (len(nz), ofs))
-    Qp = P * Q * P.T
-    try:
-        import cvxopt.cholmod
-        F = cvxopt.cholmod.symbolic(Qp)
-        cvxopt.cholmod.numeric(Qp, F)
-        Z = cvxopt.cholmod.spsolve(F, Qp, 7)
-        V = cvxopt.cholmod.spsolve(F, Z, 4)
-        V = V * P
-    except ArithmeticError:  # Singular or Non-convex, we must work on the dense matrix
-        import cvxopt.lapack
-        sig = cvx.matrix(0., (len(nz), 1), tc='z')
-        U = cvx.matrix(0., (len(nz), len(nz)))
-        cvxopt.lapack.gees(cvx.matrix(Qp), sig, U)
-        sig = sig.real()
-        if min(sig) < -1e-7:
-            raise NonConvexError('I cannot convert non-convex quads to socp')
-        for i in range(len(sig)):
-            sig[i] = max(sig[i], 0)
-        V = cvx.spdiag(sig**0.5) * U.T
-        V = cvx.sparse(V) * P
+        Qij = cvx.sparse(Qij)
+        I.append(np.asarray(Qij.I).ravel() + offsets[xi])
+        J.append(np.asarray(Qij.J).ravel() + offsets[xj])
+        V.append(np.asarray(Qij.V).ravel())
+    I = np.concatenate(I)
+    J = np.concatenate(J)
+    V = 0.5 * np.concatenate(V)
+    Q = cvx.spmatrix(np.concatenate([V, V]), np.concatenate([I, J]),
+                     np.concatenate([J, I]), (ofs, ofs))
+    Q = _drop_zeros(Q)
+
+    key = (ofs, np.asarray(Q.I).tobytes(), np.asarray(Q.J).tobytes(),
+           np.asarray(Q.V).tobytes())
+    V = _quad2norm_cache.get(key)
+    if V is None:
+        # cholesky factorization V.T*V=Q
+        # remove zero rows and cols
+        nz = sorted(set(Q.I))
+        P = cvx.spmatrix(1., range(len(nz)), nz, (len(nz), ofs))
+        Qp = P * Q * P.T
+        try:
+            V = _sparse_sqrt_factor(Qp) * P
+        except ArithmeticError:  # Non-convex, or too ill-conditioned
+            import cvxopt.lapack
+            sig = cvx.matrix(0., (len(nz), 1), tc='z')
+            U = cvx.matrix(0., (len(nz), len(nz)))
+            cvxopt.lapack.gees(cvx.matrix(Qp), sig, U)
+            sig = sig.real()
+            if min(sig) < -1e-7:
+                raise NonConvexError('I cannot convert non-convex quads to socp')
+            for i in range(len(sig)):
+                sig[i] = max(sig[i], 0)
+            V = cvx.spdiag(sig**0.5) * U.T
+            V = cvx.sparse(V) * P
+        if len(_quad2norm_cache) >= _quad2norm_cache_maxsize:
+            _quad2norm_cache.clear()
+        _quad2norm_cache[key] = V
     allvars = qdvars[0]
     for v in qdvars[1:]:
         if v.size[1] == 1:
             allvars = allvars // v
         else:
             allvars = allvars // v[:]
-    return abs(V * allvars)**2
+    # the quadratic part of ||V*x||**2 is x.T*Q*x, i.e. qd itself, so we
+    # build the QuadExp directly rather than expanding abs(V*x)**2
+    from .expression import AffinExp, QuadExp
+    Vx = V * allvars
+    zero = AffinExp({}, constant=None, size=(1, 1), string='0')
+    return QuadExp(dict(qd), zero, '||' + Vx.affstring() + '||**2',
+                   LR=(Vx, None))
+
+
+def _sparse_sqrt_factor(Q):
+    """
+    returns a sparse matrix V such that V.T*V = Q, for a positive
+    semidefinite sparse matrix Q without zero rows.
+    The symbolic factorizations of cholmod are reused for matrices
+    with the same sparsity pattern.
+
+    If Q is singular, the rows T of Q which are independent are found with a
+    factorization of the regularized matrix Q + delta*I, and V is computed as
+    L**(-1)*Q[T,:], with L the cholesky factor of Q[T,T]. An ``ArithmeticError``
+    is raised if Q is not positive semidefinite.
+    """
+    import cvxopt.cholmod
+    n = Q.size[0]
+    key = (n, np.asarray(Q.I).tobytes(), np.asarray(Q.J).tobytes())
+    F = _symbolic_cache.get(key)
+    if F is None:
+        F = cvxopt.cholmod.symbolic(Q)
+        if len(_symbolic_cache) >= _quad2norm_cache_maxsize:
+            _symbolic_cache.clear()
+        _symbolic_cache[key] = F
+    try:
+        cvxopt.cholmod.numeric(Q, F)
+    except ArithmeticError:
+        # the factor is now incomplete, the next numeric() call is safer
+        # with a new symbolic factorization
+        del _symbolic_cache[key]
+    else:
+        Z = cvxopt.cholmod.spsolve(F, Q, 7)
+        return cvxopt.cholmod.spsolve(F, Z, 4)
+
+    # The pivots of the cholesky factorization of Q + delta*I are
+    # proportional to delta for the rows which depend on the previous ones,
+    # so these rows are found by comparing the pivots for two values of delta.
+    dmax = max(abs(Q[k, k]) for k in range(n))
+    pivots = []
+    for delta in (1e-8 * dmax, 1e-10 * dmax):
+        Qd = Q + cvx.spdiag(cvx.matrix(delta, (n, 1)))
+        Fd = cvxopt.cholmod.symbolic(Qd)
+        cvxopt.cholmod.numeric(Qd, Fd)  # ArithmeticError if Q is not PSD
+        # P*Qd*P.T = L*L.T; the ordering p of the diagonal of L is
+        # retrieved by applying P to [0,...,n-1]
+        p = cvx.matrix([float(k) for k in range(n)])
+        cvxopt.cholmod.solve(Fd, p, sys=7)
+        p = np.asarray(p).ravel().round().astype(int)
+        d = np.zeros(n)
+        d[p] = np.asarray(cvxopt.cholmod.diag(Fd)).ravel()**2
+        pivots.append(d)
+    ratio = pivots[0] / pivots[1]
+    T = np.flatnonzero(ratio < 10)
+    # (nearly) dependent rows which were not detected are removed one by one,
+    # starting from the largest ratios
+    T = T[np.argsort(ratio[T])].tolist()
+    for attempt in range(20):
+        QT = Q[sorted(T), :]
+        QTT = QT[:, sorted(T)]
+        FT = cvxopt.cholmod.symbolic(QTT)
+        try:
+            cvxopt.cholmod.numeric(QTT, FT)
+            break
+        except ArithmeticError:
+            T.pop()
+    else:
+        raise ArithmeticError('could not find the rank of Q')
+    Z = cvxopt.cholmod.spsolve(FT, QT, 7)
+    V = cvxopt.cholmod.spsolve(FT, Z, 4)
+    # the remaining Schur complement must vanish
+    R = Q - V.T * V
+    if len(R.V) > 0 and max(abs(R.V)) > 1e-7 * dmax:
+        raise ArithmeticError('Q is not positive semidefinite')
+    return V
 
 
 def _copy_dictexp_to_new_vars(dct, cvars, complex=None):
@@ -1895,13 +2338,9 @@ def _copy_dictexp_to_new_vars(dct, cvars, complex=None):
                             [], [], [],
                             (vr.size[0], cvars[var.name + '_IM_utri'].size[0]))
 
-                vv = []
-                for i in range(vr.size[0]):
-                    v = vr[i, :]
-                    AA = cvx.matrix(v, (n, n))
-                    AA = (AA + AA.T) * 0.5  # symmetrize
-                    vv.append(svec(AA).T)
-                D[cvars[var.name + '_RE']] = cvx.sparse(vv)
+                # row-wise svec of the symmetric part
+                idsym = _svecm1_identity('symmetric', (n, n))
+                D[cvars[var.name + '_RE']] = _drop_zeros(cvx.sparse(vr) * idsym)
                 if complex:
                     # compute the imaginary part and append it.
                     if value.typecode == 'z':
@@ -1911,14 +2350,7 @@ def _copy_dictexp_to_new_vars(dct, cvars, complex=None):
                         Him = copy.copy(value)
                         vi = cvx.spmatrix([], [], [], Him.size)
 
-                    n = int(vi.size[1]**(0.5))
-                    vv = []
-                    for i in range(vi.size[0]):
-                        v = vi[i, :]
-                        BB = cvx.matrix(v, (n, n))
-                        BB = (BB + BB.T) * 0.5  # symmetrize
-                        vv.append(svec(BB).T)
-                    Hre = cvx.sparse(vv)
+                    Hre = _drop_zeros(cvx.sparse(vi) * idsym)
 
                     D[cvars[var.name + '_RE']
                       ] = cvx.sparse([D[cvars[var.name + '_RE']], Hre])
@@ -1989,7 +2421,7 @@ def _copy_exp_to_new_vars(exp, cvars, complex=None):
             return QuadExp(newqds, newaff, exp.string, (LR0, LR1))
     elif isinstance(exp, GeneralFun):
         newexp = _copy_exp_to_new_vars(exp.Exp, cvars, complex=complex)
-        return LogSumExp(exp.fun, newexp, exp.funstring)
+        return GeneralFun(exp.fun, newexp, exp.funstring)
     elif isinstance(exp, GeoMeanExp):
         newexp = _copy_exp_to_new_vars(exp.exp, cvars, complex=complex)
         return GeoMeanExp(newexp)
@@ -2043,34 +2475,302 @@ def _cplx_vecmat_to_real_vecmat(M, sym=True, times_i=False):
         raise NameError('first dimension must be a perfect square')
     m = int(m)
 
-    vv = []
     if sym:
         nn = M.size[1]
         n = nn**0.5
         if int(n) != n:
             raise NameError('2d dimension must be a perfect square')
         n = int(n)
+        # the column k=svec_index(i,j) is (M[:,n*i+j]+M[:,n*j+i])/sqrt(2)
+        M = cvx.sparse(M) * _svecm1_identity('symmetric', (n, n))
+    elif not isinstance(M, cvx.base.spmatrix):
+        M = cvx.sparse(M)
+
+    # each entry A[a,b]+iB[a,b] of a column is sent to the entries
+    # (a,b) and (a+m,b+m) (real part), (a+m,b) and (a,b+m) (imaginary part)
+    # of the vectorized 2m x 2m matrix [A,-B;B,A]
+    I = np.asarray(M.I).ravel()
+    J = np.asarray(M.J).ravel()
+    V = np.asarray(M.V).ravel()
+    a = I % m
+    b = I // m
+    x = V.real
+    y = V.imag if M.typecode == 'z' else np.zeros_like(x)
+    II = np.concatenate([a + 2 * m * b, (a + m) + 2 * m * (b + m),
+                         (a + m) + 2 * m * b, a + 2 * m * (b + m)])
+    JJ = np.concatenate([J, J, J, J])
+    VV = np.concatenate([x, x, y, -y])
+    nz = VV != 0
+    return cvx.spmatrix(VV[nz], II[nz], JJ[nz], (4 * mm, M.size[1]))
+
+
+def _drop_zeros(M):
+    """returns a copy of the sparse matrix ``M`` without its explicit zeros"""
+    V = np.asarray(M.V).ravel()
+    nz = np.flatnonzero(V)
+    if len(nz) == len(V):
+        return M
+    I = np.asarray(M.I).ravel()
+    J = np.asarray(M.J).ravel()
+    return cvx.spmatrix(V[nz], I[nz], J[nz], M.size, M.typecode)
+
+
+#: maximal number of triplets inserted in a column by cvxopt
+#: (cf. :func:`_triplets_to_spmatrix`)
+_COLUMN_PIECE = 64
+
+
+def _triplets_to_spmatrix(V, I, J, size, tc='d'):
+    """
+    returns the sparse matrix of size ``size`` with triplets ``(I, J, V)``
+    (duplicates are summed). cvxopt inserts the triplets of a column in
+    quadratic time, so the long columns (more than ``_COLUMN_PIECE``
+    triplets) are cut in pieces of at most ``_COLUMN_PIECE`` triplets,
+    which are the columns of a matrix ``S``, and the pieces of a column are
+    summed by the product ``S * E``, where ``E[k, j] = 1`` if the piece ``k``
+    belongs to the column ``j``.
+    """
+    I = np.asarray(I, dtype=int)
+    J = np.asarray(J, dtype=int)
+    if not len(I):
+        return cvx.spmatrix([], [], [], size, tc)
+    V = np.asarray(V, dtype=complex if tc == 'z' else float)
+    long = np.bincount(J)[J] > _COLUMN_PIECE
+    if not long.any():
+        return cvx.spmatrix(V, I, J, size, tc)
+    order = np.flatnonzero(long)
+    order = order[np.argsort(J[order], kind='mergesort')]
+    Jl = J[order]
+    # position of a triplet in its column, and index of its piece
+    pos = np.arange(len(Jl)) - np.searchsorted(Jl, Jl)
+    first = (pos % _COLUMN_PIECE) == 0
+    piece = np.cumsum(first) - 1
+    npieces = int(piece[-1]) + 1
+    S = cvx.spmatrix(V[order], I[order], piece, (size[0], npieces), tc)
+    E = cvx.spmatrix(1., np.arange(npieces), Jl[first], (npieces, size[1]),
+                     tc)
+    M = S * E
+    if long.all():
+        return M
+    short = ~long
+    return cvx.spmatrix(V[short], I[short], J[short], size, tc) + M
 
-        for k in range(n * (n + 1) // 2):
-            j = int(np.sqrt(1 + 8 * k) - 1) // 2
-            i = k - j * (j + 1) // 2
-            if i == j:
-                v = M[:, n * i + i]
-            else:
-                i1 = n * i + j
-                i2 = n * j + i
-                v = (M[:, i1] + M[:, i2]) * (1. / (2**0.5))
-            vvv = _cplx_mat_to_real_mat(cvx.matrix(v, (m, m)))[:]
-            vv.append([vvv])
 
+def _affexp_arrays(exp):
+    """
+    returns the affine expression ``exp`` in a form that can be shipped to
+    another process: a tuple ``(n1, facs, h)``, where ``n1`` is the number of
+    elements of ``exp``, ``facs`` is a list of tuples ``(si, I, J, V)`` of
+    arrays (the triplets of the factor of a variable starting at the
+    index ``si`` of the vector of all variables), and ``h`` is the array of
+    the constant term (or ``None`` if there is no constant term).
+    """
+    n1 = exp.size[0] * exp.size[1]
+    facs = []
+    for var, fac in six.iteritems(exp.factors):
+        if not isinstance(fac, cvx.spmatrix):
+            fac = cvx.sparse(fac)
+        facs.append((var.startIndex, np.asarray(fac.I).ravel(),
+                     np.asarray(fac.J).ravel(), np.asarray(fac.V).ravel()))
+    if exp.constant is None:
+        h = None
     else:
-        for i in range(M.size[1]):
-            v = M[:, i]
-            A = cvx.matrix(v, (m, m))
-            vvv = _cplx_mat_to_real_mat(A)[:]  # TODO 0.5*(A+A.H) instead ?
-            vv.append([vvv])
+        h = np.asarray(cvx.matrix(exp.constant, tc='d')).ravel()
+    return n1, facs, h
 
-    return cvx.sparse(vv)
+
+def _canonical_block(segments):
+    """
+    computes a block ``(G, h)`` of rows of the canonical form of a
+    constraint, for the cvxopt instance. ``segments`` is a list of lists of
+    pairs ``(coef, exp)``, where ``exp`` is given by :func:`_affexp_arrays`.
+    The segments are stacked vertically, and the rows of a segment
+    are ``G = sum(coef * G_exp)`` and ``h = -sum(coef * h_exp)``.
+    Returns the triplets of ``G`` and the array ``h``.
+    """
+    Is, Js, Vs, hs = [], [], [], []
+    row = 0
+    for seg in segments:
+        h = np.zeros(seg[0][1][0])
+        for coef, (n1, facs, cst) in seg:
+            for (si, I, J, V) in facs:
+                Is.append(I + row if row else I)
+                Js.append(J + si if si else J)
+                Vs.append(coef * V if coef != 1 else V)
+            if cst is not None:
+                h -= coef * cst
+        hs.append(h)
+        row += len(h)
+    if not Is:
+        return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0), np.concatenate(hs))
+    return (np.concatenate(Is), np.concatenate(Js), np.concatenate(Vs),
+            np.concatenate(hs))
+
+
+#: constraints of the problem whose cvxopt instance is computed, shared with
+#: the worker processes (cf. :func:`_canonical_rows`)
+_canonical_constraints = []
+
+
+def _set_canonical_constraints(constraints):
+    """sets the list of constraints used by :func:`_canonical_rows` (this is
+    the initializer of the worker processes)"""
+    global _canonical_constraints
+    _canonical_constraints = constraints
+
+
+def _canonical_rows(task):
+    """
+    computes the rows of the canonical form of a constraint, for the cvxopt
+    instance. ``task`` is a tuple ``(k, dest, segments, ncols)``, where ``k``
+    is the index of the constraint in the list given to
+    :func:`_set_canonical_constraints`, ``dest`` is the destination of the
+    rows (``'A'``, ``'Gl'``, ``'Gq'``, ``'Gqs'``, ``'Gs'``, ``'lse'`` or
+    ``'quad'``), ``segments`` is a list of lists of pairs ``(coef, name)``
+    as in :func:`_canonical_block`, where ``name`` is the attribute of the
+    constraint holding the expression (``'aff'`` is the affine part of
+    ``Exp1``), and ``ncols`` is the number of columns of the instance.
+
+    The expressions are converted to arrays (cf. :func:`_affexp_arrays`) and
+    the blocks of ``Gq``, ``Gs`` and ``F`` are assembled here, so that this work
+    is done by the worker processes when the option
+    ``canonicalization_processes`` is not ``1``.
+    Returns the triplets and the array ``(I, J, V, h)`` of the rows of ``A``
+    and ``Gl``, which are stacked at once by the caller, and a tuple
+    ``(G, h, dims)`` of cvxopt matrices otherwise.
+    """
+    k, dest, segments, ncols = task
+    cons = _canonical_constraints[k]
+    segs = []
+    for seg in segments:
+        segs.append([(coef, _affexp_arrays(cons.Exp1.aff if name == 'aff'
+                                           else getattr(cons, name)))
+                     for coef, name in seg])
+    if not segs:
+        return None
+    I, J, V, h = _canonical_block(segs)
+    if dest in ('A', 'Gl', 'quad'):
+        return I, J, V, h
+    if dest == 'Gqs':
+        I, J, V, h, dims = _cone_block_rows(
+            (I, J, V, h), cons.coneSizes,
+            cons.typeOfConstraint == 'RScones')
+        dims = dims.tolist()
+    else:
+        dims = [len(h)]
+    return (_triplets_to_spmatrix(V, I, J, (len(h), ncols)), cvx.matrix(h),
+            dims)
+
+
+def _cone_block_rows(block, coneSizes, rotated):
+    """
+    reorders the canonical rows ``block = (I, J, V, h)`` of a block of cones
+    (cf. :func:`_canonical_block`), so that the rows of each cone are
+    contiguous. The rows of ``block`` are the segments of a single cone
+    (the heads ``Exp2`` (+ ``Exp3``) of the cones, the stacked lhs ``Exp1``
+    of the cones, and the rows ``Exp2 - Exp3`` of the rotated cones), and
+    ``coneSizes`` is the array of the sizes of the lhs of the cones.
+    Returns the reordered ``(I, J, V, h)`` and the array of the number of rows
+    of each cone.
+    """
+    I, J, V, h = block
+    ncones = len(coneSizes)
+    nlhs = int(np.sum(coneSizes))
+    starts = np.cumsum(coneSizes) - coneSizes
+    lhscone = np.repeat(np.arange(ncones), coneSizes)
+    # cone and local index of each row of the block
+    cone = np.concatenate([np.arange(ncones), lhscone])
+    local = np.concatenate([np.zeros(ncones, dtype=int),
+                            np.arange(nlhs) - starts[lhscone] + 1])
+    dims = np.asarray(coneSizes, dtype=int) + 1
+    if rotated:
+        cone = np.concatenate([cone, np.arange(ncones)])
+        local = np.concatenate([local, dims])
+        dims = dims + 1
+    newrow = (np.cumsum(dims) - dims)[cone] + local
+    hs = np.zeros(len(h))
+    hs[newrow] = h
+    return newrow[I], J, V, hs, dims
+
+
+def _split_rows(G, h, dims):
+    """
+    splits the rows of the sparse matrix ``G`` and of the vector ``h`` in
+    blocks of ``dims[k]`` rows, and returns the lists of the blocks.
+    """
+    G = cvx.sparse(G)
+    I = np.asarray(G.I).ravel()
+    J = np.asarray(G.J).ravel()
+    V = np.asarray(G.V).ravel()
+    order = np.argsort(I, kind='mergesort')
+    I, J, V = I[order], J[order], V[order]
+    ends = np.cumsum(dims)
+    starts = ends - dims
+    bounds = np.searchsorted(I, np.concatenate([starts, ends[-1:]]))
+    Gs, hs = [], []
+    for k in range(len(dims)):
+        k0, k1 = bounds[k], bounds[k + 1]
+        Gs.append(_triplets_to_spmatrix(V[k0:k1], I[k0:k1] - starts[k],
+                                        J[k0:k1], (int(dims[k]), G.size[1])))
+        hs.append(cvx.matrix(h[int(starts[k]):int(ends[k])]))
+    return Gs, hs
+
+
+def _shift_into_cone(s, dims, mu):
+    """adds ``t*e`` to ``s`` (in place), where ``e`` is the identity element of
+    the cone ``dims``, so that ``s`` is at distance at least ``mu`` from its
+    boundary"""
+    k = dims['l']
+    if k > 0:
+        s[:k] = cvx.matrix(np.maximum(np.asarray(s[:k]).ravel(), mu))
+    for m in dims['q']:
+        nrm = np.linalg.norm(np.asarray(s[k + 1:k + m]))
+        if s[k] < nrm + mu:
+            s[k] = nrm + mu
+        k += m
+    for m in dims['s']:
+        S = np.asarray(cvx.matrix(s[k:k + m * m], (m, m)))
+        lmin = np.linalg.eigvalsh(0.5 * (S + S.T))[0]
+        if lmin < mu:
+            s[k:k + m * m:m + 1] += mu - lmin
+        k += m * m
+
+
+def _parallel_map(func, args, processes=1, pool=None, initializer=None,
+                  initargs=()):
+    """
+    returns ``[func(a) for a in args]``, computed in a pool of ``processes``
+    worker processes (all the cores of the machine if ``processes`` is ``None``
+    or ``0``), or in the current process if ``processes == 1``.
+    ``func`` must be a module-level function, and ``args`` must be picklable.
+    If a ``multiprocessing.Pool`` is given, it is used (and left open) instead
+    of a new pool. Otherwise, ``initializer(*initargs)`` is called in each
+    worker (or in the current process) before ``func``; on posix systems
+    the workers are forked, so ``initargs`` are shared rather than pickled.
+    """
+    if processes is None or processes == 0:
+        import multiprocessing
+        processes = multiprocessing.cpu_count()
+    if processes == 1 or len(args) < 2:
+        if pool is None and initializer is not None:
+            initializer(*initargs)
+        return [func(a) for a in args]
+    if pool is not None:
+        return pool.map(func, args,
+                        chunksize=max(1, len(args) // (4 * processes)))
+    import multiprocessing
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        ctx = multiprocessing
+    pool = ctx.Pool(processes, initializer, initargs)
+    try:
+        return pool.map(func, args,
+                        chunksize=max(1, len(args) // (4 * processes)))
+    finally:
+        pool.close()
+        pool.join()
 
 
 def _is_idty(mat, vtype='continuous'):
@@ -2090,105 +2790,614 @@ def _is_idty(mat, vtype='continuous'):
     return False
 
 
+def _chordal_cliques(n, I, J):
+    """
+    computes a chordal extension of the sparsity pattern of the
+    symmetric ``n x n`` matrix with nonzero entries ``(I[k],J[k])``
+    (the diagonal is always part of the pattern), by a symbolic
+    Cholesky factorization in the approximate minimum degree order.
+
+    Returns ``(cliques, parents)``, where ``cliques`` is the list of the
+    maximal cliques of the extension (each clique is a sorted list of
+    indices), in a topological order of a clique tree, and ``parents[k]`` is
+    the index of the parent of the kth clique in the tree (``None`` for a root).
+    The intersection of a clique with the union of the previous cliques
+    is contained in its parent.
+    """
+    from cvxopt import amd
+    I = np.asarray(I, dtype=int).ravel()
+    J = np.asarray(J, dtype=int).ravel()
+    off = I != J
+    lo = np.maximum(I[off], J[off])
+    up = np.minimum(I[off], J[off])
+    A = cvx.spmatrix(1., np.concatenate([lo, np.arange(n)]).tolist(),
+                     np.concatenate([up, np.arange(n)]).tolist(), (n, n))
+    order = list(amd.order(A))
+    pos = [0] * n
+    for k, v in enumerate(order):
+        pos[v] = k
+
+    # higher[v]: neighbours of v eliminated after v, in the filled graph
+    higher = [set() for v in range(n)]
+    for (i, j) in zip(lo.tolist(), up.tolist()):
+        if pos[i] < pos[j]:
+            higher[i].add(j)
+        else:
+            higher[j].add(i)
+    parent = [None] * n
+    children = [[] for v in range(n)]
+    for v in order:
+        if higher[v]:
+            p = min(higher[v], key=lambda w: pos[w])
+            parent[v] = p
+            children[p].append(v)
+            higher[p].update(higher[v])
+            higher[p].discard(p)
+
+    # {v}+higher[v] is a maximal clique, unless it is contained in the
+    # clique of a child; rep[v] is the maximal clique containing it.
+    rep = [None] * n
+    for v in order:
+        rep[v] = v
+        for u in children[v]:
+            if len(higher[u]) == len(higher[v]) + 1:
+                rep[v] = rep[u]
+                break
+    tree = {}
+    roots = []
+    for v in order:
+        if rep[v] != v:
+            continue
+        q = parent[v]
+        while q is not None and rep[q] == v:
+            q = parent[q]
+        if q is None:
+            roots.append(v)
+        else:
+            tree.setdefault(rep[q], []).append(v)
+
+    cliques = []
+    parents = []
+    stack = [(v, None) for v in roots[::-1]]
+    while stack:
+        v, p = stack.pop()
+        cliques.append(sorted([v] + list(higher[v])))
+        parents.append(p)
+        k = len(cliques) - 1
+        stack.extend((u, k) for u in tree.get(v, [])[::-1])
+    return cliques, parents
+
+
+def _psd_completion(X, cliques):
+    """
+    returns the maximum determinant positive semidefinite completion of the
+    partial symmetric matrix ``X`` (numpy array), whose specified entries are
+    the blocks ``X[C,C]`` for the cliques ``C`` of ``cliques``, given in the
+    order returned by :func:`_chordal_cliques`.
+    The other entries of ``X`` are ignored.
+    """
+    X = np.array(X, dtype=float)
+    n = X.shape[0]
+    Y = np.zeros((n, n))
+    seen = np.zeros(n, dtype=bool)
+    for C in cliques:
+        C = np.asarray(C)
+        S = C[seen[C]]
+        R = C[~seen[C]]
+        U = np.flatnonzero(seen)
+        U = U[~np.in1d(U, S)]
+        Y[np.ix_(C, C)] = X[np.ix_(C, C)]
+        if len(S) > 0 and len(U) > 0 and len(R) > 0:
+            # X[U,R] = X[U,S] * X[S,S]^+ * X[S,R]
+            W = np.linalg.pinv(Y[np.ix_(S, S)]).dot(Y[np.ix_(S, R)])
+            Y[np.ix_(U, R)] = Y[np.ix_(U, S)].dot(W)
+            Y[np.ix_(R, U)] = Y[np.ix_(U, R)].T
+        seen[R] = True
+    return Y
+
+
+def _sdpa_numbers(f, count):
+    """
+    reads the next ``count`` numbers of the header of a .dat-s file,
+    skipping the comments, the separators ``,(){}``, and the text which
+    follows the numbers on a line (such as ``= number of vars``).
+    """
+    numbers = []
+    while len(numbers) < count:
+        line = f.readline()
+        if not line:
+            raise Exception('unexpected end of file in the header of the '
+                            'SDPA file')
+        if line[0] in '"*':
+            continue
+        for sep in ',(){}':
+            line = line.replace(sep, ' ')
+        for tok in line.split():
+            try:
+                numbers.append(float(tok))
+            except ValueError:
+                break
+    return numbers[:count]
+
+
+def _sdpa_arrow(I, J, V, M, sz, head):
+    """
+    tests whether a block of a .dat-s file has the arrow pattern
+    ``[t, x'; x, u*I]``, with the head ``t`` in position ``head`` (0 or sz-1).
+    ``(M,I,J,V)`` are the coalesced entries of the upper triangle of the
+    block, sorted by matrix.
+    Returns ``None`` if the block is not an arrow, and ``(T,U)`` otherwise,
+    where the row ``0`` of the sparse matrix ``T`` (of size ``sz x (m+1)``)
+    contains ``t`` and its other rows contain ``x``, and ``U`` is the
+    dense vector of the coefficients of ``u`` (in both, the column ``k``
+    corresponds to the matrix ``F_k`` of the file).
+    """
+    offdiag = I != J
+    other = J[offdiag] if head == 0 else I[offdiag]
+    if not np.all((I[offdiag] == head) | (J[offdiag] == head)):
+        return None
+    diag = ~offdiag & (I != head)
+    Md, Vd = M[diag], V[diag]
+    if not len(Md):
+        # u=0: degenerate arrow, kept as an LMI
+        return None
+    # for each matrix, the entries of the diagonal of u*I are all equal
+    starts = np.flatnonzero(np.r_[True, Md[1:] != Md[:-1]])
+    counts = np.diff(np.r_[starts, len(Md)])
+    if (np.any(counts != sz - 1) or
+            np.any(Vd != np.repeat(Vd[starts], counts))):
+        return None
+    m = M.max() + 1 if len(M) else 1
+    U = np.zeros(m)
+    U[Md[starts]] = Vd[starts]
+    hd = ~offdiag & (I == head)
+    rows = np.r_[np.zeros(hd.sum(), dtype=int),
+                 other + (1 if head == sz - 1 else 0)]
+    T = (np.r_[M[hd], M[offdiag]], rows, np.r_[V[hd], V[offdiag]])
+    return T, U
+
+
 def _read_sdpa(filename):
-    """TODO, remove dependence; currently relies on smcp sdpa_read
-    cone constraints ||x||<t are recognized if they have the arrow form [t,x';x,t*I]>>0
     """
-    f = open(filename, 'r')
-    import smcp
+    Imports the data from a file in the sparse SDPA format (``.dat-s``),
+    and returns a :class:`Problem` object.
+
+    The file is parsed natively (smcp is not required): the entries are read
+    by chunks of lines and stored as coordinate lists, and the problem
+    ``min c'x s.t. sum_i x_i F_i - F_0 >> 0`` is rebuilt block by block,
+    without densifying the matrices:
+
+     * the diagonal blocks (and the blocks of size 1) give linear inequalities;
+       pairs of opposite inequalities are merged into equalities;
+     * the blocks with the arrow pattern ``[t, x'; x, t*I]`` (or
+       ``[t*I, x; x', t]``) give second order cone constraints
+       ``||x|| < t``, and the arrow blocks ``[t, x'; x, u*I]`` give rotated
+       cone constraints ``||x||**2 < t*u``;
+     * the other blocks give LMI constraints.
+    """
     from .problem import Problem
-    A, bb, blockstruct = smcp.misc.sdpa_read(f)
-
-    # make list of tuples (size,star,end) for each block
-    blocks = []
-    ix = 0
-    for b in blockstruct:
-        blocks.append((b, ix, ix + b))
-        ix += b
+    from .expression import AffinExp
+    import itertools
+    f = open(filename, 'r')
+    m = int(_sdpa_numbers(f, 1)[0])
+    nblocks = int(_sdpa_numbers(f, 1)[0])
+    blockstruct = [int(b) for b in _sdpa_numbers(f, nblocks)]
+    c = _sdpa_numbers(f, m)
+
+    # entries (matno, blockno, i, j, value)
+    chunks = []
+    while True:
+        lines = list(itertools.islice(f, 100000))
+        if not lines:
+            break
+        data = np.array(' '.join(
+            [l for l in lines if l.strip() and l[0] not in '"*']).split(),
+            dtype=float)
+        if len(data) % 5:
+            f.close()
+            raise Exception(filename + ' is not a valid .dat-s file')
+        chunks.append(data.reshape(-1, 5))
+    f.close()
+    data = np.concatenate(chunks) if chunks else np.zeros((0, 5))
+    Mat = data[:, 0].astype(int)
+    Blk = data[:, 1].astype(int) - 1
+    I = data[:, 2].astype(int) - 1
+    J = data[:, 3].astype(int) - 1
+    V = data[:, 4]
+    # upper triangle
+    I, J = np.minimum(I, J), np.maximum(I, J)
+    order = np.argsort(Blk, kind='mergesort')
+    bounds = np.searchsorted(Blk[order], np.arange(nblocks + 1))
 
     P = Problem()
-    nn = A.size[1] - 1
-    x = P.add_variable('x', nn)
-
-    # linear (in)equalities
-    Aineq = []
-    bineq = []
-    Aeq = []
-    beq = []
-    mm = int((A.size[0])**0.5)
-    oldv = None
-    for (_, i, _) in [(sz, start, end)
-                      for (sz, start, end) in blocks if sz == 1]:
-        ix = i * (mm + 1)
-        v = A[ix, :]
-        if (oldv is not None) and np.linalg.norm((v + oldv).V) < 1e-7:
-            Aineq.pop()
-            bineq.pop()
-            Aeq.append(v[1:].T)
-            beq.append(v[0])
-        else:
-            Aineq.append(v[1:].T)
-            bineq.append(v[0])
-        oldv = v
-    Aeq = cvx.sparse(Aeq)
-    Aineq = cvx.sparse(Aineq)
-    if Aeq:
-        P.add_constraint(Aeq * x == beq)
-    if Aineq:
-        P.add_constraint(Aineq * x > bineq)
-
-    # sdp and soc constraints
-    for (sz, start, end) in [(sz, start, end)
-                             for (sz, start, end) in blocks if sz > 1]:
-        MM = [cvx.sparse(cvx.matrix(A[:, i], (mm, mm)))[
-            start:end, start:end] for i in range(nn + 1)]
-
-        # test whether it is an arrow pattern
-        isarrow = True
-        issoc = True
-        isrsoc = True
-        for M in MM:
-            for i, j in zip(M.I, M.J):
-                if i > j and j > 0:
-                    isarrow = False
-                    break
-            isrsoc = isrsoc and isarrow and all(
-                [M[i, i] == M[1, 1] for i in range(2, sz)])
-            issoc = issoc and isrsoc and (M[1, 1] == M[0, 0])
-            if not(isrsoc):
+    x = P.add_variable('x', m)
+
+    # linear blocks
+    lin = []
+    nlin = 0
+    for b, sz in enumerate(blockstruct):
+        if sz < 0 or sz == 1:
+            sel = order[bounds[b]:bounds[b + 1]]
+            if np.any(I[sel] != J[sel]):
+                raise Exception('non diagonal entry in the diagonal '
+                                'block {0}'.format(b + 1))
+            lin.append((I[sel] + nlin, Mat[sel], V[sel]))
+            nlin += abs(sz)
+    if nlin:
+        rows, mats, vals = [np.concatenate(t) for t in zip(*lin)]
+        # rows of L: [F_0[k,k], F_1[k,k], ..., F_m[k,k]]
+        L = _triplets_to_spmatrix(vals, mats, rows, (m + 1, nlin))
+        colptr, Lrows, Lvals = L.CCS
+        Lrows = np.array(Lrows)
+        Lvals = np.array(Lvals).ravel()
+        # merges the pairs of opposite inequalities
+        unpaired = {}
+        eq = []
+        ineq = np.zeros(nlin, dtype=bool)
+        for k in range(nlin):
+            r = Lrows[colptr[k]:colptr[k + 1]]
+            v = Lvals[colptr[k]:colptr[k + 1]]
+            nz = v != 0
+            r, v = r[nz], v[nz]
+            if not len(v):
+                continue
+            sgn = 1 if v[0] > 0 else -1
+            key = (r.tobytes(), (sgn * v).tobytes())
+            other = unpaired.get(key)
+            if other is not None and other[1] == -sgn:
+                del unpaired[key]
+                ineq[other[0]] = False
+                eq.append(other[0])
+            else:
+                unpaired[key] = (k, sgn)
+                ineq[k] = True
+        ineq = [int(k) for k in np.flatnonzero(ineq)]
+        for rowset, sense in ((eq, '='), (ineq, '>')):
+            if not rowset:
+                continue
+            sub = L[:, rowset].T
+            A = new_param('A' + sense, sub[:, 1:])
+            b = new_param('b' + sense, cvx.matrix(sub[:, 0]))
+            if sense == '=':
+                P.add_constraint(A * x == b)
+            else:
+                P.add_constraint(A * x > b)
+
+    # cone and sdp blocks
+    for b, sz in enumerate(blockstruct):
+        if sz <= 1:
+            continue
+        sel = order[bounds[b]:bounds[b + 1]]
+        # coalesces the duplicate entries, and sorts them by matrix
+        keys, inv = np.unique((Mat[sel] * sz + I[sel]) * sz + J[sel],
+                              return_inverse=True)
+        vals = np.bincount(inv.ravel(), weights=V[sel])
+        keys, vals = keys[vals != 0], vals[vals != 0]
+        if not len(vals):
+            continue
+        bM, rem = np.divmod(keys, sz * sz)
+        bI, bJ = np.divmod(rem, sz)
+        arrow = None
+        for head in (0, sz - 1):
+            arrow = _sdpa_arrow(bI, bJ, vals, bM, sz, head)
+            if arrow is not None:
                 break
-
-        if issoc or isrsoc:
-            Acone = cvx.sparse([M[:, 0].T for M in MM[1:]]).T
-            bcone = MM[0][:, 0]
-            if issoc:
-                P.add_constraint(
-                    abs(Acone[1:, :] * x - bcone[1:]) < Acone[0, :] * x - bcone[0])
+        if arrow is not None:
+            (tM, tR, tV), U = arrow
+            T = _triplets_to_spmatrix(tV, tR, tM, (sz, m + 1))
+            U = np.r_[U, np.zeros(m + 1 - len(U))]
+            e = new_param('F' + str(b + 1), T[:, 1:]) * x - T[:, 0]
+            if np.all(U == np.array(cvx.matrix(T[0, :])).ravel()):
+                P.add_constraint(abs(e[1:]) < e[0])
             else:
-                arcone = cvx.sparse([M[1, 1] for M in MM[1:]]).T
-                brcone = MM[0][1, 1]
-                P.add_constraint(abs(Acone[1:, :] *
-                                     x -
-                                     bcone[1:])**2 < (Acone[0, :] *
-                                                      x -
-                                                      bcone[0]) *
-                                 (arcone *
-                                  x -
-                                  brcone))
-
+                u = new_param('u' + str(b + 1), cvx.matrix(U[1:]).T) * x
+                if U[0]:
+                    u = u - U[0]
+                P.add_constraint(abs(e[1:])**2 < e[0] * u)
         else:
-            CCj = MM[0] + MM[0].T - \
-                cvx.spdiag([MM[0][i, i] for i in range(sz)])
-            MMj = [M + M.T - cvx.spdiag([M[i, i]
-                                         for i in range(sz)]) for M in MM[1:]]
-            P.add_constraint(sum([x[i] * MMj[i]
-                                  for i in range(nn) if MMj[i]], 'i') >> CCj)
+            # vectorization of the full symmetric matrices
+            up = bI != bJ
+            rows = np.r_[bI + bJ * sz, (bJ + bI * sz)[up]]
+            cols = np.r_[bM, bM[up]]
+            vv = np.r_[vals, vals[up]]
+            F = _triplets_to_spmatrix(vv, rows, cols, (sz * sz, m + 1))
+            lmi = AffinExp({x: F[:, 1:]}, constant=-F[:, 0], size=(sz, sz),
+                           string='LMI' + str(b + 1) + '(x)')
+            P.add_constraint(lmi >> 0)
 
     # objective
-    P.set_objective('min', bb.T * x)
+    P.set_objective('min', new_param('c', cvx.matrix(c)) | x)
     return P
 
 
+def _geomean_tree(m):
+    """
+    returns the levels of the binary tree of rotated cones used to reformulate
+    ``t <= geomean(x)``, for a vector ``x`` of length ``m>1``.
+    The operands are numbered ``0,...,m-1`` for the entries of ``x``,
+    ``m,...,m+nu-1`` for the auxiliary variables ``u``, and ``-1`` for ``t``.
+    At each level, consecutive operands are paired (the last operand is
+    paired with ``t`` if their number is odd), and each pair ``(a,b)`` gives
+    a cone ``c**2 <= a*b``, where ``c`` is a new auxiliary variable (or ``t``
+    for the root).
+
+    Returns a tuple ``(levels,nu)``, where ``levels`` is a list of arrays
+    ``(c,a,b)``, and ``nu`` is the number of auxiliary variables.
+    """
+    levels = []
+    cur = np.arange(m)
+    nxt = m
+    while len(cur) > 1:
+        if len(cur) % 2:
+            cur = np.append(cur, -1)
+        a, b = cur[0::2], cur[1::2]
+        if len(a) == 1:
+            c = np.array([-1])
+        else:
+            c = np.arange(nxt, nxt + len(a))
+            nxt += len(a)
+        levels.append((c, a, b))
+        cur = c
+    return levels, nxt - m
+
+
+_power_cone_cache = {}
+_power_cone_budget = 1000
+
+
+def _dyadic_splits(w):
+    """
+    returns the list of unordered pairs ``(w1,w2)`` of nonnegative integer
+    vectors such that ``w1+w2 == w`` and ``sum(w1) == sum(w2)``.
+    """
+    n = len(w)
+    half = builtins.sum(w) // 2
+    caps = [builtins.sum(w[i + 1:]) for i in range(n)]
+    splits = []
+
+    def fill(i, rest, cur):
+        if i == n - 1:
+            if rest <= w[i]:
+                w1 = tuple(cur + [rest])
+                w2 = tuple(wi - w1i for wi, w1i in zip(w, w1))
+                if w1 <= w2:
+                    splits.append((w1, w2))
+            return
+        for k in range(max(0, rest - caps[i]), min(w[i], rest) + 1):
+            fill(i + 1, rest - k, cur + [k])
+
+    fill(0, half, [])
+    return splits
+
+
+def _power_cone_tree(weights):
+    """
+    returns a decomposition with a minimal number of rotated cones of the
+    inequality ``t <= prod_i x_i**(w_i/sum(w))`` (for nonnegative ``x_i``),
+    where ``weights`` is the tuple of nonnegative integers ``w_i``.
+
+    The weights are reduced by their gcd and padded with a weight on ``t``,
+    so that they sum to a power of two ``2**k``. A node of the decomposition
+    is a vector of weights summing to ``2**j``, which is split into two nodes
+    of sum ``2**(j-1)`` by a cone ``c**2 <= a*b`` (the root is ``t``, and the
+    unit vectors are the operands). Identical (or proportional) nodes are
+    shared, and the splits are found by a branch and bound search, starting
+    from a greedy decomposition which splits off an operand whenever possible
+    (the search is stopped after ``_power_cone_budget`` nodes, which only
+    happens for large denominators). The decompositions are cached by weights.
+
+    The operands are numbered as in :func:`_geomean_tree`: ``0,...,n-1`` for
+    the ``x_i``, ``n,...,n+nu-1`` for the auxiliary variables, and ``-1``
+    for ``t``. Returns a tuple ``(cones,nu)``, where ``cones`` is a tuple of
+    arrays ``(c,a,b)`` with one entry per cone.
+    """
+    weights = tuple(int(wi) for wi in weights)
+    if weights in _power_cone_cache:
+        return _power_cone_cache[weights]
+
+    n = len(weights)
+
+    def is_leaf(w):
+        return builtins.sum(1 for wi in w if wi) <= 1
+
+    def reduced(w):
+        # w and 2*w define the same node
+        while not is_leaf(w) and all(wi % 2 == 0 for wi in w):
+            w = tuple(wi // 2 for wi in w)
+        return w
+
+    def pick(nodes):
+        return max(nodes, key=lambda w: (builtins.sum(w), w))
+
+    def children(nodes, w, split):
+        return (nodes - frozenset([w])) | frozenset(
+            reduced(c) for c in split if not is_leaf(c))
+
+    def lower_bound(nodes):
+        # every node needs a cone, and the operand of lowest weight 2**r
+        # in a node of sum 2**j is below at least j-r levels of cones
+        count = {}
+        levels = set()
+        for w in nodes:
+            j = builtins.sum(w).bit_length() - 1
+            count[j] = count.get(j, 0) + 1
+            r = min((wi & -wi).bit_length() - 1 for wi in w if wi)
+            levels.update(range(r + 1, j + 1))
+        levels.update(count)
+        return builtins.sum(max(count.get(j, 0), 1) for j in levels)
+
+    def greedy_split(w):
+        half = builtins.sum(w) // 2
+        w1 = [0] * len(w)
+        big = [i for i, wi in enumerate(w) if wi >= half]
+        if big:
+            w1[big[0]] = half
+        else:
+            rest = half
+            for i in sorted(range(len(w)), key=lambda i: -w[i]):
+                w1[i] = min(w[i], rest)
+                rest -= w1[i]
+        w1 = tuple(w1)
+        return (w1, tuple(wi - w1i for wi, w1i in zip(w, w1)))
+
+    g = int(np.gcd.reduce(np.array([wi for wi in weights if wi] or [1])))
+    root = [wi // g for wi in weights]
+    total = builtins.sum(root)
+    size = 1
+    while size < total:
+        size *= 2
+    root = reduced(tuple(root + [size - total]))  # the last operand is t
+
+    start = frozenset([] if is_leaf(root) else [root])
+    best = []
+    nodes = start
+    while nodes:
+        w = pick(nodes)
+        split = greedy_split(w)
+        best.append((w, split))
+        nodes = children(nodes, w, split)
+
+    visited = {}
+    plan = []
+
+    def search(nodes):
+        if not nodes:
+            if len(plan) < len(best):
+                best[:] = plan
+            return
+        if (len(plan) + lower_bound(nodes) >= len(best)
+                or len(visited) > _power_cone_budget
+                or visited.get(nodes, len(plan) + 1) <= len(plan)):
+            return
+        visited[nodes] = len(plan)
+        w = pick(nodes)
+        splits = [(lower_bound(children(nodes, w, s)), s)
+                  for s in _dyadic_splits(w)]
+        for lb, split in sorted(splits):
+            plan.append((w, split))
+            search(children(nodes, w, split))
+            plan.pop()
+
+    search(start)
+
+    # numbering of the nodes (the root and the padding operand are t)
+    ids = {root: -1}
+
+    def node_id(w):
+        w = reduced(w)
+        if is_leaf(w):
+            i = [j for j, wj in enumerate(w) if wj][0]
+            return i if i < n else -1
+        if w not in ids:
+            ids[w] = n + len(ids) - 1
+        return ids[w]
+
+    cones = tuple(np.array(x, dtype=int) for x in zip(*[
+        (node_id(w), node_id(w1), node_id(w2))
+        for (w, (w1, w2)) in best])) or tuple(
+        np.zeros(0, dtype=int) for k in range(3))
+    nu = len(ids) - 1
+    _power_cone_cache[weights] = (cones, nu)
+    return cones, nu
+
+
+def _block_diagonal_blocks(exp):
+    """
+    returns the list of the arrays of indices of the diagonal blocks of the
+    square affine expression ``exp``, that is, the connected components of the
+    graph of the sparsity pattern of ``exp`` (union of the patterns of its
+    factors and of its constant term). The blocks are sorted by smallest index.
+    """
+    n = exp.size[0]
+    pos = [np.asarray(cvx.sparse(fac).I).ravel()
+           for fac in exp.factors.values()]
+    if exp.constant is not None:
+        pos.append(np.flatnonzero(np.asarray(cvx.matrix(exp.constant))))
+    pos = np.unique(np.concatenate(pos + [np.arange(n) * (n + 1)]))
+    I, J = pos % n, pos // n
+    # propagation of the smallest label, with pointer jumping
+    label = np.arange(n)
+    while True:
+        new = label.copy()
+        lab = np.minimum(label[I], label[J])
+        np.minimum.at(new, I, lab)
+        np.minimum.at(new, J, lab)
+        new = new[new]
+        if (new == label).all():
+            break
+        label = new
+    order = np.argsort(label, kind='mergesort')
+    cuts = np.flatnonzero(np.diff(label[order])) + 1
+    return np.split(order, cuts)
+
+
+def _principal_submatrix(exp, idx, string):
+    """
+    returns the affine expression ``exp[idx,idx]`` (with the string
+    ``string``), for a square affine expression ``exp`` and an array of
+    indices ``idx``, by selecting the rows of the factors and of the
+    constant term.
+    """
+    from .expression import AffinExp
+    n = exp.size[0]
+    b = len(idx)
+    rows = np.add.outer(np.asarray(idx) * n, idx).ravel().tolist()
+    factors = dict((x, fac[rows, :]) for x, fac in six.iteritems(exp.factors))
+    cst = None
+    if exp.constant is not None:
+        cst = cvx.matrix(exp.constant)[rows]
+    return AffinExp(factors, constant=cst, size=(b, b), string=string)
+
+
+def _stacked_scalars(exps, name):
+    """
+    returns the column vector (:class:`AffinExp`) stacking the scalar affine
+    expressions or numbers of the list ``exps``. The factors of the stacked
+    vector are built from the triplets of the factors of the ``exps``, so that
+    the cost is linear in the number of nonzero coefficients.
+    """
+    from .expression import AffinExp
+    n = len(exps)
+    triplets = {}
+    constant = []
+    for k, e in enumerate(exps):
+        if not isinstance(e, AffinExp):
+            constant.append((k, float(e)))
+            continue
+        if e.size != (1, 1):
+            raise ValueError('the expression {0} is not scalar'.format(e))
+        for x, fac in six.iteritems(e.factors):
+            if not isinstance(fac, cvx.base.spmatrix):
+                fac = cvx.sparse(fac)
+            I, J, V, width = triplets.setdefault(x, ([], [], [], fac.size[1]))
+            I.extend([k] * len(fac))
+            J.extend(fac.J)
+            V.extend(fac.V)
+        if e.constant is not None:
+            constant.append((k, e.constant[0]))
+    factors = {}
+    for x, (I, J, V, width) in six.iteritems(triplets):
+        factors[x] = _triplets_to_spmatrix(V, I, J, (n, width))
+    cst = None
+    if constant:
+        cst = cvx.matrix(0., (n, 1))
+        for k, v in constant:
+            cst[k] += v
+    return AffinExp(factors, constant=cst, size=(n, 1), string=name)
+
+
+def _sparse_times(M, exp, string):
+    """
+    returns the affine expression ``M*exp``, for a (large) sparse matrix ``M``
+    and a column vector ``exp``, without creating a parameter for ``M``
+    """
+    from .expression import AffinExp
+    factors = dict((x, M * fac) for x, fac in six.iteritems(exp.factors))
+    cst = None if exp.constant is None else M * cvx.matrix(exp.constant)
+    return AffinExp(factors, constant=cst, size=(M.size[0], 1),
+                    string=string)
+
+
 def flow_Constraint(
         G,
         f,
@@ -2202,7 +3411,8 @@ def flow_Constraint(
 
             ``G`` a directed graph (class DiGraph of `networkx <http://networkx.lanl.gov/index.html>`_)
 
-            ``f`` must be a dictionary of variables indexed by the edges of ``G``
+            ``f`` must be a dictionary of variables indexed by the edges of ``G``, or
+            an affine expression of size ``(|E|,1)`` (the flows on the edges, in the order of ``G.edges()``)
 
             ``source`` can be eiter a node of ``G``, or a list of nodes in case of a multisource-single sink flow
 
@@ -2217,66 +3427,64 @@ def flow_Constraint(
 
             ``graphName`` is a string used in the string representation of the constraint.
 
-
+    The flow conservation is expressed with the node-arc incidence matrix of ``G``, which is
+    applied to the stacked vector of the edge flows. In the case of multiple sources and multiple sinks,
+    the flow is decomposed into one commodity per source (or per sink, if there are fewer sinks), and
+    the conservation of all the commodities is expressed with a single block diagonal matrix.
     """
+    edges = list(G.edges())
+    m = len(edges)
     # checking that we have the good number of variables
-    if len(f) != len(G.edges()):
-        print('Error: The number of variables does not match with the number of edges.')
-        return False
+    if isinstance(f, dict):
+        if len(f) != m:
+            print('Error: The number of variables does not match with the number of edges.')
+            return False
+        fvec = _stacked_scalars([f[e] for e in edges], 'f')
+    else:
+        if f.size != (m, 1):
+            print('Error: The number of variables does not match with the number of edges.')
+            return False
+        fvec = f
 
-    from .problem import Problem
-    Ptmp = Problem()
+    from .constraint import _Reformulation
+    Ptmp = _Reformulation()
 
     if not capacity is None:
-        # Adding Edge capacities
-        cap = [ed[2][capacity] for ed in G.edges(data=True)]
-
-        c = {}
-        for i, e in enumerate(G.edges()):
-            c[e] = cap[i]
-
-        cc = new_param('c', c)
-
         # Adding the capacity constraint
-        Ptmp.add_list_of_constraints([f[e] < cc[e]
-                                      for e in G.edges()], [('e', 2)], 'edges')
+        cc = new_param('c', cvx.matrix(
+            [float(ed[2][capacity]) for ed in G.edges(data=True)], (m, 1)))
+        Ptmp.add_constraint(fvec < cc)
 
     # nonnegativity of the flows
-    Ptmp.add_list_of_constraints(
-        [f[e] > 0 for e in G.edges()], [('e', 2)], 'edges')
+    Ptmp.add_constraint(fvec > 0)
+
+    nodes = list(G.nodes())
+    index = dict((v, i) for i, v in enumerate(nodes))
+    tails = np.array([index[e[0]] for e in edges], dtype=int)
+    heads = np.array([index[e[1]] for e in edges], dtype=int)
+
+    # each commodity is a list (hub,terminals,values,sign): the flow
+    # conservation holds at every node except the hub, and the terminals
+    # receive sign*value (a source has sign -1, a sink has sign +1).
+    # The conservation at the hub is implied by the other equalities.
+    def _fvstr(v):
+        if hasattr(v, 'string'):
+            return v.string
+        return str(v)
+
+    def _comment(s, t, v):
+        if graphName == '':
+            return "Flow conservation from " + \
+                str(s) + " to " + str(t) + " with value " + _fvstr(v)
+        return "Flow conservation in " + str(graphName) + \
+            " from " + str(s) + " to " + str(t) + " with value " + _fvstr(v)
 
     #
     # One Source, One Sink
     #
     if not isinstance(source, list) and not isinstance(sink, list):
-        # Adding the flow conservation
-        Ptmp.add_list_of_constraints([sum([f[p, i] for p in G.predecessors(i)], 'p', 'pred(i)') == sum(
-            [f[i, j] for j in G.successors(i)], 'j', 'succ(i)') for i in G.nodes() if i != sink and i != source], 'i', 'nodes-(s,t)')
-
-        # Source flow at S
-        Ptmp.add_constraint(sum([f[p,
-                                   source] for p in G.predecessors(source)],
-                                'p',
-                                'pred(s)') + flow_value == sum([f[source,
-                                                                  j] for j in G.successors(source)],
-                                                               'j',
-                                                               'succ(s)'))
-
-        # this constraint was redundant
-        # Sink flow at T
-        #Ptmp.add_constraint(sum([f[p,sink] for p in G.predecessors(sink)],'p','pred(t)') == sum([f[sink,j] for j in G.successors(sink)],'j','succ(t)') + flow_value)
-
-        if hasattr(flow_value, 'string'):
-            fv = flow_value.string
-        else:
-            fv = str(flow_value)
-
-        if graphName == '':
-            comment = "Flow conservation from " + \
-                str(source) + " to " + str(sink) + " with value " + fv
-        else:
-            comment = "Flow conservation in " + \
-                str(graphName) + " from " + str(source) + " to " + str(sink) + " with value " + fv
+        commodities = [(sink, [source], [flow_value], -1)]
+        comment = _comment(source, sink, flow_value)
 
     #
     # One Source, Multiple sink
@@ -2285,38 +3493,10 @@ def flow_Constraint(
         if(len(sink) != len(flow_value)):
             print('Error: The number sink must match with the number of flows values.')
             return False
-
-        # Adding the flow conservation
-        Ptmp.add_list_of_constraints([sum([f[p, i] for p in G.predecessors(i)], 'p', 'pred(i)') == sum(
-            [f[i, j] for j in G.successors(i)], 'j', 'succ(i)') for i in G.nodes() if not i in sink and i != source], 'i', 'nodes-(s,t)')
-
-        # this constraint was redundant
-        # Source flow at S
-        #Ptmp.add_constraint(sum([f[p,source] for p in G.predecessors(source)],'p','pred(s)') + sum([fv for fv in flow_value], 'fv', 'flows') == sum([f[source,j] for j in G.successors(source)],'j','succ('+str(source)+')'))
-
+        commodities = [(source, sink, flow_value, 1)]
         comment = "** One Source, Multiple Sinks **\n"
         for k in range(0, len(sink)):
-
-            # Sink flow at T
-            Ptmp.add_constraint(sum([f[p,
-                                       sink[k]] for p in G.predecessors(sink[k])],
-                                    'p',
-                                    'pred(' + str(sink[k]) + ')') == sum([f[sink[k],
-                                                                            j] for j in G.successors(sink[k])],
-                                                                         'j',
-                                                                         'succ(t)') + flow_value[k])
-
-            if hasattr(flow_value[k], 'string'):
-                fv = flow_value[k].string
-            else:
-                fv = str(flow_value[k])
-
-            if graphName == '':
-                comment = comment + "  Flow conservation from " + \
-                    str(source) + " to " + str(sink[k]) + " with value " + fv + "\n"
-            else:
-                comment = comment + "  Flow conservation in " + \
-                    str(graphName) + " from " + str(source) + " to " + str(sink[k]) + " with value " + fv + "\n"
+            comment += "  " + _comment(source, sink[k], flow_value[k]) + "\n"
 
     #
     # Multiple source, One Sink
@@ -2325,128 +3505,76 @@ def flow_Constraint(
         if(len(source) != len(flow_value)):
             print('Error: The number sink must match with the number of flows values.')
             return False
-
-        # Adding the flow conservation
-        Ptmp.add_list_of_constraints([sum([f[p, i] for p in G.predecessors(i)], 'p', 'pred(i)') == sum(
-            [f[i, j] for j in G.successors(i)], 'j', 'succ(i)') for i in G.nodes() if not i in source and i != sink], 'i', 'nodes-(s,t)')
-
-        # this constraint was redundant
-        # Sink flow at S
-        #Ptmp.add_constraint(sum([f[p,sink] for p in G.predecessors(sink)],'p','pred(s)') + sum([fv for fv in flow_value], 'fv', 'flows') == sum([f[sink,j] for j in G.successors(sink)],'j','succ('+str(sink)+')'))
-        #Ptmp.add_constraint(sum([f[p,sink] for p in G.predecessors(sink)],'p','pred('+str(sink)+')') == sum([f[sink,j] for j in G.successors(sink)],'j','succ(t)') + sum([fv for fv in flow_value], 'fv', 'flows'))
-
+        commodities = [(sink, source, flow_value, -1)]
         comment = "** Multiple Sources, One Sink **\n"
         for k in range(0, len(source)):
-
-            # Source flow at T
-            #Ptmp.add_constraint(sum([f[p,source[k]] for p in G.predecessors(source[k])],'p','pred('+str(source[k])+')') == sum([f[source[k],j] for j in G.successors(source[k])],'j','succ(t)') + flow_value[k])
-            Ptmp.add_constraint(sum([f[p,
-                                       source[k]] for p in G.predecessors(source[k])],
-                                    'p',
-                                    'pred(s)') + flow_value[k] == sum([f[source[k],
-                                                                         j] for j in G.successors(source[k])],
-                                                                      'j',
-                                                                      'succ(' + str(source[k]) + ')'))
-
-            if hasattr(flow_value[k], 'string'):
-                fv = flow_value[k].string
-            else:
-                fv = str(flow_value[k])
-
-            if graphName == '':
-                comment = comment + "  Flow conservation from " + \
-                    str(source[k]) + " to " + str(sink) + " with value " + fv + "\n"
-            else:
-                comment = comment + "  Flow conservation in " + \
-                    str(graphName) + " from " + str(source[k]) + " to " + str(sink) + " with value " + fv + "\n"
+            comment += "  " + _comment(source[k], sink, flow_value[k]) + "\n"
 
     #
     # Multiple source, Multiple Sink
     #
-    elif isinstance(sink, list) and isinstance(source, list):
+    else:
         if(len(source) != len(flow_value)):
             print('Error: The number of sinks must match with the number of flow values.')
             return False
         if(len(sink) != len(source)):
             print('Error: The number of sinks must macht with the number of sources.')
             return False
-        if(len(sink) != len(flow_value)):
-            print('Error: The number of sinks must match with the numver of flow values.')
-            return False
-
-        comment = "** Multiple Sources, Multiple Sinks **\n"
-
-        SS = list(set(source))
-        TT = list(set(sink))
 
+        SS = [s for i, s in enumerate(source) if s not in source[:i]]
+        TT = [t for i, t in enumerate(sink) if t not in sink[:i]]
         if len(SS) <= len(TT):
-
-            ftmp = {}
-            for s in SS:
-                ftmp[s] = {}
-                sinks_from_s = [
-                    t for (
-                        i, t) in enumerate(sink) if source[i] == s]
-                values_from_s = [v for (i, v) in enumerate(
-                    flow_value) if source[i] == s]
-                for e in G.edges():
-                    ftmp[s][e] = Ptmp.add_variable(
-                        'f[{0}][{1}]'.format(s, e), 1)
-                Ptmp.add_constraint(
-                    flow_Constraint(
-                        G,
-                        ftmp[s],
-                        source=s,
-                        sink=sinks_from_s,
-                        flow_value=values_from_s,
-                        graphName='G'))
-
-            Ptmp.add_list_of_constraints([f[e] == sum(
-                [ftmp[s][e] for s in SS], 's', 'sources') for e in G.edges()], 'e', 'E')
-
+            commodities = [(s,
+                            [t for (i, t) in enumerate(sink) if source[i] == s],
+                            [v for (i, v) in enumerate(flow_value)
+                             if source[i] == s],
+                            1) for s in SS]
         else:
-            ftmp = {}
-            for t in TT:
-                ftmp[t] = {}
-                sources_to_t = [
-                    s for (
-                        i, s) in enumerate(source) if sink[i] == t]
-                values_to_t = [v for (i, v) in enumerate(
-                    flow_value) if sink[i] == t]
-                for e in G.edges():
-                    ftmp[t][e] = Ptmp.add_variable(
-                        'f[{0}][{1}]'.format(t, e), 1)
-                Ptmp.add_constraint(
-                    flow_Constraint(
-                        G,
-                        ftmp[t],
-                        source=sources_to_t,
-                        sink=t,
-                        flow_value=values_to_t,
-                        graphName='G'))
-
-            Ptmp.add_list_of_constraints([f[e] == sum(
-                [ftmp[t][e] for t in TT], 't', 'sinks') for e in G.edges()], 'e', 'E')
-
-        # comments
-        for k in range(0, len(source)):
-            if hasattr(flow_value[k], 'string'):
-                fv = flow_value[k].string
-            else:
-                fv = str(flow_value[k])
-            if graphName == '':
-                comment = comment + "  Flow conservation from " + \
-                    str(source[k]) + " to " + str(sink[k]) + " with value " + fv + "\n"
-            else:
-                comment = comment + "  Flow conservation in " + \
-                    str(graphName) + " from " + str(source[k]) + " to " + str(sink[k]) + " with value " + fv + "\n"
+            commodities = [(t,
+                            [s for (i, s) in enumerate(source) if sink[i] == t],
+                            [v for (i, v) in enumerate(flow_value)
+                             if sink[i] == t],
+                            -1) for t in TT]
 
-    #
-    # Handle errors
-    #
+        comment = "** Multiple Sources, Multiple Sinks **\n"
+        for k in range(0, len(source)):
+            comment += "  " + \
+                _comment(source[k], sink[k], flow_value[k]) + "\n"
+
+    # flow conservation: blockdiag(B_1,...,B_K) * [f_1;...;f_K] == D * values,
+    # where B_k is the node-arc incidence matrix (inflow - outflow) without
+    # the row of the hub of the commodity k
+    n = len(nodes)
+    K = len(commodities)
+    BI, BJ, BV = [], [], []
+    DI, DV = [], []
+    values = []
+    for k, (hub, terminals, vals, sign) in enumerate(commodities):
+        h = index[hub]
+        pos = np.arange(n) - (np.arange(n) > h) + k * (n - 1)
+        for ends, v in ((heads, 1.), (tails, -1.)):
+            keep = np.flatnonzero(ends != h)
+            BI.append(pos[ends[keep]])
+            BJ.append(keep + k * m)
+            BV.append(v * np.ones(len(keep)))
+        DI.extend(pos[[index[t] for t in terminals]])
+        DV.extend([float(sign)] * len(terminals))
+        values.extend(vals)
+    Bk = _triplets_to_spmatrix(np.concatenate(BV), np.concatenate(BI),
+                               np.concatenate(BJ), (K * (n - 1), K * m))
+    D = _triplets_to_spmatrix(DV, DI, range(len(values)),
+                              (K * (n - 1), len(values)))
+    Dvk = _sparse_times(D, _stacked_scalars(values, 'v'), 'D*v')
+    if K == 1:
+        Ptmp.add_constraint(_sparse_times(Bk, fvec, 'B*f') == Dvk)
     else:
-        print('Error: unexpected error.')
-        return False
+        # one stacked variable for the flows of all commodities
+        fk = Ptmp.add_variable('f', K * m)
+        Ptmp.add_constraint(_sparse_times(Bk, fk, 'B*f') == Dvk)
+        Ptmp.add_constraint(fk > 0)
+        S = cvx.spmatrix(1., list(range(m)) * K, list(range(K * m)),
+                         (m, K * m))
+        Ptmp.add_constraint(fvec == _sparse_times(S, fk, 'S*f'))
 
     from .constraint import Flow_Constraint
     return Flow_Constraint(G, Ptmp, comment)
@@ -2462,6 +3590,249 @@ def drawGraph(G, capacity='capacity'):
     plt.show()
 
 
+class _SolutionCache(object):
+    """
+    on-disk store of the solutions of solved problems, used by
+    :func:`solve() <picos.Problem.solve>` when the option ``solution_cache``
+    is set. Each solution is pickled in a file ``<key>.pkl`` of the
+    directory ``directory``, where ``key`` is the hash of the canonical form
+    of the problem, of the solver and of the options
+    (cf. :func:`_solution_cache_key() <picos.Problem._solution_cache_key>`).
+    The modification time of a file is its last access time, and the least
+    recently used solutions are deleted when the files take more than
+    ``maxsize`` bytes.
+    """
+
+    def __init__(self, directory, maxsize):
+        import os
+        if directory is True:
+            directory = os.path.join(os.path.expanduser('~'), '.picos',
+                                     'solution_cache')
+        self.directory = directory
+        self.maxsize = maxsize
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _filename(self, key):
+        import os
+        return os.path.join(self.directory, key + '.pkl')
+
+    def load(self, key):
+        """returns the solution stored under ``key``, or ``None``"""
+        import os
+        import pickle
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                record = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return record
+
+    def store(self, key, record):
+        """stores ``record`` under ``key``, and evicts the LRU solutions"""
+        import os
+        import pickle
+        import tempfile
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(record, f, protocol=2)
+            if os.path.exists(self._filename(key)):
+                os.remove(self._filename(key))
+            os.rename(tmpname, self._filename(key))
+        except (IOError, OSError):
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+        self.evict()
+
+    def evict(self):
+        """deletes the least recently used solutions above ``maxsize`` bytes"""
+        import os
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, filename))
+        total = builtins.sum(f[1] for f in files)
+        for (mtime, size, filename) in sorted(files):
+            if total <= self.maxsize:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+
+
+class _IterateWatcher(object):
+    """
+    parses the progress table printed by an interior point solver, and
+    keeps its last row in ``self.last``, as a dictionary
+    ``{'iteration': k, column name: value}``. The text is also
+    written to ``sys.stdout`` if ``echo`` is True.
+    """
+
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.header = None
+        self.last = None
+        self._buffer = ''
+
+    def write(self, text):
+        if self.echo:
+            import sys
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        lines = (self._buffer + text).split('\n')
+        self._buffer = lines.pop()
+        for line in lines:
+            self._parse(line)
+
+    def _parse(self, line):
+        tokens = line.split()
+        if len(tokens) < 2:
+            return
+        try:
+            it = int(tokens[0].rstrip(':'))
+            values = [float(t) for t in tokens[1:]]
+        except ValueError:
+            if not any(t[0].isdigit() for t in tokens):
+                self.header = tokens
+            return
+        if self.header is not None and len(self.header) == len(values):
+            self.last = dict(zip(self.header, values))
+        else:
+            self.last = {'values': values}
+        self.last['iteration'] = it
+
+
+class _PipeWriter(object):
+    """file-like object sending the text written to it through a pipe"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, text):
+        self.conn.send(('out', text))
+
+    def flush(self):
+        pass
+
+
+def _watchdog_child(conn, func, args, kwargs, solver_options):
+    """body of the child process started by :func:`_run_with_watchdog`"""
+    import importlib
+    import sys
+    sys.stdout = _PipeWriter(conn)
+    try:
+        for modname, opts in solver_options:
+            mod = importlib.import_module(modname)
+            mod.options.update(opts)
+            # the progress table gives the last iterate to the parent
+            mod.options['show_progress'] = True
+        result = func(*args, **kwargs)
+    except Exception as ex:
+        conn.send(('error', ex))
+    else:
+        conn.send(('result', result))
+    conn.close()
+
+
+def _run_with_watchdog(func, args, kwargs, timelimit, echo=False,
+                       solver_options=()):
+    """
+    calls ``func(*args, **kwargs)`` in a child process, which is terminated
+    if it runs for more than ``timelimit`` seconds. On posix systems the child
+    is forked, so the arguments (the canonical matrices) are shared with
+    the child rather than pickled. ``solver_options`` is a list of pairs
+    ``(module name, options)``, to update the ``options`` dictionary of
+    the solver modules in the child.
+
+    Returns a tuple ``(finished, result, last_iterate)``, where
+    ``finished`` is False if the time limit was reached, and
+    ``last_iterate`` is the last row of the progress table printed by the
+    solver (cf. :class:`_IterateWatcher`), or ``None``.
+    """
+    import multiprocessing
+    import time
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        ctx = multiprocessing
+    recv_end, send_end = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_watchdog_child,
+                       args=(send_end, func, args, kwargs, solver_options))
+    proc.start()
+    send_end.close()
+    watcher = _IterateWatcher(echo)
+    deadline = time.time() + timelimit
+    finished, result = False, None
+    try:
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not recv_end.poll(remaining):
+                break
+            try:
+                kind, value = recv_end.recv()
+            except EOFError:
+                raise Exception('the solver process terminated unexpectedly')
+            if kind == 'out':
+                watcher.write(value)
+            elif kind == 'result':
+                finished, result = True, value
+                break
+            else:
+                raise value
+    finally:
+        if proc.is_alive():
+            proc.terminate()
+        proc.join()
+        recv_end.close()
+    return finished, result, watcher.last
+
+
+def _popen_with_watchdog(cmd, timelimit, echo=False):
+    """
+    runs the command ``cmd``, which is killed if it runs for more than
+    ``timelimit`` seconds. Returns a tuple ``(finished, last_iterate)``
+    as :func:`_run_with_watchdog`.
+    """
+    import subprocess
+    import threading
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+    watcher = _IterateWatcher(echo)
+
+    def read():
+        for line in iter(proc.stdout.readline, ''):
+            watcher.write(line)
+
+    reader = threading.Thread(target=read)
+    reader.daemon = True
+    reader.start()
+    reader.join(timelimit)
+    finished = not reader.is_alive()
+    if not finished:
+        proc.kill()
+        # the pipe may be held open by a grandchild of the command, so the
+        # (daemon) reader thread is not waited for
+        reader.join(1.)
+    proc.wait()
+    return finished, watcher.last
+
+
 # A Python Library to create a Progress Bar.
 # Copyright (C) 2008  BJ Dierkes <wdierkes@5dollarwhitebox.org>
 #
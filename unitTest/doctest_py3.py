@@ -260,4 +260,481 @@ solstr = """
 
 assert(cleanspace(str(U))==cleanspace(solstr))
 
+#the cached real problem must follow in-place changes of the complex problem
+t = P.add_variable('t',1,lower=0)
+P.set_objective('min', (U | M) + t)
+P.solve(solver=SOLVER,verbose=0)
+obj0 = P.obj_value().real
+t.set_lower(1)
+P.solve(solver=SOLVER,verbose=0)
+assert(abs(P.obj_value().real-obj0-1)<1e-5)
+P.add_constraint(t > 2)
+P.solve(solver=SOLVER,verbose=0)
+assert(abs(P.obj_value().real-obj0-2)<1e-5)
+
+#---------------------#
+#  array of variables #
+#---------------------#
+
+P = pic.Problem()
+y = P.add_variable_array('y',4,2,lower=0)
+P.add_constraint(y.apply([[1,1]]) <= 1)
+P.set_objective('max', pic.sum([(1|y[i]) for i in range(4)],'i'))
+assert(cleanspace(str(P)) == cleanspace(
+    '---------------------\noptimization problem  (LP):\n8 variables, 4 affine constraints\n\ny \t: list of 4 variables, (2, 1), continuous, nonnegative\n\n\tmaximize Σ_i 〈 |1| | y[i] 〉\nsuch that\n  |1|*y[:] < |1|\n---------------------'))
+P.solve(solver=SOLVER,verbose=0)
+assert(abs(P.obj_value()-4)<1e-6)
+assert(abs(sum(y.sum().value)-4)<1e-6)
+
+#-------------------------#
+#  chordal decomposition  #
+#-------------------------#
+
+n = 8
+C = cvx.spmatrix([2.]*n+[-1.]*(n-1), list(range(n))+list(range(1,n)),
+                 list(range(n))+list(range(n-1)), (n,n))
+C = C + C.T
+def tridiag_lmi():
+    P = pic.Problem()
+    x = P.add_variable('x',n)
+    CC = pic.new_param('C',C)
+    Z = P.add_constraint(CC + pic.diag(x) >> 0,ret=True)
+    P.add_constraint((1|x) < 1)
+    P.set_objective('min',pic.sum([(i+1)*x[i] for i in range(n)],'i'))
+    return P,Z
+P,Z = tridiag_lmi()
+P.solve(solver=SOLVER,verbose=0)
+Pd,Zd = tridiag_lmi()
+D = Pd.chordal_decomposition()
+assert(D.numberSDPConstraints == n-1)
+Pd.solve(solver=SOLVER,verbose=0,chordal_decomposition=True)
+assert(abs(P.obj_value()-Pd.obj_value())<1e-5)
+assert(Zd.dual.size == (n,n))
+assert(min(np.linalg.eigvalsh(np.array(Zd.dual))) > -1e-6)
+
+#------------------------------#
+#  parallel canonicalization   #
+#------------------------------#
+
+P,Z = tridiag_lmi()
+P.solve(solver=SOLVER,verbose=0,canonicalization_processes=2)
+assert(abs(P.obj_value()-Pd.obj_value())<1e-5)
+
+#-------------------#
+#  solution cache   #
+#-------------------#
+
+import os, tempfile, shutil
+cachedir = tempfile.mkdtemp()
+P,Z = tridiag_lmi()
+sol = P.solve(solver=SOLVER,verbose=0,solution_cache=cachedir)
+assert('cached' not in sol)
+P2,Z2 = tridiag_lmi()
+sol2 = P2.solve(solver=SOLVER,verbose=0,solution_cache=cachedir)
+assert(sol2['cached'] and sol2['obj'] == sol['obj'])
+assert(list(P2.get_valued_variable('x')) == list(P.get_valued_variable('x')))
+assert(abs(np.array(Z2.dual)-np.array(Z.dual)).max() == 0)
+shutil.rmtree(cachedir)
+
+#-------------------#
+#  solver watchdog  #
+#-------------------#
+
+if SOLVER in ('cvxopt', 'smcp'):
+    P2,Z2 = tridiag_lmi()
+    sol2 = P2.solve(solver=SOLVER,verbose=0,timelimit=60,solver_watchdog=True)
+    assert(sol2['status'] == 'optimal')
+    assert(sol2['last_iterate']['iteration'] > 0)
+    assert(abs(P2.obj_value()-P.obj_value())<1e-6)
+
+#----------------------------------#
+#  dense solver of small problems  #
+#----------------------------------#
+
+P3,Z3 = tridiag_lmi()
+assert('dense_ipm_sol' not in P3.solve(verbose=0))  # opt-in
+P3.set_option('solver',None)
+sol3 = P3.solve(verbose=0, small_problem_size=64)
+assert('dense_ipm_sol' in sol3 and P3.options['solver'] is None)
+assert(abs(P3.obj_value()-P.obj_value())<1e-6)
+assert(abs(np.array(Z3.dual-Z.dual)).max()<1e-4)
+assert('dense_ipm_sol' not in P3.solve(verbose=0, solve_via_dual=True))
+
+#-------------------------#
+#  svec transformations   #
+#-------------------------#
+
+A = cvx.matrix([[1.,2.,0.],[2.,3.,4.],[0.,4.,5.]])
+B = cvx.matrix([[0.,1.,-1.],[1.,0.,0.],[-1.,0.,2.]])
+def maxdiff(X,Y):
+    return abs(np.array(cvx.matrix(X))-np.array(cvx.matrix(Y))).max()
+SA = pic.tools.svec(A)
+assert(list(SA.I) == [0,1,2,4,5] and abs(SA[1]-2*2**0.5)<1e-12)
+assert(maxdiff(pic.tools.svecm1(SA),A) < 1e-12)
+S = pic.tools._svec_stack([A,B])
+assert(maxdiff(S[:,0],SA) == 0 and maxdiff(S[:,1],pic.tools.svec(B)) == 0)
+assert(maxdiff(pic.tools._svecm1_columns(S)[:,1],B[:]) < 1e-12)
+try:
+    pic.tools.svec(A+cvx.spmatrix([1.],[0],[2],(3,3)))
+    assert(False)
+except ValueError:
+    pass
+
+#-------------------------#
+#  MPS reader and writer  #
+#-------------------------#
+
+mpsdir = tempfile.mkdtemp()
+mpsfile = os.path.join(mpsdir, 'P4.mps')
+P4 = pic.Problem()
+x4 = P4.add_variable('x', 3, lower=[-1,0,0], upper=[4,5,1e20])
+P4.add_constraint(x4[0] + 2*x4[1] - x4[2] < 4)
+P4.add_constraint(x4[0] + x4[2] == 3)
+P4.set_objective('max', (1|x4) + 3)
+P4.solve(solver='cvxopt', verbose=0)
+for fixed in (False, True):
+    P4.write_to_file(mpsfile, fixed_mps=fixed)
+    Q4, x, data = pic.tools.import_mps(mpsfile, fixed)
+    assert(list(x) == ['continuous'] and x['continuous'].bnd[0] == (-1., 4.))
+    Q4.solve(solver='cvxopt', verbose=0)
+    assert(abs(Q4.obj_value() - P4.obj_value()) < 1e-6)
+z4 = P4.add_variable('z', 2, 'integer', lower=0, upper=[3,1])
+P4.add_constraint(z4[0] - x4[1] > 0)
+P4.write_to_file(mpsfile)
+Q4, x, data = pic.tools.import_mps(mpsfile)
+assert(x['integer'].bnd == {0: (0., 3.)} and x['binary'].size == (1,1))
+shutil.rmtree(mpsdir)
+
+#----------------#
+#  SDPA reader   #
+#----------------#
+
+sdpadir = tempfile.mkdtemp()
+sdpafile = os.path.join(sdpadir, 'P5.dat-s')
+P5,Z5 = tridiag_lmi()
+P5.add_constraint(abs(P5.get_variable('x')[:2]) < 1)
+P5.write_to_file(sdpafile)
+Q5 = pic.tools._read_sdpa(sdpafile)
+assert((Q5.numberSDPConstraints,Q5.numberConeConstraints) == (1,1))
+P5.solve(solver=SOLVER,verbose=0)
+Q5.solve(solver=SOLVER,verbose=0)
+assert(abs(P5.obj_value()-Q5.obj_value())<1e-5)
+shutil.rmtree(sdpadir)
+
+#--------------------#
+#  flow constraints  #
+#--------------------#
+
+try:
+    import networkx as nx
+except ImportError:
+    nx = None
+if nx is not None:
+    G = nx.DiGraph()
+    G.add_edges_from([(0,1),(1,2),(0,2),(2,3),(1,3)], capacity=1.)
+    for multi in (False, True):
+        P6 = pic.Problem()
+        f6 = P6.add_variable('f', 5)
+        F6 = P6.add_variable('F', 2)
+        if multi:
+            P6.add_constraint(pic.flow_Constraint(G, f6, source=[0,0], sink=[3,2],
+                              capacity='capacity', flow_value=[F6[0],F6[1]]))
+        else:
+            fd = dict((e,f6[k]) for k,e in enumerate(G.edges()))
+            P6.add_constraint(pic.flow_Constraint(G, fd, source=0, sink=3,
+                              capacity='capacity', flow_value=F6[0]))
+            P6.add_constraint(F6[1] == 0)
+        P6.set_objective('max', 2*F6[0]+F6[1])
+        P6.solve(solver='cvxopt', verbose=0)
+        assert(abs(P6.obj_value() - 4) < 1e-5)
+
+#---------------------------------#
+#  reformulations of constraints  #
+#---------------------------------#
+
+P7 = pic.Problem()
+x7 = P7.add_variable('x', 5)
+t7 = P7.add_variable('t', 2)
+P7.add_constraint(t7[0] < pic.geomean(x7))
+P7.add_constraint(pic.norm(x7 - 1, 3) < t7[1])
+assert(all(v.parent_problem is P7 for v in P7.variables.values()))
+rng7 = sorted((v.startIndex, v.endIndex) for v in P7.variables.values())
+assert(all(rng7[i][1] == rng7[i+1][0] for i in range(len(rng7)-1)))
+assert(rng7[0][0] == 0 and rng7[-1][1] == P7.numberOfVars)
+
+#------------------------#
+#  geomean tree of cones #
+#------------------------#
+
+P8 = pic.Problem()
+x8 = P8.add_variable('x', 13)
+t8 = P8.add_variable('t', 1)
+P8.add_constraint(x8 < 1.5)
+P8.add_constraint((cvx.matrix(range(1, 14), tc='d') | x8) < 13)
+P8.add_constraint(t8 < pic.geomean(x8))
+P8.set_objective('max', t8)
+assert(P8.numberConeConstraints == 14)
+assert(all(cs.typeOfConstraint == 'RScones' for cs in P8.constraints[2:]))
+for opt8 in ({'small_problem_size': 0}, {'solve_via_dual': True}):
+    P8.solve(solver='cvxopt', verbose=0, **opt8)
+    assert(P8.check_current_value_feasibility()[0])
+    assert(P8.constraints[2].dual.size == (3, 7))
+    assert(abs(t8.value[0] - np.prod(list(x8.value))**(1./13)) < 1e-5)
+
+#------------------#
+#  row-wise norms  #
+#------------------#
+
+A9 = cvx.matrix([[1., 0., -2., 1.], [0., 3., 1., 1.], [2., 1., 0., -1.]])
+P9 = pic.Problem()
+X9 = P9.add_variable('X', (4, 3))
+t9 = P9.add_variable('t', 4)
+P9.add_constraint(pic.norms(X9 - A9, axis=1) < t9)
+P9.add_constraint(pic.sum([X9[i, 0] for i in range(4)], 'i') == 1)
+P9.set_objective('min', 1 | t9)
+assert(len(P9.constraints) == 1 + 1 and P9.numberConeConstraints == 4)
+Q9 = pic.Problem()
+Y9 = Q9.add_variable('X', (4, 3))
+s9 = Q9.add_variable('t', 4)
+Q9.add_list_of_constraints([abs(Y9[i, :] - A9[i, :]) < s9[i]
+                            for i in range(4)], 'i')
+Q9.add_constraint(pic.sum([Y9[i, 0] for i in range(4)], 'i') == 1)
+Q9.set_objective('min', 1 | s9)
+Q9.solve(solver='cvxopt', verbose=0)
+for opt9 in ({'small_problem_size': 0}, {'solve_via_dual': True}):
+    P9.solve(solver='cvxopt', verbose=0, **opt9)
+    assert(abs(P9.obj_value() - Q9.obj_value()) < 1e-5)
+    assert(P9.constraints[0].dual.size == (4, 4))
+    assert(np.allclose(P9.constraints[0].slack,
+                       [Q9.constraints[i].slack for i in range(4)], atol=1e-5))
+
+#------------------------------#
+#  rational powers with cones  #
+#------------------------------#
+
+P10 = pic.Problem()
+x10 = P10.add_variable('x', 5)
+t10 = P10.add_variable('t', 1)
+c10 = P10.add_constraint(pic.norm(x10 - 1, 3, 2) < t10, ret=True)
+P10.add_constraint((cvx.matrix(range(1, 6), tc='d') | x10) > 30)
+P10.set_objective('min', t10)
+assert(c10.cone_count() == {'SOcone': 0, 'RScone': 10, 'sdp': 0})
+assert([cs.typeOfConstraint for cs in P10.constraints].count('RScones') == 1)
+P10.solve(solver='cvxopt', verbose=0)
+assert(abs(t10.value[0] - pic.norm(x10 - 1, 3, 2).value) < 1e-5)
+P10 = pic.Problem()
+y10 = P10.add_variable('y', 1)
+t10 = P10.add_variable('t', 1)
+c10 = P10.add_constraint(
+    pic.tracepow(y10, 3, 10, coef=pic.new_param('M', 2.)) > t10, ret=True)
+P10.add_constraint(y10 < 1.7)
+P10.set_objective('max', t10)
+assert(c10.cone_count()['RScone'] == 4)
+P10.solve(solver='cvxopt', verbose=0)
+assert(abs(t10.value[0] - 2 * 1.7**0.3) < 1e-5)
+
+#--------------------------------------#
+#  sum_k_largest and block lambda_max  #
+#--------------------------------------#
+
+P11 = pic.Problem()
+x11 = P11.add_variable('x', 8)
+t11 = P11.add_variable('t', 1)
+c11 = cvx.matrix([0.5, -1., 2., 0., 1.5, -0.5, 1., 3.])
+P11.add_constraint(pic.sum_k_largest(x11, 3) < t11)
+P11.add_constraint(pic.sum_k_smallest(x11, 2) > -1)
+P11.add_constraint(abs(x11) < 3)
+P11.set_objective('min', t11 - (c11 | x11))
+P11.solve(solver='cvxopt', verbose=0)
+assert(abs(t11.value[0] - pic.sum_k_largest(x11, 3).value) < 1e-5)
+P11 = pic.Problem()
+x11 = P11.add_variable('x', 2)
+t11 = P11.add_variable('t', 1)
+A11 = cvx.matrix([[2., 1., 0.], [1., 2., 1.], [0., 1., 2.]])
+Z11 = cvx.spmatrix([], [], [], (3, 1))
+M11 = ((x11[0] & Z11.T) //
+       (Z11 & (A11 + x11[1] * pic.new_param('I', cvx.spdiag([1.] * 3)))))
+c11 = P11.add_constraint(pic.lambda_max(M11) < t11, ret=True)
+assert([cs.typeOfConstraint[:3] for cs in c11.Ptmp.constraints] ==
+       ['sdp', 'lin'])
+P11.set_objective('min', t11 + abs(x11)**2)
+P11.solve(solver='cvxopt', verbose=0)
+assert(abs(t11.value[0] - pic.lambda_max(M11).value) < 1e-5)
+
+#-------------------------------#
+#  SQP with a general function  #
+#-------------------------------#
+
+a12 = cvx.matrix([0.2, 1., -0.5, 0.8])
+
+
+def f12(X=None):
+    if X is None:
+        return 'sqdist'
+    return sum((X - a12)**2), 2 * (X - a12), cvx.spdiag([2.] * 4)
+
+P12 = pic.Problem()
+x12 = P12.add_variable('x', 4)
+P12.add_constraint(x12 < 0.5)
+P12.set_objective('min', x12.apply_function(f12))
+P12.set_var_value('x', cvx.matrix(0., (4, 1)))
+sol12 = P12.solve(solver='cvxopt', verbose=0, maxit=100, tol=1e-7)
+assert(len(sol12['sqp_timings']) == sol12['sqp_iterations'])
+assert(max(abs(x12.value - cvx.matrix([0.2, 0.5, -0.5, 0.5]))) < 1e-5)
+# no initial value, and an active bound in warm-started QPs
+c12 = cvx.matrix([1., -2., -7., 3., 0.5, -6.])
+
+
+def g12(X=None):
+    if X is None:
+        return 'sqdist'
+    return sum((X - c12)**2), 2 * (X - c12), cvx.spdiag([2.] * 6)
+
+P12 = pic.Problem()
+y12 = P12.add_variable('y', 2)
+z12 = P12.add_variable('z', 4)
+P12.add_constraint(z12 > -5)
+P12.set_objective('min', (y12 // z12).apply_function(g12))
+sol12 = P12.solve(solver='cvxopt', verbose=0, maxit=100, tol=1e-7)
+assert(sol12['status'] == 'optimal' and sol12['sqp_iterations'] < 100)
+assert(max(abs((y12 // z12).value -
+               cvx.matrix([1., -2., -5., 3., 0.5, -5.]))) < 1e-5)
+
+#-----------------------------------------#
+#  branch and bound with cvxopt (MIP/MISOCP)  #
+#-----------------------------------------#
+
+w13 = cvx.matrix([12., 7., 11., 8., 9.])
+v13 = cvx.matrix([24., 13., 23., 15., 16.])
+P13 = pic.Problem()
+x13 = P13.add_variable('x', 5, 'binary')
+P13.add_constraint((w13 | x13) < 26)
+P13.set_objective('max', v13 | x13)
+for sel13 in ('best-bound', 'depth-first', 'breadth-first'):
+    sol13 = P13.solve(solver='cvxopt', verbose=0, bnb_node_selection=sel13)
+    assert(sol13['status'] == 'optimal')
+    assert(abs(sol13['obj'] - 51.) < 1e-6)
+    assert(max(abs(x13.value - cvx.matrix([0., 1., 1., 1., 0.]))) < 1e-6)
+P13 = pic.Problem()
+y13 = P13.add_variable('y', 3, 'integer')
+t13 = P13.add_variable('t', 1)
+P13.add_constraint(abs(y13 - cvx.matrix([0.4, 2.6, -1.3])) < t13)
+P13.add_constraint((1 | y13) == 1)
+P13.set_objective('min', t13)
+sol13 = P13.solve(solver='cvxopt', verbose=0)
+assert(max(abs(y13.value - cvx.matrix([0., 2., -1.]))) < 1e-6)
+assert(sol13['gap'] <= 1e-4)
+# min t s.t. ||y-a|| <= t, 1'y >= 1, y integer, with nodes whose relaxation
+# fails with the cuts and is solved again on the cones
+from picos.branch_and_bound import branch_and_bound
+a13 = np.random.RandomState(1).randn(4) * 3
+G13 = cvx.sparse([cvx.matrix([[-1.] * 4 + [0.]]).T,
+                  cvx.matrix(-np.eye(5)[[4, 0, 1, 2, 3]])])
+h13 = cvx.matrix([-1., 0.] + list(-a13))
+sol13 = branch_and_bound(cvx.matrix([0.] * 4 + [1.]), G13, h13,
+                         {'l': 1, 'q': [5], 's': []},
+                         cvx.spmatrix([], [], [], (0, 5), 'd'),
+                         cvx.matrix([], (0, 1), 'd'), range(4),
+                         cuts={'tol': 1e-6, 'maxrounds': 25, 'lmi': False})
+assert(sol13['status'] == 'optimal')
+assert(abs(sol13['obj'] - 1.53535) < 1e-5)
+
+#---------------------------------------------#
+#  outer approximation of the cones by cuts   #
+#---------------------------------------------#
+
+P14 = pic.Problem()
+y14 = P14.add_variable('y', 3, 'integer')
+t14 = P14.add_variable('t', 1)
+P14.add_constraint(abs(y14 - cvx.matrix([0.4, 2.6, -1.3])) < t14)
+P14.add_constraint((1 | y14) == 1)
+P14.set_objective('min', t14)
+sol14 = P14.solve(solver='cvxopt', verbose=0, cone_handling='cuts')
+assert(max(abs(y14.value - cvx.matrix([0., 2., -1.]))) < 1e-6)
+assert(abs(sol14['obj'] - 0.61**0.5) < 1e-5)
+assert(sol14['cut_rounds'] >= sol14['bnb_nodes'] and sol14['cuts'] > 0)
+P14 = pic.Problem()
+y14 = P14.add_variable('y', 8)
+t14 = P14.add_variable('t', 1)
+P14.add_constraint(abs(y14 - cvx.matrix([0.4, 2.6, -1.3] * 2 + [1., 3.])) < t14)
+P14.add_constraint((1 | y14) > 10)
+P14.set_objective('min', t14)
+sol14 = P14.solve(solver='cvxopt', verbose=0, cone_handling='cuts',
+                  cuts_maxrounds=2)  # too few: solved on the cones
+assert(sol14['status'] == 'optimal' and sol14['cut_rounds'] == 2)
+assert(abs(sol14['obj'] - 2.6 / 8**0.5) < 1e-6)
+P14 = pic.Problem()
+X14 = P14.add_variable('X', (3, 3), 'symmetric')
+P14.add_constraint(X14 >> 0)
+P14.add_constraint(pic.trace(X14) == 1)
+P14.set_objective('min', (cvx.matrix([[2., 1, 0], [1, 2, 1], [0, 1, 2]]) | X14))
+sol14 = P14.solve(solver='cvxopt', verbose=0, cone_handling='cuts',
+                  cuts_on_lmis=True, cuts_tol=1e-7)
+assert(sol14['status'] == 'optimal')
+assert(abs(sol14['obj'] - (2 - 2**0.5)) < 1e-6)
+assert(min(np.linalg.eigvalsh(np.array(X14.value))) > -1e-7)
+for seed14 in (0, 2, 3, 5):
+    B14 = np.random.RandomState(seed14).randn(5, 5)
+    P14 = pic.Problem()
+    X14 = P14.add_variable('X', (5, 5), 'symmetric')
+    P14.add_constraint(X14 >> 0)
+    P14.add_constraint(pic.trace(X14) == 1)
+    P14.set_objective('max', (cvx.matrix(B14 + B14.T) | X14))
+    sol14 = P14.solve(solver='cvxopt', verbose=0, cone_handling='cuts',
+                      cuts_on_lmis=True)
+    assert(sol14['status'] == 'optimal')
+    assert(abs(sol14['obj'] - max(np.linalg.eigvalsh(B14 + B14.T))) < 1e-5)
+
+#-----------------------------------------#
+#  objective sweeps on the same instance  #
+#-----------------------------------------#
+
+P15 = pic.Problem()
+x15 = P15.add_variable('x', 3)
+P15.add_constraint(x15 > -2)
+P15.add_constraint(pic.lse(x15 - 1.5) < 0)
+objs15 = [('max', x15[0] + 2 * x15[1]), ('max', x15[2]),
+          ('min', x15[0] - x15[1] - x15[2])]
+sols15 = P15.sweep_objective(objs15, solver='cvxopt', verbose=0)
+K15 = P15.cvxoptVars['K']
+for (typ15, obj15), sol15 in zip(objs15, sols15):
+    P15.set_objective(typ15, obj15)
+    P15.reset_cvxopt_instance()
+    assert(abs(P15.solve(solver='cvxopt', verbose=0)['obj'] - sol15['obj'])
+           < 1e-5)
+assert(K15 == P15.cvxoptVars['K'])
+assert(not P15.options['hotstart'])
+P15 = pic.Problem()
+x15 = P15.add_variable('x', 3)
+P15.add_constraint(x15 > 0)
+P15.add_constraint(abs(x15) < 1)
+P15.set_objective('max', x15[0])
+P15.solve(solver='cvxopt', verbose=0)
+G15 = P15.cvxoptVars['Gq'][0]
+sols15 = P15.sweep_objective([('max', x15[1]), ('min', (1 | x15))],
+                             solver='cvxopt', verbose=0)
+assert(P15.cvxoptVars['Gq'][0] is G15)
+assert(abs(sols15[0]['obj'] - 1) < 1e-6 and abs(sols15[1]['obj']) < 1e-6)
+
+#----------------------------------------------#
+#  conversion of large arrays in linear time   #
+#----------------------------------------------#
+
+import time
+a16 = np.arange(1., 80001.)
+t16 = time.time()
+M16, s16 = pic.tools._retrieve_matrix(a16)
+x16 = pic.Problem().add_variable('x', 80000)
+c16 = (x16 < a16)
+D16 = np.random.RandomState(0).rand(1000, 1000)
+M16b, s16 = pic.tools._retrieve_matrix(D16)
+I16 = np.arange(100000) % 7919
+S16 = pic.tools._triplets_to_spmatrix(np.ones(100000), I16,
+                                      np.zeros(100000, dtype=int),
+                                      (7919, 1))
+assert(time.time() - t16 < 2.)  # about 10s each with quadratic insertions
+assert(M16.size == (80000, 1) and M16[79999] == 80000.)
+assert(len(M16b.V) == 1000000 and M16b[3, 7] == D16[3, 7])
+assert(S16[0] == 13 and S16[7918] == 12 and sum(S16.V) == 100000)
+
 print('everything seems to work fine')
\ No newline at end of file